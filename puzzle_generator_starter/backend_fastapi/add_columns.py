@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Script para añadir columnas faltantes a la base de datos existente
+
+Obsoleto: la revisión base de migrations/ añade columnas e índices que falten
+(`alembic upgrade head` o `python migrate_database.py`).
 """
 
 import sqlite3
@@ -72,22 +75,75 @@ def add_missing_columns():
         except sqlite3.OperationalError as e:
             print(f"   ⚠️  Error creando tabla 'sopas_generadas': {e}")
 
+        # Columnas de dificultad calculada en sopas_generadas
+        for columna, tipo in (("dificultad_score", "REAL"), ("metricas", "TEXT"), ("content_hash", "TEXT")):
+            try:
+                cursor.execute(f"ALTER TABLE sopas_generadas ADD COLUMN {columna} {tipo}")
+                print(f"   ✅ Añadida columna '{columna}' a tabla 'sopas_generadas'")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" in str(e):
+                    print(f"   ℹ️  Columna '{columna}' ya existe en 'sopas_generadas'")
+                else:
+                    print(f"   ⚠️  Error añadiendo '{columna}' a 'sopas_generadas': {e}")
+
+        # Hashes de las imágenes movidas a services.blob_store
+        for tabla, columna in (("temas", "imagen_principal_hash"), ("temas", "icono_hash"),
+                               ("paginas_libro", "imagen_generada_hash")):
+            try:
+                cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} TEXT")
+                print(f"   ✅ Añadida columna '{columna}' a tabla '{tabla}'")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" in str(e):
+                    print(f"   ℹ️  Columna '{columna}' ya existe en '{tabla}'")
+                else:
+                    print(f"   ⚠️  Error añadiendo '{columna}' a '{tabla}': {e}")
+
         # Crear índices si no existen
         indices = [
-            ("ix_tema_nombre", "CREATE INDEX IF NOT EXISTS ix_tema_nombre ON temas (nombre)"),
-            ("ix_tema_categoria", "CREATE INDEX IF NOT EXISTS ix_tema_categoria ON temas (categoria)"),
-            ("ix_tema_dificultad", "CREATE INDEX IF NOT EXISTS ix_tema_dificultad ON temas (dificultad)"),
+            # Índices parciales: solo filas vivas, y la papelera para services.purga
+            ("ix_tema_vivo_nombre",
+             "CREATE INDEX IF NOT EXISTS ix_tema_vivo_nombre ON temas (nombre) WHERE deleted_at IS NULL"),
+            ("ix_tema_vivo_facetas",
+             "CREATE INDEX IF NOT EXISTS ix_tema_vivo_facetas ON temas (categoria, dificultad, es_publico, id) "
+             "WHERE deleted_at IS NULL"),
+            ("ix_tema_vivo_dificultad",
+             "CREATE INDEX IF NOT EXISTS ix_tema_vivo_dificultad ON temas (dificultad) WHERE deleted_at IS NULL"),
             ("ix_tema_es_publico", "CREATE INDEX IF NOT EXISTS ix_tema_es_publico ON temas (es_publico)"),
-            ("ix_tema_deleted_at", "CREATE INDEX IF NOT EXISTS ix_tema_deleted_at ON temas (deleted_at)"),
-            ("ix_libro_estado", "CREATE INDEX IF NOT EXISTS ix_libro_estado ON libros (estado)"),
-            ("ix_libro_plantilla", "CREATE INDEX IF NOT EXISTS ix_libro_plantilla ON libros (plantilla)"),
-            ("ix_libro_deleted_at", "CREATE INDEX IF NOT EXISTS ix_libro_deleted_at ON libros (deleted_at)"),
+            ("ix_tema_papelera",
+             "CREATE INDEX IF NOT EXISTS ix_tema_papelera ON temas (deleted_at) WHERE deleted_at IS NOT NULL"),
+            ("ix_libro_vivo_estado",
+             "CREATE INDEX IF NOT EXISTS ix_libro_vivo_estado ON libros (estado, created_at, id) "
+             "WHERE deleted_at IS NULL"),
+            ("ix_libro_vivo_plantilla",
+             "CREATE INDEX IF NOT EXISTS ix_libro_vivo_plantilla ON libros (plantilla, created_at, id) "
+             "WHERE deleted_at IS NULL"),
+            ("ix_libro_papelera",
+             "CREATE INDEX IF NOT EXISTS ix_libro_papelera ON libros (deleted_at) WHERE deleted_at IS NOT NULL"),
             ("ix_sopa_tema_id", "CREATE INDEX IF NOT EXISTS ix_sopa_tema_id ON sopas_generadas (tema_id)"),
             ("ix_sopa_dificultad", "CREATE INDEX IF NOT EXISTS ix_sopa_dificultad ON sopas_generadas (dificultad)"),
+            ("ix_sopa_dificultad_score",
+             "CREATE INDEX IF NOT EXISTS ix_sopa_dificultad_score ON sopas_generadas (dificultad_score)"),
             ("ix_sopa_compartible", "CREATE INDEX IF NOT EXISTS ix_sopa_compartible ON sopas_generadas (compartible)"),
-            ("ix_sopa_enlace_publico", "CREATE INDEX IF NOT EXISTS ix_sopa_enlace_publico ON sopas_generadas (enlace_publico)")
+            ("ix_sopa_enlace_publico",
+             "CREATE INDEX IF NOT EXISTS ix_sopa_enlace_publico ON sopas_generadas (enlace_publico)"),
+            # Paginación por cursor (services.pagination)
+            ("ix_tema_vivo_created_id",
+             "CREATE INDEX IF NOT EXISTS ix_tema_vivo_created_id ON temas (created_at, id) WHERE deleted_at IS NULL"),
+            ("ix_libro_vivo_created_id",
+             "CREATE INDEX IF NOT EXISTS ix_libro_vivo_created_id ON libros (created_at, id) WHERE deleted_at IS NULL"),
+            ("ix_sopa_created_id",
+             "CREATE INDEX IF NOT EXISTS ix_sopa_created_id ON sopas_generadas (created_at, id)"),
+            # Las filas antiguas quedan con NULL (no chocan); services.sopa_dedup calcula sus hashes
+            ("ux_sopa_content_hash",
+             "CREATE UNIQUE INDEX IF NOT EXISTS ux_sopa_content_hash ON sopas_generadas (content_hash)")
         ]
 
+        # Índices completos sustituidos por los parciales de arriba
+        for index_name in ("ix_tema_nombre", "ix_tema_categoria", "ix_tema_dificultad", "ix_tema_deleted_at",
+                           "ix_tema_created_id", "ix_tema_facetas", "ix_libro_estado", "ix_libro_plantilla",
+                           "ix_libro_deleted_at", "ix_libro_created_id"):
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
         for index_name, sql in indices:
             try:
                 cursor.execute(sql)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los perfiles de conexión SQLite (database.SQLITE_PROFILES)
+
+Para cada perfil crea una base temporal y mide:
+  - escrituras: sopas guardadas con un commit por sopa (como POST /api/db/sopas)
+  - lecturas: consultas por id y listados, solas y con un escritor concurrente
+
+Uso:
+    python benchmark_database.py --writes 500 --readers 4 --seconds 3
+    python benchmark_database.py --profiles ninguno rendimiento
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import SQLITE_PROFILES, Base, SopaGenerada, make_engine  # noqa: E402
+
+
+def _sopa(rng):
+    tamano = 15
+    grid = [[rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(tamano)] for _ in range(tamano)]
+    palabras = [f"PALABRA{rng.randrange(10**6)}" for _ in range(12)]
+    posiciones = [
+        {"palabra": p, "inicio": [i, 0], "fin": [i, len(p) - 1], "direccion": "horizontal"}
+        for i, p in enumerate(palabras)
+    ]
+    return SopaGenerada(palabras=palabras, grid=grid, word_positions=posiciones, grid_size=tamano)
+
+
+def _escribir(Session, cantidad, rng):
+    ids = []
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        db = Session()
+        try:
+            sopa = _sopa(rng)
+            db.add(sopa)
+            db.commit()
+            ids.append(sopa.id)
+        finally:
+            db.close()
+    return cantidad / (time.perf_counter() - inicio), ids
+
+
+def _leer(Session, ids, segundos, contador, parar):
+    rng = random.Random()
+    limite = time.perf_counter() + segundos
+    db = Session()
+    try:
+        while time.perf_counter() < limite and not parar.is_set():
+            if rng.random() < 0.8:
+                db.get(SopaGenerada, rng.choice(ids))
+            else:
+                db.query(SopaGenerada.id, SopaGenerada.grid_size).order_by(
+                    SopaGenerada.created_at.desc()
+                ).limit(20).all()
+            db.rollback()  # cerrar la transacción de lectura y soltar el snapshot
+            db.expunge_all()
+            contador[0] += 1
+    finally:
+        db.close()
+
+
+def _lecturas_por_segundo(Session, ids, lectores, segundos, escritor=None):
+    contadores = [[0] for _ in range(lectores)]
+    parar = threading.Event()
+    hilos = [threading.Thread(target=_leer, args=(Session, ids, segundos, c, parar)) for c in contadores]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    escrituras = 0
+    if escritor is not None:
+        escrituras = escritor(inicio + segundos)
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - inicio
+    return sum(c[0] for c in contadores) / transcurrido, escrituras / transcurrido
+
+
+def medir_perfil(perfil, escrituras, lectores, segundos, seed=0):
+    """Rendimiento de lectura/escritura de un perfil sobre una base temporal."""
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = make_engine(f"sqlite:///{os.path.join(directorio, 'bench.db')}", sqlite_profile=perfil)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        rng = random.Random(seed)
+
+        escrituras_s, ids = _escribir(Session, escrituras, rng)
+        lecturas_s, _ = _lecturas_por_segundo(Session, ids, lectores, segundos)
+
+        def escritor(limite):
+            hechas = 0
+            while time.perf_counter() < limite:
+                _escribir(Session, 1, rng)
+                hechas += 1
+            return hechas
+
+        lecturas_mixtas_s, escrituras_mixtas_s = _lecturas_por_segundo(
+            Session, ids, lectores, segundos, escritor
+        )
+        engine.dispose()
+    return {
+        "escrituras_s": escrituras_s,
+        "lecturas_s": lecturas_s,
+        "lecturas_con_escritor_s": lecturas_mixtas_s,
+        "escrituras_con_lectores_s": escrituras_mixtas_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de perfiles de conexión SQLite")
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    parser.add_argument("--writes", type=int, default=300, help="Sopas a guardar (un commit cada una)")
+    parser.add_argument("--readers", type=int, default=4, help="Hilos lectores concurrentes")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duración de cada fase de lectura")
+    args = parser.parse_args(argv)
+
+    print(f"{'perfil':<12} {'escr/s':>9} {'lect/s':>9} {'lect/s+escr':>12} {'escr/s+lect':>12}")
+    for perfil in args.profiles:
+        r = medir_perfil(perfil, args.writes, args.readers, args.seconds)
+        print(f"{perfil:<12} {r['escrituras_s']:>9.0f} {r['lecturas_s']:>9.0f} "
+              f"{r['lecturas_con_escritor_s']:>12.0f} {r['escrituras_con_lectores_s']:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
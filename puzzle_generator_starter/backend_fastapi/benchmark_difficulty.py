@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark del analizador de dificultad (services.difficulty)
+
+Genera sopas típicas y mide cuánto tarda ``analizar_dificultad`` en cada una.
+El objetivo es menos de un milisegundo por sopa; con ``--max-ms`` el script
+termina con código 1 si se supera (útil en una máquina de referencia, no en CI
+compartido, donde los tiempos de pared varían demasiado).
+
+Uso:
+    python benchmark_difficulty.py --repeticiones 500
+    python benchmark_difficulty.py --max-ms 1.0
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(__file__))
+
+from services.difficulty import analizar_dificultad  # noqa: E402
+from services.sopa_generator import WordSearchGenerator  # noqa: E402
+
+PALABRAS = ["perro", "gato", "ratón", "elefante", "jirafa", "león", "tigre", "oso", "lobo", "zorro"]
+
+
+def medir(sopas, repeticiones):
+    """Milisegundos por sopa (mediana de las sopas, cada una analizada ``repeticiones`` veces)."""
+    tiempos = []
+    for resultado, palabras in sopas:
+        analizar_dificultad(resultado["grid"], resultado["soluciones"], palabras)  # calentamiento
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            analizar_dificultad(resultado["grid"], resultado["soluciones"], palabras)
+        tiempos.append((time.perf_counter() - inicio) / repeticiones * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del analizador de dificultad")
+    parser.add_argument("--sopas", type=int, default=10, help="Sopas distintas a analizar")
+    parser.add_argument("--repeticiones", type=int, default=200, help="Análisis por sopa")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fallar si la mediana supera este valor")
+    args = parser.parse_args(argv)
+
+    sopas = []
+    for seed in range(args.sopas):
+        generator = WordSearchGenerator(PALABRAS, seed=seed)
+        sopas.append((generator.generate(), generator.words))
+
+    mediana, peor = medir(sopas, args.repeticiones)
+    print(f"analizar_dificultad: mediana {mediana:.3f} ms/sopa, peor {peor:.3f} ms/sopa")
+    if args.max_ms is not None and mediana > args.max_ms:
+        print(f"❌ Supera el objetivo de {args.max_ms} ms por sopa")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
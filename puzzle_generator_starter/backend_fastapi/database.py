@@ -7,6 +7,7 @@ import os
 import uuid
 from datetime import datetime, timezone
 
+from fastapi import Depends, Request
 from sqlalchemy import (
     JSON,
     Boolean,
@@ -19,27 +20,220 @@ from sqlalchemy import (
     LargeBinary,
     String,
     Text,
+    TypeDecorator,
     create_engine,
+    event,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import deferred, relationship, sessionmaker
+
+from services import replica as replica_routing
+from services import tema_facets, tema_search
+from services.grid_codec import decode_grid, decode_positions, encode_grid, encode_positions
 
 # Configuración de PostgreSQL con fallback a SQLite para desarrollo
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./puzzle_generator.db")
+# Réplica opcional para los endpoints de solo lectura (services.replica)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
 # Seleccionar tipo JSON adecuado según el motor
 JSON_TYPE = JSONB if DATABASE_URL.startswith("postgresql") else JSON
 
+
+class _JSONCodificado(TypeDecorator):
+    """JSON que se guarda en formato compacto (services.grid_codec) y se lee en cualquiera."""
+
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(JSONB() if dialect.name == "postgresql" else JSON())
+
+
+class GridJSON(_JSONCodificado):
+    """Grilla de letras: ``g1:`` + letras fila a fila en vez de lista de listas."""
+
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_grid(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_grid(value)
+
+
+class PositionsJSON(_JSONCodificado):
+    """Colocaciones de palabras: registros de ancho fijo en vez de diccionarios."""
+
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_positions(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_positions(value)
+
+# Perfiles de conexión SQLite aplicados en cada conexión nueva (evento "connect").
+# WAL permite leer mientras se escribe y, con synchronous=NORMAL, los commits no
+# hacen fsync (solo los checkpoints): ante un corte de luz se pueden perder las
+# últimas transacciones, pero la base nunca queda corrupta.
+SQLITE_PROFILES = {
+    "rendimiento": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negativo = KiB (64 MiB)
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    "seguro": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    # Comportamiento anterior: journal de rollback y valores por defecto de SQLite
+    "ninguno": {},
+}
+
+
+def sqlite_pragmas(profile: str = None) -> dict:
+    """Pragmas del perfil indicado (``SQLITE_PROFILE``) con sobrescrituras ``SQLITE_<PRAGMA>``."""
+    profile = (profile or os.getenv("SQLITE_PROFILE", "rendimiento")).lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil SQLite desconocido: {profile} (opciones: {', '.join(SQLITE_PROFILES)})")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for nombre in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "temp_store"):
+        valor = os.getenv(f"SQLITE_{nombre.upper()}")
+        if valor:
+            pragmas[nombre] = valor
+    return pragmas
+
+
+def _registrar_pragmas(db_engine, pragmas: dict) -> None:
+    if not pragmas:
+        return
+
+    @event.listens_for(db_engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nombre, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nombre}={valor}")
+        finally:
+            cursor.close()
+
+
+def _opciones_pool(url: str) -> dict:
+    """Opciones de pool según el motor (compartidas por los engines síncrono y asíncrono)."""
+    if url.split(":", 1)[0].startswith("sqlite"):
+        if url.split("://", 1)[1] in ("", "/:memory:"):
+            return {}
+        # SQLite admite un solo escritor: pocas conexiones bastan y evitan esperas en el lock
+        return {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+            "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        }
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Reciclar antes del idle timeout típico de proxies/PgBouncer y descartar conexiones muertas
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+def make_engine(url: str = None, sqlite_profile: str = None):
+    """Crear el engine con el perfil de conexión y el pool adecuados al motor."""
+    url = url or DATABASE_URL
+    if url.startswith("sqlite"):
+        db_engine = create_engine(url, connect_args={"check_same_thread": False}, **_opciones_pool(url))
+        _registrar_pragmas(db_engine, sqlite_pragmas(sqlite_profile))
+        return db_engine
+    return create_engine(url, **_opciones_pool(url))
+
+
+def async_url(url: str) -> str:
+    """URL con el driver asíncrono equivalente (aiosqlite / asyncpg)."""
+    esquema, resto = url.split("://", 1)
+    if "+" in esquema:
+        esquema = esquema.split("+", 1)[0]
+    driver = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+    if esquema not in driver:
+        raise ValueError(f"No hay driver asíncrono configurado para {esquema}")
+    return f"{driver[esquema]}://{resto}"
+
+
+def make_async_engine(url: str = None, sqlite_profile: str = None):
+    """Engine asíncrono (requiere ``aiosqlite`` o ``asyncpg``) con el mismo perfil y pool."""
+    from sqlalchemy.ext.asyncio import create_async_engine  # pylint: disable=import-outside-toplevel
+
+    url = async_url(url) if url else os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    db_engine = create_async_engine(url, **_opciones_pool(url))
+    if url.startswith("sqlite"):
+        _registrar_pragmas(db_engine.sync_engine, sqlite_pragmas(sqlite_profile))
+    return db_engine
+
+
 # Crear engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+engine = make_engine()
 
 # Crear sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# El engine asíncrono se crea al primer uso: los scripts que solo usan
+# SessionLocal no necesitan tener instalado el driver asíncrono.
+_async_engine = None
+_async_sessionmaker = None
+_async_read_engine = None
+_async_read_sessionmaker = None
+
+
+def _async_sessionmaker_de(db_engine):
+    from sqlalchemy.ext.asyncio import async_sessionmaker  # pylint: disable=import-outside-toplevel
+
+    # expire_on_commit=False: los objetos siguen legibles tras el commit sin otra consulta
+    return async_sessionmaker(db_engine, autoflush=False, expire_on_commit=False)
+
+
+def get_async_engine():
+    """Engine asíncrono compartido por la aplicación."""
+    global _async_engine  # pylint: disable=global-statement
+    if _async_engine is None:
+        _async_engine = make_async_engine()
+    return _async_engine
+
+
+def AsyncSessionLocal():  # pylint: disable=invalid-name
+    """Nueva ``AsyncSession`` sobre el engine asíncrono (análoga a ``SessionLocal``)."""
+    global _async_sessionmaker  # pylint: disable=global-statement
+    if _async_sessionmaker is None:
+        _async_sessionmaker = _async_sessionmaker_de(get_async_engine())
+    return _async_sessionmaker()
+
+
+def AsyncReadSessionLocal():  # pylint: disable=invalid-name
+    """Nueva ``AsyncSession`` sobre la réplica de ``DATABASE_READ_URL``."""
+    global _async_read_engine, _async_read_sessionmaker  # pylint: disable=global-statement
+    if _async_read_sessionmaker is None:
+        _async_read_engine = make_async_engine(DATABASE_READ_URL)
+        _async_read_sessionmaker = _async_sessionmaker_de(_async_read_engine)
+    return _async_read_sessionmaker()
+
+
+async def dispose_async_engine():
+    """Cerrar las conexiones de los engines asíncronos (al apagar la aplicación)."""
+    global _async_engine, _async_sessionmaker  # pylint: disable=global-statement
+    global _async_read_engine, _async_read_sessionmaker  # pylint: disable=global-statement
+    for db_engine in (_async_engine, _async_read_engine):
+        if db_engine is not None:
+            await db_engine.dispose()
+    _async_engine = _async_read_engine = None
+    _async_sessionmaker = _async_read_sessionmaker = None
+
 # Base para modelos
 Base = declarative_base()
 
@@ -48,6 +242,22 @@ class SoftDeleteMixin:
     deleted_at = Column(DateTime(timezone=True), nullable=True)
 
 
+# Las consultas siempre filtran ``deleted_at IS NULL``: los índices parciales solo
+# guardan las filas vivas, y los de papelera solo las eliminadas (services.purga).
+VIVO = text("deleted_at IS NULL")
+ELIMINADO = text("deleted_at IS NOT NULL")
+
+
+def indice_vivo(nombre: str, *columnas: str) -> Index:
+    """Índice parcial sobre las filas no eliminadas (SQLite y PostgreSQL)."""
+    return Index(nombre, *columnas, sqlite_where=VIVO, postgresql_where=VIVO)
+
+
+def indice_papelera(nombre: str) -> Index:
+    """Índice parcial de ``deleted_at`` sobre las filas eliminadas, para la purga."""
+    return Index(nombre, "deleted_at", sqlite_where=ELIMINADO, postgresql_where=ELIMINADO)
+
+
 # ========== MODELOS DE BASE DE DATOS ==========
 
 class Tema(Base, SoftDeleteMixin):
@@ -59,8 +269,12 @@ class Tema(Base, SoftDeleteMixin):
     nombre = Column(String(255), nullable=False)
     descripcion = Column(Text)
     palabras = Column(JSON_TYPE, nullable=False, default=list)  # [{"texto": "perro"}]
-    imagen_principal = Column(LargeBinary)  # Se mantiene para compatibilidad
-    icono = Column(LargeBinary)
+    # Las imágenes viven en services.blob_store; la fila solo guarda el SHA-256.
+    # Las columnas binarias se conservan (diferidas) para migrar bases antiguas.
+    imagen_principal = deferred(Column(LargeBinary))
+    icono = deferred(Column(LargeBinary))
+    imagen_principal_hash = Column(String(64), nullable=True)
+    icono_hash = Column(String(64), nullable=True)
     categoria = Column(String(100))
     etiquetas = Column(JSON_TYPE, default=list)
     dificultad = Column(String(20), default="medio")
@@ -74,11 +288,12 @@ class Tema(Base, SoftDeleteMixin):
 
     # Índices para rendimiento
     __table_args__ = (
-        Index('ix_tema_nombre', "nombre"),
-        Index('ix_tema_categoria', "categoria"),
-        Index('ix_tema_dificultad', "dificultad"),
+        indice_vivo('ix_tema_vivo_nombre', "nombre"),
+        indice_vivo('ix_tema_vivo_facetas', "categoria", "dificultad", "es_publico", "id"),  # filtros y facetas
+        indice_vivo('ix_tema_vivo_dificultad', "dificultad"),
         Index('ix_tema_es_publico', "es_publico"),
-        Index('ix_tema_deleted_at', "deleted_at"),
+        indice_vivo('ix_tema_vivo_created_id', "created_at", "id"),  # paginación por cursor
+        indice_papelera('ix_tema_papelera'),
     )
 
     # Relaciones
@@ -124,9 +339,10 @@ class Libro(Base, SoftDeleteMixin):
 
     # Índices para rendimiento
     __table_args__ = (
-        Index('ix_libro_estado', "estado"),
-        Index('ix_libro_plantilla', "plantilla"),
-        Index('ix_libro_deleted_at', "deleted_at"),
+        indice_vivo('ix_libro_vivo_estado', "estado", "created_at", "id"),
+        indice_vivo('ix_libro_vivo_plantilla', "plantilla", "created_at", "id"),
+        indice_vivo('ix_libro_vivo_created_id', "created_at", "id"),  # paginación por cursor
+        indice_papelera('ix_libro_papelera'),
     )
 
     # Relaciones
@@ -149,7 +365,8 @@ class PaginaLibro(Base):
     titulo = Column(String(255))
     tema_id = Column(String(36), ForeignKey("temas.id"), nullable=True)
     contenido_json = Column(JSON_TYPE, default=dict)
-    imagen_generada = Column(LargeBinary)
+    imagen_generada = deferred(Column(LargeBinary))  # heredada: ver imagen_generada_hash
+    imagen_generada_hash = Column(String(64), nullable=True)  # SHA-256 en services.blob_store
 
     # Metadata
     tiempo_generacion = Column(Float)
@@ -192,11 +409,14 @@ class SopaGenerada(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tema_id = Column(String(36), ForeignKey("temas.id"), nullable=True)
     palabras = Column(JSON_TYPE, nullable=False)  # Lista de palabras usadas
-    grid = Column(JSON_TYPE, nullable=False)      # Matriz de la sopa
-    word_positions = Column(JSON_TYPE, nullable=False)  # Posiciones de las palabras
+    grid = Column(GridJSON, nullable=False)       # Matriz de la sopa (compacta, ver GridJSON)
+    word_positions = Column(PositionsJSON, nullable=False)  # Posiciones de las palabras
     grid_size = Column(Integer, default=15)       # Tamaño del grid
     dificultad = Column(String(20), default="medio")
+    dificultad_score = Column(Float, nullable=True)  # Puntuación objetiva 0..1 (services.difficulty)
+    metricas = Column(JSON_TYPE, nullable=True)      # Métricas usadas para calcular la dificultad
     tiempo_generacion = Column(Float)             # Tiempo en segundos
+    content_hash = Column(String(64), nullable=True)  # SHA-256 del contenido (services.sopa_dedup)
     compartible = Column(Boolean, default=False)  # Si se puede compartir por enlace
     enlace_publico = Column(String(255), unique=True, nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -205,8 +425,11 @@ class SopaGenerada(Base):
     __table_args__ = (
         Index('ix_sopa_tema_id', "tema_id"),
         Index('ix_sopa_dificultad', "dificultad"),
+        Index('ix_sopa_dificultad_score', "dificultad_score"),
         Index('ix_sopa_compartible', "compartible"),
         Index('ix_sopa_enlace_publico', "enlace_publico"),
+        Index('ux_sopa_content_hash', "content_hash", unique=True),
+        Index('ix_sopa_created_id', "created_at", "id"),  # paginación por cursor
     )
 
     # Relaciones
@@ -237,6 +460,15 @@ class LibroItem(Base):
     tema = relationship("Tema", back_populates="libro_items")
 
 
+# La base de la aplicación se crea con las migraciones (migrations/); este
+# evento cubre ``create_all`` sobre bases temporales, como en las pruebas.
+@event.listens_for(Base.metadata, "after_create")
+def _instalar_busqueda(_metadata, connection, **_kw):
+    """Índice de texto completo y de etiquetas de temas, con sus triggers."""
+    tema_search.instalar(connection)
+    tema_facets.instalar(connection)
+
+
 # ========== FUNCIONES DE UTILIDAD ==========
 
 def get_db():
@@ -248,19 +480,43 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependencia para obtener una sesión asíncrona de BD."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_replica_db():
+    """Sesión asíncrona sobre la réplica de lectura, o ``None`` si no hay réplica."""
+    if not DATABASE_READ_URL:
+        yield None
+        return
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(
+    request: Request,
+    primario=Depends(get_async_db),
+    replica=Depends(get_async_replica_db),
+):
+    """Dependencia de los endpoints de solo lectura: réplica si la hay, salvo
+    que el cliente acabe de escribir (services.replica).
+
+    Ambas sesiones se abren sin conexión; solo la que se usa la pide al pool.
+    """
+    if replica is None or replica_routing.leer_del_primario(request.cookies):
+        return primario
+    return replica
+
+
 def init_database():
-    """Inicializar base de datos y crear tablas."""
+    """Crear o actualizar el esquema con las migraciones (services.migraciones)."""
+    from services import migraciones  # pylint: disable=import-outside-toplevel
+
     try:
-        Base.metadata.create_all(bind=engine)
+        migraciones.actualizar(engine)
         print("Base de datos inicializada correctamente")
     except Exception as exc:
         print(f"⚠ Error inicializando base de datos: {exc}")
         raise
-
-
-# Crear tablas al importar (con manejo de errores)
-try:
-    init_database()
-except Exception as exc:
-    print(f"⚠ Error en inicialización automática de BD: {exc}")
-    print("La base de datos se inicializará cuando sea necesaria")
@@ -0,0 +1,51 @@
+"""
+Bases SQLite temporales para las pruebas (síncronas, asíncronas y vía TestClient)
+"""
+
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, get_async_db, make_async_engine, make_engine
+from main import app
+
+
+def sesion_sqlite(ruta, **opciones):
+    """Sesión síncrona sobre una base nueva en ``ruta``; devuelve ``(db, engine)``."""
+    engine = make_engine(f"sqlite:///{ruta}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, **opciones)(), engine
+
+
+def sesiones_async(ruta):
+    """Engine asíncrono con el esquema creado, su fábrica de sesiones y una dependencia como get_async_db."""
+    engine = make_async_engine(f"sqlite:///{ruta}")
+
+    async def crear_tablas():
+        async with engine.begin() as conexion:
+            await conexion.run_sync(Base.metadata.create_all)
+
+    asyncio.run(crear_tablas())
+    sesiones = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def dependencia():
+        async with sesiones() as db:
+            yield db
+
+    return engine, sesiones, dependencia
+
+
+def cliente_async(directorio):
+    """TestClient de la app con get_async_db apuntando a ``directorio/async.db``."""
+    engine, _, dependencia = sesiones_async(os.path.join(directorio, "async.db"))
+    app.dependency_overrides[get_async_db] = dependencia
+    return TestClient(app), engine
+
+
+def cerrar_cliente(engine):
+    """Quitar las dependencias sustituidas y cerrar el engine de ``cliente_async``."""
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
@@ -6,130 +6,67 @@ para la generación de sopas de letras.
 """
 
 # Standard library imports
+import asyncio
 import json
 import os
 import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
-from uuid import uuid4
 
 # Third party imports
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
 
 # Database imports
-from database import get_db, Tema, Libro, PaginaLibro, SopaGenerada, LibroItem
+from database import (
+    DATABASE_READ_URL, dispose_async_engine, get_async_db, get_async_read_db,
+    Tema, Libro, PaginaLibro, SopaGenerada, LibroItem,
+)
+
+# Modelos de la API /api/db (schemas.py, compartidos con los routers)
+from schemas import (
+    TemaCreate, TemaResponse, LibroCreate, LibroResponse, PaginaCreate, SopaGeneradaCreate,
+    SopaGeneradaResponse, LibroItemCreate, LibroItemResponse, LibroConItemsResponse,
+)
 
 # Router imports
+from routers.comun import (
+    blob_url, items_de_libro, libro_vivo, paginar, tema_to_response, tema_vivo,
+)
 from routers.diagramacion import router as diagramacion_router
+from routers.imagenes import router as imagenes_router
+from routers.libro_items import router as libro_items_router
+from routers.temas_db import router as temas_db_router
+from services import tema_facets
+from services.difficulty import analizar_dificultad
+from services.generation_pool import generation_pool
+from services.migraciones import comprobar as comprobar_esquema
+from services.purga import INTERVALO_S as PURGA_INTERVALO_S, purga_periodica
+from services.replica import LeerTusEscrituras
+from services.result_cache import ainvalidate_tema
+from services.sopa_dedup import guardar_sopa
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Arrancar y detener los recursos de larga vida de la aplicación."""
+    comprobar_esquema()
+    generation_pool.start()
+    purga = asyncio.create_task(purga_periodica()) if PURGA_INTERVALO_S > 0 else None
+    try:
+        yield
+    finally:
+        if purga is not None:
+            purga.cancel()
+        generation_pool.shutdown()
+        await dispose_async_engine()
 
 
-# ========== MODELOS PYDANTIC ==========
-
-class PalabraSchema(BaseModel):
-    texto: str
-
-
-class TemaBase(BaseModel):
-    nombre: str
-    descripcion: Optional[str] = None
-    palabras: List[PalabraSchema] = Field(default_factory=list)
-    categoria: Optional[str] = None
-    etiquetas: List[str] = Field(default_factory=list)
-    dificultad: Optional[str] = "medio"
-
-
-class TemaCreate(TemaBase):
-    """Modelo para crear o actualizar un tema."""
-
-
-class TemaResponse(TemaBase):
-    """Modelo de respuesta para un tema."""
-    id: str
-    created_at: str
-    updated_at: str
-
-class LibroCreate(BaseModel):
-    """Modelo para crear un nuevo libro."""
-    nombre: str
-    descripcion: Optional[str] = None
-    plantilla: Optional[str] = "basico"
-    temaIds: Optional[List[str]] = None
-
-class LibroResponse(BaseModel):
-    """Modelo de respuesta para un libro."""
-    id: str
-    nombre: str
-    descripcion: Optional[str]
-    plantilla: str
-    estado: str
-    progreso_creacion: float
-    paginas_totales: int
-    created_at: str
-    updated_at: str
-
-class PaginaCreate(BaseModel):
-    """Modelo para crear una nueva página."""
-    libro_id: str
-    numero_pagina: int
-    titulo: Optional[str] = None
-    tema_id: Optional[str] = None
-    contenido_json: Dict[str, Any] = Field(default_factory=dict)
-
-class SopaGeneradaBase(BaseModel):
-    tema_id: Optional[str] = None
-    palabras: List[str]
-    grid: List[List[str]]
-    word_positions: List[Dict[str, Any]]
-    grid_size: int = 15
-    dificultad: str = "medio"
-    tiempo_generacion: Optional[float] = None
-    compartible: bool = False
-
-class SopaGeneradaCreate(SopaGeneradaBase):
-    pass
-
-class SopaGeneradaResponse(SopaGeneradaBase):
-    id: str
-    enlace_publico: Optional[str] = None
-    created_at: str
-
-class LibroItemBase(BaseModel):
-    tema_id: str
-    orden: int = 0
-    configuracion: Dict[str, Any] = Field(default_factory=dict)
-
-class LibroItemCreate(LibroItemBase):
-    pass
-
-class LibroItemResponse(LibroItemBase):
-    id: str
-    libro_id: str
-    tema_nombre: str
-    created_at: str
-
-    class Config:
-        from_attributes = True
-
-class LibroConItemsResponse(BaseModel):
-    id: str
-    nombre: str
-    descripcion: str
-    plantilla: str
-    estado: str
-    progreso_creacion: float
-    paginas_totales: int
-    created_at: str
-    updated_at: str
-    items: List[LibroItemResponse] = []
-
-    class Config:
-        from_attributes = True
-
-app = FastAPI(title="Puzzle API")
+app = FastAPI(title="Puzzle API", lifespan=lifespan)
 
 # CORS opcional si no usas proxy de Vite
 app.add_middleware(
@@ -138,10 +75,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
-# Incluir routers
+# Con réplica de lectura, las lecturas de un cliente que acaba de escribir van al primario
+if DATABASE_READ_URL:
+    app.add_middleware(LeerTusEscrituras)
+
+# Incluir routers (temas_db antes de las rutas /api/db/temas/{tema_id} de este módulo)
 app.include_router(diagramacion_router)
+app.include_router(temas_db_router)
+app.include_router(imagenes_router)
+app.include_router(libro_items_router)
 
 # Configuración de persistencia
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
@@ -344,13 +289,13 @@ if not _SKIP_AUTO_LOAD:
 
 
 @app.get("/api/health")
-def health(db: Session = Depends(get_db)):
+async def health(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint de salud para verificar que la API y la conexión a la BD están funcionando.
     """
     try:
         # Realizar una consulta simple para verificar la conexión a la BD
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception as e:
         print(f"ERROR: Health check failed to connect to DB: {e}")
@@ -611,41 +556,48 @@ def test_endpoint(data: dict):
     return {"received": data, "status": "ok"}
 
 # ==================== TEMAS (BASE DE DATOS) ====================
+# Importación, búsqueda y facetas: routers/temas_db.py; imágenes: routers/imagenes.py
 
 @app.get("/api/db/temas", response_model=List[TemaResponse])
-def get_temas_db(include_public: bool = False, db: Session = Depends(get_db)):
-    """Obtener todos los temas de la base de datos (excluyendo eliminados)."""
-    query = db.query(Tema).filter(Tema.deleted_at.is_(None))
+async def get_temas_db(
+    request: Request,
+    response: Response,
+    include_public: bool = False,
+    categoria: Optional[str] = None,
+    dificultad: Optional[str] = None,
+    etiquetas: List[str] = Query(default_factory=list),
+    es_publico: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Obtener los temas de la base de datos (excluyendo eliminados), paginados por cursor.
+
+    ``etiquetas`` se puede repetir: se devuelven los temas que tienen todas.
+    """
+    query = tema_facets.filtrar(
+        select(Tema).where(Tema.deleted_at.is_(None)), Tema, db.bind.dialect.name,
+        categoria=categoria, dificultad=dificultad, etiquetas=etiquetas, es_publico=es_publico,
+    )
 
     # Si se solicita incluir temas públicos, añadirlos
     if include_public:
         # Por ahora, como no hay usuarios, todos son "públicos" para compatibilidad
-        pass  # En futuro: query = query.filter(or_(Tema.user_id == current_user.id, Tema.es_publico == True))
+        pass  # En futuro: query = query.where(or_(Tema.user_id == current_user.id, Tema.es_publico == True))
 
-    temas = query.all()
-    return [
-        TemaResponse(
-            id=tema.id,
-            nombre=tema.nombre,
-            descripcion=tema.descripcion,
-            palabras=tema.palabras or [],
-            categoria=tema.categoria,
-            etiquetas=tema.etiquetas or [],
-            dificultad=tema.dificultad,
-            created_at=tema.created_at.isoformat(),
-            updated_at=tema.updated_at.isoformat(),
-        )
-        for tema in temas
-    ]
+    temas = await paginar(db, query, Tema, cursor, limit, request, response)
+    return [tema_to_response(tema) for tema in temas]
 
 @app.post("/api/db/temas", response_model=TemaResponse)
-def create_tema_db(tema: TemaCreate, db: Session = Depends(get_db)):
+async def create_tema_db(tema: TemaCreate, db: AsyncSession = Depends(get_async_db)):
     """Crear un nuevo tema en la base de datos."""
     try:
         print(f"DEBUG: Creating tema {tema.nombre}")
 
         # Verificar si ya existe un tema con el mismo nombre
-        existing = db.query(Tema).filter(Tema.nombre == tema.nombre).first()
+        existing = await db.scalar(
+            select(Tema.id).where(Tema.nombre == tema.nombre, Tema.deleted_at.is_(None)).limit(1)
+        )
         if existing:
             print(f"DEBUG: Tema already exists: {tema.nombre}")
             raise HTTPException(status_code=422, detail="Ya existe un tema con ese nombre")
@@ -663,56 +615,36 @@ def create_tema_db(tema: TemaCreate, db: Session = Depends(get_db)):
         print("DEBUG: Adding to database")
         db.add(db_tema)
         print("DEBUG: Committing")
-        db.commit()
+        await db.commit()
         print("DEBUG: Refreshing")
-        db.refresh(db_tema)
+        await db.refresh(db_tema)
 
         print(f"DEBUG: Tema created successfully: {db_tema.id}")
 
-        return TemaResponse(
-            id=db_tema.id,
-            nombre=db_tema.nombre,
-            descripcion=db_tema.descripcion,
-            palabras=db_tema.palabras or [],
-            categoria=db_tema.categoria,
-            etiquetas=db_tema.etiquetas or [],
-            dificultad=db_tema.dificultad,
-            created_at=db_tema.created_at.isoformat(),
-            updated_at=db_tema.updated_at.isoformat(),
-        )
+        return tema_to_response(db_tema)
     except (ValueError, TypeError, AttributeError) as e:
         print(f"DEBUG: Error in create_tema_db: {e}")
         traceback.print_exc()
         raise
 
 @app.get("/api/db/temas/{tema_id}", response_model=TemaResponse)
-def get_tema_db(tema_id: str, db: Session = Depends(get_db)):
+async def get_tema_db(tema_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener un tema específico por ID."""
-    tema = db.query(Tema).filter(Tema.id == tema_id).first()
-    if not tema:
-        raise HTTPException(status_code=404, detail="Tema no encontrado")
+    tema = await tema_vivo(db, tema_id)
 
-    return TemaResponse(
-        id=tema.id,
-        nombre=tema.nombre,
-        descripcion=tema.descripcion,
-        palabras=tema.palabras or [],
-        categoria=tema.categoria,
-        etiquetas=tema.etiquetas or [],
-        dificultad=tema.dificultad,
-        created_at=tema.created_at.isoformat(),
-        updated_at=tema.updated_at.isoformat()
-    )
+    return tema_to_response(tema)
 
 @app.put("/api/db/temas/{tema_id}", response_model=TemaResponse)
-def update_tema_db(tema_id: str, tema_update: TemaCreate, db: Session = Depends(get_db)):
+async def update_tema_db(tema_id: str, tema_update: TemaCreate, db: AsyncSession = Depends(get_async_db)):
     """Actualizar un tema existente."""
-    tema = db.query(Tema).filter(Tema.id == tema_id).first()
-    if not tema:
-        raise HTTPException(status_code=404, detail="Tema no encontrado")
+    tema = await tema_vivo(db, tema_id)
 
     # Verificar nombre único (excluyendo el actual)
-    existing = db.query(Tema).filter(Tema.nombre == tema_update.nombre, Tema.id != tema_id).first()
+    existing = await db.scalar(
+        select(Tema.id).where(
+            Tema.nombre == tema_update.nombre, Tema.id != tema_id, Tema.deleted_at.is_(None)
+        ).limit(1)
+    )
     if existing:
         raise HTTPException(status_code=422, detail="Ya existe otro tema con ese nombre")
 
@@ -723,149 +655,146 @@ def update_tema_db(tema_id: str, tema_update: TemaCreate, db: Session = Depends(
     tema.etiquetas = tema_update.etiquetas or []
     tema.dificultad = tema_update.dificultad
 
-    db.commit()
-    db.refresh(tema)
-
-    return TemaResponse(
-        id=tema.id,
-        nombre=tema.nombre,
-        descripcion=tema.descripcion,
-        palabras=tema.palabras or [],
-        categoria=tema.categoria,
-        etiquetas=tema.etiquetas or [],
-        dificultad=tema.dificultad,
-        created_at=tema.created_at.isoformat(),
-        updated_at=tema.updated_at.isoformat()
-    )
+    await db.commit()
+    await db.refresh(tema)
+    await ainvalidate_tema(tema_id)
+
+    return tema_to_response(tema)
 
 @app.delete("/api/db/temas/{tema_id}")
-def delete_tema_db(tema_id: str, db: Session = Depends(get_db)):
-    """Eliminar un tema."""
-    tema = db.query(Tema).filter(Tema.id == tema_id).first()
-    if not tema:
-        raise HTTPException(status_code=404, detail="Tema no encontrado")
+async def delete_tema_db(tema_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Eliminar un tema (borrado lógico; services.purga lo borra tras la retención)."""
+    tema = await tema_vivo(db, tema_id)
 
-    db.delete(tema)
-    db.commit()
+    tema.deleted_at = datetime.now(timezone.utc)
+    await db.commit()
+    await ainvalidate_tema(tema_id)
 
     return {"message": f"Tema '{tema.nombre}' eliminado correctamente"}
 
 # ==================== SOPAS GENERADAS ====================
 
-@app.post("/api/db/sopas", response_model=SopaGeneradaResponse)
-def create_sopa_generada(sopa: SopaGeneradaCreate, db: Session = Depends(get_db)):
-    """Guardar una sopa de letras generada en el histórico."""
-    import time
-    import secrets
-
-    # Generar enlace público si es compartible
-    enlace_publico = None
-    if sopa.compartible:
-        enlace_publico = secrets.token_urlsafe(16)
-
-    db_sopa = SopaGenerada(
+def sopa_to_response(sopa: SopaGenerada) -> SopaGeneradaResponse:
+    """Construir la respuesta de API de una sopa guardada."""
+    return SopaGeneradaResponse(
+        id=sopa.id,
         tema_id=sopa.tema_id,
         palabras=sopa.palabras,
         grid=sopa.grid,
         word_positions=sopa.word_positions,
         grid_size=sopa.grid_size,
         dificultad=sopa.dificultad,
+        dificultad_score=sopa.dificultad_score,
+        metricas=sopa.metricas,
         tiempo_generacion=sopa.tiempo_generacion,
         compartible=sopa.compartible,
-        enlace_publico=enlace_publico
+        enlace_publico=sopa.enlace_publico,
+        created_at=sopa.created_at.isoformat()
     )
 
-    db.add(db_sopa)
-    db.commit()
-    db.refresh(db_sopa)
+@app.post("/api/db/sopas", response_model=SopaGeneradaResponse)
+async def create_sopa_generada(sopa: SopaGeneradaCreate, db: AsyncSession = Depends(get_async_db)):
+    """Guardar una sopa de letras generada en el histórico."""
+    import time
+    import secrets
 
-    return SopaGeneradaResponse(
-        id=db_sopa.id,
-        tema_id=db_sopa.tema_id,
-        palabras=db_sopa.palabras,
-        grid=db_sopa.grid,
-        word_positions=db_sopa.word_positions,
-        grid_size=db_sopa.grid_size,
-        dificultad=db_sopa.dificultad,
-        tiempo_generacion=db_sopa.tiempo_generacion,
-        compartible=db_sopa.compartible,
-        enlace_publico=db_sopa.enlace_publico,
-        created_at=db_sopa.created_at.isoformat()
-    )
+    # Generar enlace público si es compartible
+    enlace_publico = None
+    if sopa.compartible:
+        enlace_publico = secrets.token_urlsafe(16)
+
+    def completar_dificultad(valores: Dict[str, Any]) -> None:
+        """Dificultad objetiva calculada a partir de la grilla y las posiciones."""
+        try:
+            analisis = analizar_dificultad(sopa.grid, sopa.word_positions, sopa.palabras)
+            valores["dificultad"] = analisis["dificultad"]
+            valores["dificultad_score"] = analisis["puntuacion"]
+            valores["metricas"] = analisis["metricas"]
+        except (ValueError, TypeError, IndexError) as e:
+            print(f"⚠ No se pudo calcular la dificultad de la sopa: {e}")
+
+    # Guardar una sopa idéntica a otra ya guardada devuelve la existente
+    valores = {
+        "tema_id": sopa.tema_id,
+        "palabras": sopa.palabras,
+        "grid": sopa.grid,
+        "word_positions": sopa.word_positions,
+        "grid_size": sopa.grid_size,
+        "dificultad": sopa.dificultad,
+        "tiempo_generacion": sopa.tiempo_generacion,
+        "compartible": sopa.compartible,
+        "enlace_publico": enlace_publico,
+    }
+    db_sopa, _ = await db.run_sync(lambda sesion: guardar_sopa(sesion, valores, completar=completar_dificultad))
+
+    return sopa_to_response(db_sopa)
 
 @app.get("/api/db/sopas", response_model=List[SopaGeneradaResponse])
-def get_sopas_generadas(limit: int = 50, db: Session = Depends(get_db)):
-    """Obtener histórico de sopas generadas."""
-    sopas = db.query(SopaGenerada).order_by(SopaGenerada.created_at.desc()).limit(limit).all()
-    return [
-        SopaGeneradaResponse(
-            id=sopa.id,
-            tema_id=sopa.tema_id,
-            palabras=sopa.palabras,
-            grid=sopa.grid,
-            word_positions=sopa.word_positions,
-            grid_size=sopa.grid_size,
-            dificultad=sopa.dificultad,
-            tiempo_generacion=sopa.tiempo_generacion,
-            compartible=sopa.compartible,
-            enlace_publico=sopa.enlace_publico,
-            created_at=sopa.created_at.isoformat()
-        )
-        for sopa in sopas
-    ]
+async def get_sopas_generadas(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    dificultad: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    tema_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Obtener histórico de sopas generadas, filtrable por dificultad y paginado por cursor."""
+    query = select(SopaGenerada)
+    if tema_id:
+        query = query.where(SopaGenerada.tema_id == tema_id)
+    if dificultad:
+        query = query.where(SopaGenerada.dificultad == dificultad)
+    if min_score is not None:
+        query = query.where(SopaGenerada.dificultad_score >= min_score)
+    if max_score is not None:
+        query = query.where(SopaGenerada.dificultad_score <= max_score)
+    sopas = await paginar(db, query, SopaGenerada, cursor, limit, request, response, default_limit=50)
+    return [sopa_to_response(sopa) for sopa in sopas]
 
 @app.get("/api/db/sopas/{sopa_id}", response_model=SopaGeneradaResponse)
-def get_sopa_generada(sopa_id: str, db: Session = Depends(get_db)):
+async def get_sopa_generada(sopa_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener una sopa generada específica."""
-    sopa = db.query(SopaGenerada).filter(SopaGenerada.id == sopa_id).first()
+    sopa = await db.get(SopaGenerada, sopa_id)
     if not sopa:
         raise HTTPException(status_code=404, detail="Sopa no encontrada")
 
-    return SopaGeneradaResponse(
-        id=sopa.id,
-        tema_id=sopa.tema_id,
-        palabras=sopa.palabras,
-        grid=sopa.grid,
-        word_positions=sopa.word_positions,
-        grid_size=sopa.grid_size,
-        dificultad=sopa.dificultad,
-        tiempo_generacion=sopa.tiempo_generacion,
-        compartible=sopa.compartible,
-        enlace_publico=sopa.enlace_publico,
-        created_at=sopa.created_at.isoformat()
-    )
+    return sopa_to_response(sopa)
 
 @app.get("/api/public/sopas/{enlace}", response_model=SopaGeneradaResponse)
-def get_sopa_publica(enlace: str, db: Session = Depends(get_db)):
+async def get_sopa_publica(enlace: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener una sopa compartible por enlace público."""
-    sopa = db.query(SopaGenerada).filter(
+    sopa = await db.scalar(select(SopaGenerada).where(
         SopaGenerada.enlace_publico == enlace,
         SopaGenerada.compartible == True
-    ).first()
+    ))
 
     if not sopa:
         raise HTTPException(status_code=404, detail="Sopa no encontrada o no compartible")
 
-    return SopaGeneradaResponse(
-        id=sopa.id,
-        tema_id=sopa.tema_id,
-        palabras=sopa.palabras,
-        grid=sopa.grid,
-        word_positions=sopa.word_positions,
-        grid_size=sopa.grid_size,
-        dificultad=sopa.dificultad,
-        tiempo_generacion=sopa.tiempo_generacion,
-        compartible=sopa.compartible,
-        enlace_publico=sopa.enlace_publico,
-        created_at=sopa.created_at.isoformat()
-    )
+    return sopa_to_response(sopa)
 
 # ==================== LIBROS (BASE DE DATOS) ====================
 
 @app.get("/api/db/libros", response_model=List[LibroResponse])
-def get_libros_db(db: Session = Depends(get_db)):
-    """Obtener todos los libros de la base de datos (excluyendo eliminados)."""
-    libros = db.query(Libro).filter(Libro.deleted_at.is_(None)).all()
+async def get_libros_db(
+    request: Request,
+    response: Response,
+    estado: Optional[str] = None,
+    plantilla: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Obtener los libros de la base de datos (excluyendo eliminados), paginados por cursor."""
+    query = select(Libro).where(Libro.deleted_at.is_(None))
+    if estado:
+        query = query.where(Libro.estado == estado)
+    if plantilla:
+        query = query.where(Libro.plantilla == plantilla)
+    libros = await paginar(db, query, Libro, cursor, limit, request, response)
     return [
         LibroResponse(
             id=libro.id,
@@ -882,10 +811,10 @@ def get_libros_db(db: Session = Depends(get_db)):
     ]
 
 @app.post("/api/db/libros", response_model=LibroResponse)
-def create_libro_db(libro: LibroCreate, db: Session = Depends(get_db)):
+async def create_libro_db(libro: LibroCreate, db: AsyncSession = Depends(get_async_db)):
     """Crear un nuevo libro en la base de datos."""
     # Verificar nombre único
-    existing = db.query(Libro).filter(Libro.nombre == libro.nombre).first()
+    existing = await db.scalar(select(Libro.id).where(Libro.nombre == libro.nombre).limit(1))
     if existing:
         raise HTTPException(status_code=422, detail="Ya existe un libro con ese nombre")
 
@@ -899,8 +828,8 @@ def create_libro_db(libro: LibroCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_libro)
-    db.commit()
-    db.refresh(db_libro)
+    await db.commit()
+    await db.refresh(db_libro)
 
     return LibroResponse(
         id=db_libro.id,
@@ -915,11 +844,9 @@ def create_libro_db(libro: LibroCreate, db: Session = Depends(get_db)):
     )
 
 @app.get("/api/db/libros/{libro_id}", response_model=LibroResponse)
-def get_libro_db(libro_id: str, db: Session = Depends(get_db)):
+async def get_libro_db(libro_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener un libro específico con sus páginas."""
-    libro = db.query(Libro).filter(Libro.id == libro_id).first()
-    if not libro:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
+    libro = await libro_vivo(db, libro_id)
 
     return LibroResponse(
         id=libro.id,
@@ -934,23 +861,19 @@ def get_libro_db(libro_id: str, db: Session = Depends(get_db)):
     )
 
 @app.delete("/api/db/libros/{libro_id}")
-def delete_libro_db(libro_id: str, db: Session = Depends(get_db)):
-    """Eliminar un libro."""
-    libro = db.query(Libro).filter(Libro.id == libro_id).first()
-    if not libro:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
+async def delete_libro_db(libro_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Eliminar un libro (borrado lógico; services.purga lo borra tras la retención)."""
+    libro = await libro_vivo(db, libro_id)
 
-    db.delete(libro)
-    db.commit()
+    libro.deleted_at = datetime.now(timezone.utc)
+    await db.commit()
 
     return {"message": f"Libro '{libro.nombre}' eliminado correctamente"}
 
 @app.post("/api/db/libros/{libro_id}/paginas")
-def create_pagina_db(libro_id: str, pagina: PaginaCreate, db: Session = Depends(get_db)):
+async def create_pagina_db(libro_id: str, pagina: PaginaCreate, db: AsyncSession = Depends(get_async_db)):
     """Crear una nueva página para un libro."""
-    libro = db.query(Libro).filter(Libro.id == libro_id).first()
-    if not libro:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
+    libro = await libro_vivo(db, libro_id)
 
     contenido_data = pagina.contenido_json or {}
 
@@ -965,12 +888,14 @@ def create_pagina_db(libro_id: str, pagina: PaginaCreate, db: Session = Depends(
     )
 
     db.add(db_pagina)
-    db.commit()
-    db.refresh(db_pagina)
+    await db.commit()
+    await db.refresh(db_pagina)
 
     # Actualizar contador de páginas del libro
-    libro.paginas_totales = db.query(PaginaLibro).filter(PaginaLibro.libro_id == libro_id).count()
-    db.commit()
+    libro.paginas_totales = await db.scalar(
+        select(func.count()).select_from(PaginaLibro).where(PaginaLibro.libro_id == libro_id)
+    )
+    await db.commit()
 
     return {
         "id": db_pagina.id,
@@ -981,15 +906,13 @@ def create_pagina_db(libro_id: str, pagina: PaginaCreate, db: Session = Depends(
     }
 
 @app.get("/api/db/libros/{libro_id}/paginas")
-def get_paginas_libro_db(libro_id: str, db: Session = Depends(get_db)):
+async def get_paginas_libro_db(libro_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener todas las páginas de un libro."""
-    libro = db.query(Libro).filter(Libro.id == libro_id).first()
-    if not libro:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
+    libro = await libro_vivo(db, libro_id)
 
-    paginas = (db.query(PaginaLibro)
-                .filter(PaginaLibro.libro_id == libro_id)
-                .order_by(PaginaLibro.numero_pagina).all())
+    paginas = (await db.scalars(select(PaginaLibro)
+                                .where(PaginaLibro.libro_id == libro_id)
+                                .order_by(PaginaLibro.numero_pagina))).all()
 
     return {
         "libro_id": libro_id,
@@ -1003,6 +926,7 @@ def get_paginas_libro_db(libro_id: str, db: Session = Depends(get_db)):
                 "contenido_json": p.contenido_json or None,
                 "estado": p.estado,
                 "elementos_count": p.elementos_count,
+                "imagen_url": blob_url(p.imagen_generada_hash),
                 "created_at": p.created_at.isoformat(),
                 "updated_at": p.updated_at.isoformat()
             }
@@ -1011,50 +935,32 @@ def get_paginas_libro_db(libro_id: str, db: Session = Depends(get_db)):
     }
 
 # ==================== GESTIÓN DE LIBROS CON ITEMS ====================
+# Operaciones por lotes: routers/libro_items.py
 
 @app.get("/api/db/libros/{libro_id}/items", response_model=List[LibroItemResponse])
-def get_libro_items(libro_id: str, db: Session = Depends(get_db)):
+async def get_libro_items(libro_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener todos los items de un libro."""
-    libro = db.query(Libro).filter(Libro.id == libro_id, Libro.deleted_at.is_(None)).first()
+    libro = await db.scalar(select(Libro.id).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
     if not libro:
         raise HTTPException(status_code=404, detail="Libro no encontrado")
 
-    items = (db.query(LibroItem)
-             .filter(LibroItem.libro_id == libro_id)
-             .order_by(LibroItem.orden).all())
-
-    result = []
-    for item in items:
-        result.append(LibroItemResponse(
-            id=item.id,
-            libro_id=item.libro_id,
-            tema_id=item.tema_id,
-            orden=item.orden,
-            configuracion=item.configuracion or {},
-            tema_nombre=item.tema.nombre if item.tema else "Tema desconocido",
-            created_at=item.created_at.isoformat()
-        ))
-
-    return result
+    return await items_de_libro(db, libro_id)
 
 @app.post("/api/db/libros/{libro_id}/items", response_model=LibroItemResponse)
-def add_tema_to_libro(libro_id: str, item: LibroItemCreate, db: Session = Depends(get_db)):
+async def add_tema_to_libro(libro_id: str, item: LibroItemCreate, db: AsyncSession = Depends(get_async_db)):
     """Añadir un tema a un libro como item."""
-    libro = db.query(Libro).filter(Libro.id == libro_id, Libro.deleted_at.is_(None)).first()
+    libro = await db.scalar(select(Libro).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
     if not libro:
         raise HTTPException(status_code=404, detail="Libro no encontrado")
 
-    tema = db.query(Tema).filter(Tema.id == item.tema_id, Tema.deleted_at.is_(None)).first()
+    tema = await db.scalar(select(Tema).where(Tema.id == item.tema_id, Tema.deleted_at.is_(None)))
     if not tema:
         raise HTTPException(status_code=404, detail="Tema no encontrado")
 
     # Obtener el último orden
-    ultimo_orden = (db.query(LibroItem.orden)
-                   .filter(LibroItem.libro_id == libro_id)
-                   .order_by(LibroItem.orden.desc())
-                   .first())
+    ultimo_orden = await db.scalar(select(func.max(LibroItem.orden)).where(LibroItem.libro_id == libro_id))
 
-    nuevo_orden = (ultimo_orden[0] + 1) if ultimo_orden else 0
+    nuevo_orden = (ultimo_orden + 1) if ultimo_orden is not None else 0
 
     db_item = LibroItem(
         libro_id=libro_id,
@@ -1064,8 +970,8 @@ def add_tema_to_libro(libro_id: str, item: LibroItemCreate, db: Session = Depend
     )
 
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
 
     return LibroItemResponse(
         id=db_item.id,
@@ -1077,53 +983,26 @@ def add_tema_to_libro(libro_id: str, item: LibroItemCreate, db: Session = Depend
         created_at=db_item.created_at.isoformat()
     )
 
-@app.put("/api/db/libros/{libro_id}/items/reorder")
-def reorder_libro_items(libro_id: str, nuevos_ordenes: List[Dict[str, int]], db: Session = Depends(get_db)):
-    """Reordenar los items de un libro."""
-    libro = db.query(Libro).filter(Libro.id == libro_id, Libro.deleted_at.is_(None)).first()
-    if not libro:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
-
-    # nuevos_ordenes = [{"item_id": "uuid", "orden": 0}, {"item_id": "uuid", "orden": 1}, ...]
-    for item_data in nuevos_ordenes:
-        item_id = item_data["item_id"]
-        nuevo_orden = item_data["orden"]
-
-        db.query(LibroItem).filter(LibroItem.id == item_id).update({"orden": nuevo_orden})
-
-    db.commit()
-    return {"message": "Items reordenados correctamente"}
-
 @app.delete("/api/db/libros/items/{item_id}")
-def remove_item_from_libro(item_id: str, db: Session = Depends(get_db)):
+async def remove_item_from_libro(item_id: str, db: AsyncSession = Depends(get_async_db)):
     """Eliminar un item de un libro."""
-    item = db.query(LibroItem).filter(LibroItem.id == item_id).first()
+    item = await db.get(LibroItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item no encontrado")
 
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
 
     return {"message": "Item eliminado correctamente"}
 
 @app.get("/api/db/libros/{libro_id}/completo", response_model=LibroConItemsResponse)
-def get_libro_completo(libro_id: str, db: Session = Depends(get_db)):
+async def get_libro_completo(libro_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Obtener un libro completo con todos sus items."""
-    libro = db.query(Libro).filter(Libro.id == libro_id, Libro.deleted_at.is_(None)).first()
+    libro = await db.scalar(select(Libro).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
     if not libro:
         raise HTTPException(status_code=404, detail="Libro no encontrado")
 
-    items = []
-    for item in libro.items:
-        items.append(LibroItemResponse(
-            id=item.id,
-            libro_id=item.libro_id,
-            tema_id=item.tema_id,
-            orden=item.orden,
-            configuracion=item.configuracion or {},
-            tema_nombre=item.tema.nombre if item.tema else "Tema desconocido",
-            created_at=item.created_at.isoformat()
-        ))
+    items = await items_de_libro(db, libro_id)
 
     return LibroConItemsResponse(
         id=libro.id,
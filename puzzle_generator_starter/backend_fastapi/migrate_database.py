@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Script para migrar la base de datos con las nuevas mejoras
+(alembic upgrade head, ver services/migraciones.py)
 """
 
 import os
@@ -13,12 +14,13 @@ sys.path.append(os.path.dirname(__file__))
 def migrate_database():
     """Aplicar migraciones de base de datos con las nuevas mejoras."""
     try:
-        from database import engine, Base, init_database
+        from services.migraciones import actualizar, revision_objetivo
 
         print("🔄 Aplicando migraciones de base de datos...")
 
-        # Crear todas las tablas (esto es seguro, no borra datos existentes)
-        Base.metadata.create_all(bind=engine)
+        # Equivale a `alembic upgrade head`: solo aplica las revisiones pendientes
+        actualizar()
+        print(f"   • Revisión actual: {revision_objetivo()}")
 
         print("✅ Migración completada exitosamente")
         print("\n📋 Mejoras aplicadas:")
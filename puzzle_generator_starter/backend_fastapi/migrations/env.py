@@ -0,0 +1,61 @@
+"""
+Entorno de alembic: modelos y DATABASE_URL de ``database``.
+
+``services.migraciones`` pasa su propia conexión en ``config.attributes``;
+desde la línea de comandos se abre una con ``make_engine``.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import Base, make_engine
+from services.migraciones import incluir_objeto
+
+config = context.config
+
+# Desde la aplicación no se toca la configuración de logging
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+OPCIONES = {
+    "target_metadata": Base.metadata,
+    "include_object": incluir_objeto,
+    "render_as_batch": True,  # SQLite no soporta la mayoría de ALTER TABLE
+}
+
+
+def run_migrations_offline() -> None:
+    """Generar el SQL sin conectarse (``alembic upgrade head --sql``)."""
+    from database import DATABASE_URL  # pylint: disable=import-outside-toplevel
+
+    context.configure(url=config.get_main_option("sqlalchemy.url") or DATABASE_URL,
+                      literal_binds=True, **OPCIONES)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _ejecutar(conexion) -> None:
+    context.configure(connection=conexion, **OPCIONES)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplicar las migraciones sobre una conexión real."""
+    conexion = config.attributes.get("connection")
+    if conexion is not None:
+        _ejecutar(conexion)
+        return
+    engine = make_engine(config.get_main_option("sqlalchemy.url") or None)
+    try:
+        with engine.begin() as conexion:
+            _ejecutar(conexion)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
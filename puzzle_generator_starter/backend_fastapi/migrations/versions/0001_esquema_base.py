@@ -0,0 +1,216 @@
+"""Esquema base: tablas e índices de los modelos de database.py
+
+Revision ID: 0001_esquema_base
+Revises:
+Create Date: 2026-10-19
+
+Las bases creadas antes de las migraciones (``create_all`` al importar
+``database`` más ``add_columns.py``) se adoptan: solo se crean las tablas,
+columnas e índices que faltan, y se borran los índices completos que
+sustituyeron los parciales de filas vivas.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from services import tema_facets, tema_search
+
+revision: str = "0001_esquema_base"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+VIVO = sa.text("deleted_at IS NULL")
+ELIMINADO = sa.text("deleted_at IS NOT NULL")
+
+# Copia congelada del esquema: los cambios futuros de los modelos van en revisiones nuevas
+metadata = sa.MetaData()
+
+
+def _vivo(nombre, *columnas):
+    return sa.Index(nombre, *columnas, sqlite_where=VIVO, postgresql_where=VIVO)
+
+
+def _papelera(nombre):
+    return sa.Index(nombre, "deleted_at", sqlite_where=ELIMINADO, postgresql_where=ELIMINADO)
+
+
+def _fechas():
+    return (
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+
+sa.Table(
+    "temas", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("nombre", sa.String(255), nullable=False),
+    sa.Column("descripcion", sa.Text),
+    sa.Column("palabras", JSON, nullable=False),
+    sa.Column("imagen_principal", sa.LargeBinary),
+    sa.Column("icono", sa.LargeBinary),
+    sa.Column("imagen_principal_hash", sa.String(64)),
+    sa.Column("icono_hash", sa.String(64)),
+    sa.Column("categoria", sa.String(100)),
+    sa.Column("etiquetas", JSON),
+    sa.Column("dificultad", sa.String(20)),
+    sa.Column("es_publico", sa.Boolean, server_default=sa.false()),
+    *_fechas(),
+    sa.Column("deleted_at", sa.DateTime(timezone=True)),
+    _vivo("ix_tema_vivo_nombre", "nombre"),
+    _vivo("ix_tema_vivo_facetas", "categoria", "dificultad", "es_publico", "id"),
+    _vivo("ix_tema_vivo_dificultad", "dificultad"),
+    sa.Index("ix_tema_es_publico", "es_publico"),
+    _vivo("ix_tema_vivo_created_id", "created_at", "id"),
+    _papelera("ix_tema_papelera"),
+)
+
+sa.Table(
+    "recursos_tema", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("tema_id", sa.String(36), sa.ForeignKey("temas.id"), nullable=False),
+    sa.Column("tipo", sa.String(50), nullable=False),
+    sa.Column("url_o_ruta", sa.String(1024), nullable=False),
+    sa.Column("metadata_json", JSON),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+)
+
+sa.Table(
+    "libros", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("nombre", sa.String(255), nullable=False),
+    sa.Column("descripcion", sa.Text),
+    sa.Column("plantilla", sa.String(100)),
+    sa.Column("estado", sa.String(50)),
+    sa.Column("progreso_creacion", sa.Float),
+    sa.Column("paginas_totales", sa.Integer),
+    *_fechas(),
+    sa.Column("deleted_at", sa.DateTime(timezone=True)),
+    _vivo("ix_libro_vivo_estado", "estado", "created_at", "id"),
+    _vivo("ix_libro_vivo_plantilla", "plantilla", "created_at", "id"),
+    _vivo("ix_libro_vivo_created_id", "created_at", "id"),
+    _papelera("ix_libro_papelera"),
+)
+
+sa.Table(
+    "paginas_libro", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("libro_id", sa.String(36), sa.ForeignKey("libros.id"), nullable=False),
+    sa.Column("numero_pagina", sa.Integer, nullable=False),
+    sa.Column("tipo_pagina", sa.String(50)),
+    sa.Column("estado", sa.String(50)),
+    sa.Column("titulo", sa.String(255)),
+    sa.Column("tema_id", sa.String(36), sa.ForeignKey("temas.id")),
+    sa.Column("contenido_json", JSON),
+    sa.Column("imagen_generada", sa.LargeBinary),
+    sa.Column("imagen_generada_hash", sa.String(64)),
+    sa.Column("tiempo_generacion", sa.Float),
+    sa.Column("elementos_count", sa.Integer),
+    *_fechas(),
+)
+
+sa.Table(
+    "recursos_pagina", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("pagina_id", sa.String(36), sa.ForeignKey("paginas_libro.id"), nullable=False),
+    sa.Column("tipo", sa.String(50), nullable=False),
+    sa.Column("url_o_ruta", sa.String(1024), nullable=False),
+    sa.Column("posiciones", JSON),
+    sa.Column("metadata_json", JSON),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+)
+
+sa.Table(
+    "sopas_generadas", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("tema_id", sa.String(36), sa.ForeignKey("temas.id")),
+    sa.Column("palabras", JSON, nullable=False),
+    sa.Column("grid", JSON, nullable=False),
+    sa.Column("word_positions", JSON, nullable=False),
+    sa.Column("grid_size", sa.Integer),
+    sa.Column("dificultad", sa.String(20)),
+    sa.Column("dificultad_score", sa.Float),
+    sa.Column("metricas", JSON),
+    sa.Column("tiempo_generacion", sa.Float),
+    sa.Column("content_hash", sa.String(64)),
+    sa.Column("compartible", sa.Boolean),
+    sa.Column("enlace_publico", sa.String(255), unique=True),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+    sa.Index("ix_sopa_tema_id", "tema_id"),
+    sa.Index("ix_sopa_dificultad", "dificultad"),
+    sa.Index("ix_sopa_dificultad_score", "dificultad_score"),
+    sa.Index("ix_sopa_compartible", "compartible"),
+    sa.Index("ix_sopa_enlace_publico", "enlace_publico"),
+    sa.Index("ux_sopa_content_hash", "content_hash", unique=True),
+    sa.Index("ix_sopa_created_id", "created_at", "id"),
+)
+
+sa.Table(
+    "libro_items", metadata,
+    sa.Column("id", sa.String(36), primary_key=True),
+    sa.Column("libro_id", sa.String(36), sa.ForeignKey("libros.id"), nullable=False),
+    sa.Column("tema_id", sa.String(36), sa.ForeignKey("temas.id"), nullable=False),
+    sa.Column("orden", sa.Integer),
+    sa.Column("configuracion", JSON),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+    sa.Index("ix_libro_item_libro_id", "libro_id"),
+    sa.Index("ix_libro_item_tema_id", "tema_id"),
+    sa.Index("ix_libro_item_orden", "orden"),
+)
+
+# Índices completos de bases antiguas, sustituidos por los parciales
+SUSTITUIDOS = {
+    "temas": ("ix_tema_nombre", "ix_tema_categoria", "ix_tema_dificultad", "ix_tema_deleted_at",
+              "ix_tema_created_id", "ix_tema_facetas"),
+    "libros": ("ix_libro_estado", "ix_libro_plantilla", "ix_libro_deleted_at", "ix_libro_created_id"),
+}
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        # --sql: sin conexión no se puede inspeccionar; se emiten tablas e índices
+        # (sin búsqueda ni etiquetas: sus triggers se instalan solo con conexión real)
+        for tabla in metadata.sorted_tables:
+            op.execute(CreateTable(tabla))
+            for indice in sorted(tabla.indexes, key=lambda i: i.name):
+                op.execute(CreateIndex(indice))
+        return
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existentes = set(inspector.get_table_names())
+    for tabla in metadata.sorted_tables:
+        if tabla.name not in existentes:
+            tabla.create(bind)
+            continue
+        columnas = {c["name"] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name not in columnas:
+                default = columna.server_default.arg if columna.server_default is not None else None
+                op.add_column(tabla.name, sa.Column(columna.name, columna.type, server_default=default))
+        indices = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for nombre in SUSTITUIDOS.get(tabla.name, ()):
+            if nombre in indices:
+                op.drop_index(nombre, table_name=tabla.name)
+        for indice in tabla.indexes:
+            if indice.name not in indices:
+                indice.create(bind)
+    # Búsqueda de texto completo y etiquetas (triggers incluidos); rellena si están vacías
+    tema_search.instalar(bind)
+    tema_facets.instalar(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for tabla in ("temas_fts", "temas_fts_ids", "tema_etiquetas"):
+            op.execute(f"DROP TABLE IF EXISTS {tabla}")
+    for tabla in reversed(metadata.sorted_tables):
+        tabla.drop(bind, checkfirst=True)
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS temas_search_vector()")
+        op.execute("DROP FUNCTION IF EXISTS sopa_sin_acentos(text)")
@@ -0,0 +1,109 @@
+# backend_fastapi/routers/comun.py
+"""
+Utilidades de los endpoints /api/db compartidas por main.py y los routers:
+respuestas de temas, paginación por cursor y búsquedas de filas vivas.
+"""
+
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Libro, LibroItem, Tema
+from schemas import LibroItemResponse, TemaResponse
+from services.pagination import CursorInvalido, keyset, page_size, split_page
+
+
+def blob_url(digest: Optional[str]) -> Optional[str]:
+    """URL de descarga de un binario del almacén, o ``None``."""
+    return f"/api/blobs/{digest}" if digest else None
+
+
+def tema_to_response(tema: Tema) -> TemaResponse:
+    """Construir la respuesta de API de un tema."""
+    return TemaResponse(
+        id=tema.id,
+        nombre=tema.nombre,
+        descripcion=tema.descripcion,
+        palabras=tema.palabras or [],
+        categoria=tema.categoria,
+        etiquetas=tema.etiquetas or [],
+        dificultad=tema.dificultad,
+        imagen_principal_url=blob_url(tema.imagen_principal_hash),
+        icono_url=blob_url(tema.icono_hash),
+        created_at=tema.created_at.isoformat(),
+        updated_at=tema.updated_at.isoformat(),
+    )
+
+
+async def paginar(db: AsyncSession, query, modelo, cursor: Optional[str], limit: Optional[int],
+                  request: Request, response: Response, default_limit: Optional[int] = None) -> list:
+    """Ejecutar una consulta paginada por clave y anunciar la siguiente página.
+
+    El cuerpo sigue siendo la lista de elementos; el cursor de la siguiente
+    página va en ``X-Next-Cursor`` y en ``Link: <...>; rel="next"``. Sin
+    ``limit``, ``cursor`` ni ``default_limit`` se devuelve la lista completa,
+    como antes de paginar: los clientes que no siguen el cursor no pierden filas.
+    """
+    if limit is None and not cursor and default_limit is None:
+        return (await db.scalars(query.order_by(modelo.created_at.desc(), modelo.id.desc()))).all()
+    tamano = page_size(limit, default_limit)
+    try:
+        query = keyset(query, modelo, cursor, tamano)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    filas, siguiente = split_page((await db.scalars(query)).all(), tamano)
+    anunciar_siguiente(request, response, siguiente)
+    return filas
+
+
+def anunciar_siguiente(request: Request, response: Response, siguiente: Optional[str]) -> None:
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=siguiente)}>; rel="next"'
+
+
+# Borrado lógico: DELETE solo marca deleted_at y services.purga borra de verdad tras la
+# retención, así que toda búsqueda por id ignora las filas eliminadas.
+async def tema_vivo(db: AsyncSession, tema_id: str) -> Tema:
+    """Tema no eliminado o 404."""
+    tema = await db.scalar(select(Tema).where(Tema.id == tema_id, Tema.deleted_at.is_(None)))
+    if not tema:
+        raise HTTPException(status_code=404, detail="Tema no encontrado")
+    return tema
+
+
+async def libro_vivo(db: AsyncSession, libro_id: str) -> Libro:
+    """Libro no eliminado o 404."""
+    libro = await db.scalar(select(Libro).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
+    if not libro:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+    return libro
+
+
+async def items_de_libro(db: AsyncSession, libro_id: str) -> List[LibroItemResponse]:
+    """Items de un libro con el nombre de su tema en una sola consulta.
+
+    Solo se proyecta ``Tema.nombre``: cargar la entidad completa traería también
+    las imágenes del tema (columnas binarias) para cada item. Los items de temas
+    eliminados se ocultan, como cuando el borrado se los llevaba en cascada.
+    """
+    filas = await db.execute(
+        select(LibroItem, Tema.nombre)
+        .join(Tema, (Tema.id == LibroItem.tema_id) & Tema.deleted_at.is_(None))
+        .where(LibroItem.libro_id == libro_id)
+        .order_by(LibroItem.orden)
+    )
+    return [
+        LibroItemResponse(
+            id=item.id,
+            libro_id=item.libro_id,
+            tema_id=item.tema_id,
+            orden=item.orden,
+            configuracion=item.configuracion or {},
+            tema_nombre=tema_nombre or "Tema desconocido",
+            created_at=item.created_at.isoformat()
+        )
+        for item, tema_nombre in filas
+    ]
@@ -1,17 +1,43 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
+import asyncio
+import json
+import random
 import sys
 import os
+import time
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from services.sopa_generator import WordSearchGenerator  # noqa: E402
-from database import get_db, Tema  # noqa: E402
-from sqlalchemy.orm import Session  # noqa: E402
+from services.sopa_generator import (  # noqa: E402
+    CONTAINED_MODES,
+    PalabrasPreparadas,
+    firma_disposicion,
+    generar_sopa,
+    generar_variantes,
+    semillas_de_variantes,
+)
+from services.generation_pool import generation_pool  # noqa: E402
+from services.admission import AdmissionController, AdmissionRejected, ClientGone, INTERACTIVE  # noqa: E402
+from services.result_cache import canonical_key, result_cache, tema_tag  # noqa: E402
+from services.single_flight import SingleFlight  # noqa: E402
+from services.corpus import get_corpus  # noqa: E402
+from database import get_async_db, Tema  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
 
 router = APIRouter(prefix="/api/diagramacion", tags=["diagramacion"])
 
+# Generaciones idénticas concurrentes comparten una única ejecución
+generaciones_en_curso = SingleFlight()
+
+# Cola de admisión delante del pool: editores interactivos antes que lotes de libros
+admision = AdmissionController.from_env(default_concurrency=max(1, generation_pool.max_workers))
+
+MAX_VARIANTES = 100
+
 class GenerateRequest(BaseModel):
     tema_id: Optional[str] = None
     palabras: Optional[List[str]] = None
@@ -23,20 +49,192 @@ class GenerateRequest(BaseModel):
     word_box_columns: Optional[int] = 3
     word_box_numbered: Optional[bool] = True
     word_box_position: Optional[str] = "bottom"
+    seed: Optional[int] = None
+    priority: Optional[str] = None  # "interactive" (por defecto) o "batch"
+    variants: Optional[int] = None  # K disposiciones distintas de la misma lista
+    contained_words: Optional[str] = "warn"  # "warn", "drop" u "overlap" (p. ej. SOL en GIRASOL)
 
 @router.post("/generate")
-async def generar_sopa_de_letras(request: GenerateRequest, db: Session = Depends(get_db)):
+async def generar_sopa_de_letras(
+    request: GenerateRequest,
+    http_request: Request,
+    x_priority: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    palabras_entrada, grid_size_val = await _preparar_entrada(request, db)
+    variantes = request.variants or 1
+    if not 1 <= variantes <= MAX_VARIANTES:
+        raise HTTPException(status_code=422, detail=f"variants debe estar entre 1 y {MAX_VARIANTES}")
+
+    # Solo las peticiones con semilla explícita son deterministas y, por tanto, cacheables
+    clave = _clave_generacion(request, palabras_entrada, grid_size_val, variantes)
+    cache_key = clave if request.seed is not None else None
+    cache_tag = tema_tag(request.tema_id) if request.tema_id else None
+
+    carril = (request.priority or x_priority or INTERACTIVE).strip().lower()
+    try:
+        resultado = await result_cache.aget(cache_key) if cache_key else None
+        if resultado is None:
+            def trabajo():
+                if variantes > 1:
+                    return _generar_variantes(
+                        palabras_entrada, variantes, grid_size_val, request, cache_key, cache_tag, carril
+                    )
+                return _generar(palabras_entrada, grid_size_val, request, cache_key, cache_tag)
+
+            if not generaciones_en_curso.in_flight(clave):
+                await admision.acquire(carril, http_request.is_disconnected)
+                hueco = _HuecoAdmitido(carril)
+                if generaciones_en_curso.in_flight(clave):
+                    # Otra petición lanzó la misma generación mientras esperábamos en cola
+                    hueco.liberar()
+                else:
+                    trabajo = _con_hueco(trabajo, hueco)
+            # Unirse a una generación ya admitida no consume capacidad
+            resultado = await generaciones_en_curso.do(clave, trabajo)
+            # El resultado puede estar compartido con otras peticiones coalescidas
+            resultado = dict(resultado)
+        return _con_presentacion(resultado, request)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ClientGone as e:
+        raise HTTPException(status_code=499, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generando la sopa: {str(e)}")
+
+
+@router.post("/generate/stream")
+async def generar_sopa_con_progreso(
+    request: GenerateRequest,
+    http_request: Request,
+    x_priority: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Generar la sopa emitiendo Server-Sent Events.
+
+    Eventos: ``progreso`` (tamaño de grilla, intento, palabras colocadas),
+    ``resultado`` (la misma respuesta que ``/generate``) o ``error``. Cerrar la
+    conexión cancela la generación y libera el proceso del pool.
+    """
+    palabras_entrada, grid_size_val = await _preparar_entrada(request, db)
+    cache_key = (_clave_generacion(request, palabras_entrada, grid_size_val)
+                 if request.seed is not None else None)
+    cache_tag = tema_tag(request.tema_id) if request.tema_id else None
+
+    resultado = await result_cache.aget(cache_key) if cache_key else None
+    carril = (request.priority or x_priority or INTERACTIVE).strip().lower()
+    hueco = None
+    if resultado is None:
+        # La admisión se resuelve antes de abrir el stream para poder responder 503
+        try:
+            await admision.acquire(carril, http_request.is_disconnected)
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except ClientGone as e:
+            raise HTTPException(status_code=499, detail=str(e))
+        hueco = _HuecoAdmitido(carril)
+
+    async def eventos():
+        if resultado is not None:
+            yield _evento_sse("resultado", _con_presentacion(dict(resultado), request))
+            return
+        hueco.inicio = time.perf_counter()
+        try:
+            async for tipo, dato in generation_pool.stream(
+                generar_sopa, palabras_entrada, grid_size_val, request.allow_diagonal,
+                request.allow_reverse, request.seed, request.contained_words,
+            ):
+                if tipo == "resultado":
+                    if cache_key and dato.get("success"):
+                        await result_cache.aset(cache_key, dato, tag=cache_tag)
+                    dato = _con_presentacion(dict(dato), request)
+                yield _evento_sse(tipo, dato)
+        except Exception as e:  # pylint: disable=broad-except
+            yield _evento_sse("error", {"detail": f"Error generando la sopa: {str(e)}"})
+        finally:
+            hueco.liberar()
+
+    return _StreamConHueco(
+        eventos(),
+        hueco,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class _HuecoAdmitido:
+    """Hueco de admisión ya adquirido que se libera una sola vez."""
+
+    def __init__(self, carril: str):
+        self.carril = carril
+        self.inicio: Optional[float] = None
+        self._liberado = False
+
+    def liberar(self) -> None:
+        if self._liberado:
+            return
+        self._liberado = True
+        servicio = time.perf_counter() - self.inicio if self.inicio is not None else None
+        admision.release(self.carril, servicio)
+
+
+def _con_hueco(trabajo, hueco: _HuecoAdmitido):
+    """Atar el hueco a la tarea coalescida y no a la petición que la lanzó.
+
+    La tarea sigue corriendo aunque ese solicitante se cancele o desconecte, y
+    otros se unen a ella sin hueco propio: el hueco debe durar lo que la tarea.
+    """
+    async def ejecutar():
+        hueco.inicio = time.perf_counter()
+        try:
+            return await trabajo()
+        finally:
+            hueco.liberar()
+
+    return ejecutar
+
+
+class _StreamConHueco(StreamingResponse):
+    """StreamingResponse que libera el hueco aunque el cuerpo nunca se llegue a recorrer.
+
+    Si el cliente se va antes del primer envío o falla el inicio de la respuesta,
+    el generador no arranca y su ``finally`` no se ejecuta; este ``finally`` sí.
+    """
+
+    def __init__(self, contenido, hueco: Optional[_HuecoAdmitido], **kwargs):
+        super().__init__(contenido, **kwargs)
+        self.hueco = hueco
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.hueco is not None:
+                self.hueco.liberar()
+
+
+def _evento_sse(tipo: str, datos: dict) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+async def _preparar_entrada(request: GenerateRequest, db: AsyncSession) -> Tuple[List[str], Optional[int]]:
+    """Palabras a colocar y tamaño de grilla pedido, o HTTPException si la entrada no es válida."""
+    if request.contained_words not in CONTAINED_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"contained_words debe ser uno de: {', '.join(CONTAINED_MODES)}",
+        )
     palabras_entrada: List[str] = []
 
     if request.tema_id:
-        tema = db.query(Tema).filter(Tema.id == request.tema_id, Tema.deleted_at.is_(None)).first()
-        if not tema:
+        palabras_tema = await _palabras_del_tema(db, request.tema_id)
+        if palabras_tema is None:
             raise HTTPException(status_code=404, detail="Tema no encontrado")
-        if not tema.palabras:
+        if not palabras_tema:
             raise HTTPException(status_code=422, detail="El tema no tiene palabras")
         palabras_entrada = [
             p.get("texto", "").strip() if isinstance(p, dict) else str(p).strip()
-            for p in tema.palabras
+            for p in palabras_tema
         ]
     elif request.palabras:
         palabras_entrada = [p.strip() for p in request.palabras]
@@ -65,21 +263,176 @@ async def generar_sopa_de_letras(request: GenerateRequest, db: Session = Depends
             except ValueError:
                 grid_size_val = None
 
+    return palabras_entrada, grid_size_val
+
+
+def _clave_generacion(
+    request: GenerateRequest, palabras: List[str], grid_size: Optional[int], variantes: int = 1
+) -> str:
+    """Clave canónica de los parámetros que determinan el resultado."""
+    parametros = {
+        "palabras": palabras,
+        "grid_size": grid_size,
+        "allow_diagonal": request.allow_diagonal,
+        "allow_reverse": request.allow_reverse,
+        "seed": request.seed,
+    }
+    # Solo se añaden si difieren del valor por defecto, para conservar las claves existentes
+    if variantes > 1:
+        parametros["variants"] = variantes
+    if request.contained_words != "warn":
+        parametros["contained_words"] = request.contained_words
+    return canonical_key(parametros)
+
+
+def _con_presentacion(resultado: dict, request: GenerateRequest) -> dict:
+    """Añadir al resultado las opciones de presentación de la petición."""
+    resultado["title"] = request.title
+    resultado["word_box_style"] = request.word_box_style
+    resultado["word_box_columns"] = request.word_box_columns
+    resultado["word_box_numbered"] = request.word_box_numbered
+    resultado["word_box_position"] = request.word_box_position
+    return resultado
+
+
+async def _palabras_del_tema(db: AsyncSession, tema_id: str) -> Optional[list]:
+    """Palabras de un tema activo, o ``None`` si no existe."""
+    fila = (await db.execute(
+        select(Tema.palabras).where(Tema.id == tema_id, Tema.deleted_at.is_(None)).limit(1)
+    )).first()
+    return None if fila is None else (fila[0] or [])
+
+
+async def _generar(
+    palabras: List[str],
+    grid_size: Optional[int],
+    request: GenerateRequest,
+    cache_key: Optional[str],
+    cache_tag: Optional[str],
+) -> dict:
+    """Generar la sopa en el pool de procesos y cachearla si la petición es determinista."""
+    resultado = await generation_pool.run(
+        generar_sopa, palabras, grid_size, request.allow_diagonal,
+        request.allow_reverse, request.seed, request.contained_words,
+    )
+    if cache_key and resultado.get("success"):
+        await result_cache.aset(cache_key, resultado, tag=cache_tag)
+    return resultado
+
+
+async def _generar_variantes(
+    palabras: List[str],
+    cantidad: int,
+    grid_size: Optional[int],
+    request: GenerateRequest,
+    cache_key: Optional[str],
+    cache_tag: Optional[str],
+    carril: str = INTERACTIVE,
+) -> dict:
+    """Generar ``cantidad`` disposiciones distintas repartidas entre los procesos del pool.
+
+    La lista se prepara una vez y se envía a cada proceso; las variantes con la
+    misma colocación de palabras se descartan y se reemplazan con nuevas semillas.
+
+    La petición ya ocupa un hueco de admisión; solo se reparte en más procesos
+    si hay huecos libres sin nadie en cola, y se ocupa uno por proceso extra.
+    """
+    extra = 0
+    while extra < generation_pool.max_workers - 1 and extra < cantidad - 1 and admision.try_acquire(carril):
+        extra += 1
     try:
-        generator = WordSearchGenerator(
-            palabras_entrada,
-            grid_size=grid_size_val,
-            allow_diagonal=request.allow_diagonal,
-            allow_reverse=request.allow_reverse,
-        )
-        resultado = generator.generate()
-        resultado["grid_size"] = resultado.get("tamaño", generator.grid_size)
-        resultado["tamaño"] = resultado.get("tamaño", generator.grid_size)
-        resultado["title"] = request.title
-        resultado["word_box_style"] = request.word_box_style
-        resultado["word_box_columns"] = request.word_box_columns
-        resultado["word_box_numbered"] = request.word_box_numbered
-        resultado["word_box_position"] = request.word_box_position
-        return resultado
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando la sopa: {str(e)}")
+        return await _repartir_variantes(palabras, cantidad, grid_size, request, cache_key, cache_tag, 1 + extra)
+    finally:
+        for _ in range(extra):
+            admision.release(carril)
+
+
+async def _repartir_variantes(
+    palabras: List[str],
+    cantidad: int,
+    grid_size: Optional[int],
+    request: GenerateRequest,
+    cache_key: Optional[str],
+    cache_tag: Optional[str],
+    procesos: int,
+) -> dict:
+    """Generar las variantes en ``procesos`` trabajos simultáneos del pool."""
+    preparadas = PalabrasPreparadas(palabras)
+    base_seed = request.seed if request.seed is not None else random.randrange(2 ** 32)
+
+    variantes: List[dict] = []
+    firmas = set()
+    siguiente = 0
+    while len(variantes) < cantidad and siguiente < cantidad * 3:
+        semillas = semillas_de_variantes(base_seed, siguiente, cantidad - len(variantes))
+        siguiente += len(semillas)
+        lotes = await asyncio.gather(*[
+            generation_pool.run(generar_variantes, preparadas, semillas[i::procesos], grid_size,
+                                request.allow_diagonal, request.allow_reverse, request.contained_words)
+            for i in range(min(procesos, len(semillas)))
+        ])
+        # Intercalar los lotes de vuelta para conservar el orden de las semillas
+        ordenados: List[dict] = [{}] * len(semillas)
+        for i, lote in enumerate(lotes):
+            ordenados[i::procesos] = lote
+        for resultado in ordenados:
+            if not resultado.get("success"):
+                return resultado
+            firma = firma_disposicion(resultado)
+            if firma not in firmas:
+                firmas.add(firma)
+                variantes.append(resultado)
+
+    if len(variantes) < cantidad:
+        return {
+            "success": False,
+            "error": f"Solo se pudieron generar {len(variantes)} variantes distintas con estas palabras",
+        }
+    resultado = {"success": True, "seed": base_seed, "total": len(variantes), "variantes": variantes}
+    if cache_key:
+        await result_cache.aset(cache_key, resultado, tag=cache_tag)
+    return resultado
+
+
+@router.get("/cache/stats")
+def estadisticas_cache():
+    """Métricas de la caché de resultados (aciertos, expulsiones, tamaño)."""
+    return result_cache.stats()
+
+
+@router.get("/pool/stats")
+def estadisticas_pool():
+    """Profundidad de cola y tiempos de ejecución del pool de generación."""
+    return generation_pool.stats()
+
+
+@router.get("/admission/stats")
+def estadisticas_admision():
+    """Ocupación y colas por carril del control de admisión."""
+    return admision.stats()
+
+
+@router.get("/inflight/stats")
+def estadisticas_coalescencia():
+    """Métricas de coalescencia de generaciones concurrentes idénticas."""
+    return generaciones_en_curso.stats()
+
+
+@router.get("/corpus/random")
+def sopa_aleatoria_del_corpus():
+    """Sopa pregenerada aleatoria del corpus binario (SOPA_CORPUS_PATH)."""
+    corpus = get_corpus()
+    if corpus is None or len(corpus) == 0:
+        raise HTTPException(status_code=404, detail="No hay corpus de sopas configurado")
+    return corpus[random.randrange(len(corpus))]
+
+
+@router.get("/corpus/{indice}")
+def sopa_del_corpus(indice: int):
+    """Sopa pregenerada número ``indice`` del corpus binario."""
+    corpus = get_corpus()
+    if corpus is None:
+        raise HTTPException(status_code=404, detail="No hay corpus de sopas configurado")
+    if not 0 <= indice < len(corpus):
+        raise HTTPException(status_code=404, detail="Sopa no encontrada en el corpus")
+    return corpus[indice]
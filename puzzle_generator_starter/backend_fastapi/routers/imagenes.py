@@ -0,0 +1,91 @@
+# backend_fastapi/routers/imagenes.py
+"""
+Imágenes de temas y páginas en el almacén de binarios (services.blob_store).
+"""
+
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import PaginaLibro, get_async_db
+from routers.comun import blob_url, tema_to_response, tema_vivo
+from schemas import TemaResponse
+from services.blob_store import cabeceras_descarga, get_blob_store, tipo_mime
+
+router = APIRouter(tags=["imagenes"])
+
+# Tamaño máximo de una imagen subida
+BLOB_MAX_BYTES = int(os.getenv("SOPA_BLOB_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Columna de hash de cada tipo de imagen de un tema
+IMAGENES_TEMA = {"principal": "imagen_principal_hash", "icono": "icono_hash"}
+
+
+async def _subir_blob(request: Request) -> str:
+    """Guardar el cuerpo de la petición en el almacén y devolver su hash."""
+    try:
+        digest = await get_blob_store().put_async(request.stream(), max_bytes=BLOB_MAX_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
+    return digest
+
+
+@router.get("/api/blobs/{digest}")
+def get_blob(digest: str, request: Request):
+    """Descargar un binario por su hash (admite Range y caché inmutable)."""
+    store = get_blob_store()
+    if not store.exists(digest):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    # El nombre es el hash del contenido: nunca cambia, se puede cachear para siempre
+    cabeceras = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable",
+                 "X-Content-Type-Options": "nosniff"}
+    if request.headers.get("if-none-match") in (f'"{digest}"', digest, "*"):
+        return Response(status_code=304, headers=cabeceras)
+
+    ruta = store.path(digest)
+    with open(ruta, "rb") as archivo:
+        media_type = tipo_mime(archivo.read(512))
+    # SVG y demás tipos no rasterizados: descarga sin ejecutar nada (evita XSS en este origen)
+    cabeceras.update(cabeceras_descarga(media_type))
+    return FileResponse(ruta, media_type=media_type, headers=cabeceras)
+
+
+@router.put("/api/db/temas/{tema_id}/imagenes/{tipo}", response_model=TemaResponse)
+async def put_imagen_tema(tema_id: str, tipo: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Subir la imagen principal o el icono de un tema (cuerpo binario)."""
+    if tipo not in IMAGENES_TEMA:
+        raise HTTPException(status_code=404, detail=f"Tipo de imagen desconocido: {tipo}")
+    tema = await tema_vivo(db, tema_id)
+
+    setattr(tema, IMAGENES_TEMA[tipo], await _subir_blob(request))
+    await db.commit()
+    await db.refresh(tema)
+    return tema_to_response(tema)
+
+
+@router.delete("/api/db/temas/{tema_id}/imagenes/{tipo}", response_model=TemaResponse)
+async def delete_imagen_tema(tema_id: str, tipo: str, db: AsyncSession = Depends(get_async_db)):
+    """Quitar una imagen de un tema (el archivo queda: otros temas pueden compartirlo)."""
+    if tipo not in IMAGENES_TEMA:
+        raise HTTPException(status_code=404, detail=f"Tipo de imagen desconocido: {tipo}")
+    tema = await tema_vivo(db, tema_id)
+
+    setattr(tema, IMAGENES_TEMA[tipo], None)
+    await db.commit()
+    await db.refresh(tema)
+    return tema_to_response(tema)
+
+
+@router.put("/api/db/libros/{libro_id}/paginas/{pagina_id}/imagen")
+async def put_imagenpaginar(libro_id: str, pagina_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Subir el render de una página (cuerpo binario)."""
+    pagina = await db.get(PaginaLibro, pagina_id)
+    if not pagina or pagina.libro_id != libro_id:
+        raise HTTPException(status_code=404, detail="Página no encontrada")
+
+    pagina.imagen_generada_hash = await _subir_blob(request)
+    await db.commit()
+    return {"id": pagina.id, "imagen_url": blob_url(pagina.imagen_generada_hash)}
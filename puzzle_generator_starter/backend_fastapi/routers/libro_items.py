@@ -0,0 +1,125 @@
+# backend_fastapi/routers/libro_items.py
+"""
+Operaciones por lotes sobre los items de un libro: añadir, reordenar y quitar
+varios a la vez con una sola sentencia cada una.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any, List
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Libro, LibroItem, Tema, get_async_db
+from schemas import LibroItemCreate, LibroItemOrden, LibroItemResponse
+
+router = APIRouter(tags=["libros"])
+
+MAX_ITEMS_POR_LOTE = int(os.getenv("SOPA_MAX_ITEMS_LOTE", "1000"))
+
+
+def _validar_lote(elementos: List[Any]) -> None:
+    """422 si una operación por lotes viene vacía o supera ``MAX_ITEMS_POR_LOTE``."""
+    if not elementos:
+        raise HTTPException(status_code=422, detail="La lista está vacía")
+    if len(elementos) > MAX_ITEMS_POR_LOTE:
+        raise HTTPException(status_code=422, detail=f"Máximo {MAX_ITEMS_POR_LOTE} elementos por lote")
+
+
+@router.post("/api/db/libros/{libro_id}/items/batch", response_model=List[LibroItemResponse])
+async def add_temas_to_libro(
+    libro_id: str, items: List[LibroItemCreate], db: AsyncSession = Depends(get_async_db)
+):
+    """Añadir varios temas a un libro en una sola transacción.
+
+    Los temas se validan con una única consulta ``IN`` y los items se insertan
+    con un solo ``INSERT``, a continuación del último orden del libro.
+    """
+    _validar_lote(items)
+    libro = await db.scalar(select(Libro.id).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
+    if not libro:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    tema_ids = {item.tema_id for item in items}
+    nombres = dict((await db.execute(
+        select(Tema.id, Tema.nombre).where(Tema.id.in_(tema_ids), Tema.deleted_at.is_(None))
+    )).all())
+    faltantes = sorted(tema_ids - nombres.keys())
+    if faltantes:
+        raise HTTPException(status_code=404, detail={"message": "Tema no encontrado", "tema_ids": faltantes})
+
+    ultimo_orden = await db.scalar(select(func.max(LibroItem.orden)).where(LibroItem.libro_id == libro_id))
+    inicio = (ultimo_orden + 1) if ultimo_orden is not None else 0
+    ahora = datetime.now(timezone.utc)
+    filas = [
+        {
+            "id": str(uuid4()),
+            "libro_id": libro_id,
+            "tema_id": item.tema_id,
+            "orden": inicio + i,
+            "configuracion": item.configuracion,
+            "created_at": ahora,
+        }
+        for i, item in enumerate(items)
+    ]
+    await db.execute(insert(LibroItem), filas)
+    await db.commit()
+
+    return [
+        LibroItemResponse(
+            id=fila["id"],
+            libro_id=libro_id,
+            tema_id=fila["tema_id"],
+            orden=fila["orden"],
+            configuracion=fila["configuracion"],
+            tema_nombre=nombres[fila["tema_id"]],
+            created_at=ahora.isoformat()
+        )
+        for fila in filas
+    ]
+
+@router.put("/api/db/libros/{libro_id}/items/reorder")
+async def reorder_libro_items(
+    libro_id: str, nuevos_ordenes: List[LibroItemOrden], db: AsyncSession = Depends(get_async_db)
+):
+    """Reordenar los items de un libro con un único ``UPDATE ... CASE``."""
+    _validar_lote(nuevos_ordenes)
+    libro = await db.scalar(select(Libro.id).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
+    if not libro:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    # nuevos_ordenes = [{"item_id": "uuid", "orden": 0}, {"item_id": "uuid", "orden": 1}, ...]
+    ordenes = {item.item_id: item.orden for item in nuevos_ordenes}
+    resultado = await db.execute(
+        update(LibroItem)
+        .where(LibroItem.libro_id == libro_id, LibroItem.id.in_(ordenes))
+        .values(orden=case(ordenes, value=LibroItem.id))
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != len(ordenes):
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Algún item no pertenece al libro")
+
+    await db.commit()
+    return {"message": "Items reordenados correctamente", "actualizados": resultado.rowcount}
+
+@router.post("/api/db/libros/{libro_id}/items/remove")
+async def remove_items_from_libro(
+    libro_id: str, item_ids: List[str], db: AsyncSession = Depends(get_async_db)
+):
+    """Eliminar varios items de un libro con un único ``DELETE``."""
+    _validar_lote(item_ids)
+    libro = await db.scalar(select(Libro.id).where(Libro.id == libro_id, Libro.deleted_at.is_(None)))
+    if not libro:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    resultado = await db.execute(
+        delete(LibroItem)
+        .where(LibroItem.libro_id == libro_id, LibroItem.id.in_(set(item_ids)))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return {"message": "Items eliminados correctamente", "eliminados": resultado.rowcount}
@@ -0,0 +1,79 @@
+# backend_fastapi/routers/temas_db.py
+"""
+Importación, búsqueda y facetas de temas (/api/db/temas/...).
+
+Se incluye antes que las rutas de main.py para que ``/search`` y ``/facets``
+no se interpreten como ``/api/db/temas/{tema_id}``.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Tema, get_async_db, get_async_read_db
+from routers.comun import anunciar_siguiente, tema_to_response
+from schemas import TemaResponse
+from services import tema_facets
+from services.pagination import CursorInvalido, page_size
+from services.tema_import import FORMATOS, importar_temas_async
+from services.tema_search import buscar_temas
+
+router = APIRouter(tags=["temas"])
+
+@router.post("/api/db/temas/import")
+async def import_temas_db(
+    request: Request,
+    formato: Optional[str] = None,
+    batch_size: int = 1000,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Importar temas en bloque desde un cuerpo JSONL o CSV.
+
+    El cuerpo se procesa a medida que llega y se inserta por lotes; la respuesta
+    resume los temas importados, los duplicados omitidos y los errores por línea.
+    """
+    if formato is None:
+        formato = "csv" if "csv" in request.headers.get("content-type", "") else "jsonl"
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=422, detail=f"Formato no soportado: {formato}")
+    return await importar_temas_async(db, request.stream(), formato, max(1, min(batch_size, 10000)))
+
+@router.get("/api/db/temas/facets")
+async def get_temas_facets(
+    categoria: Optional[str] = None,
+    dificultad: Optional[str] = None,
+    etiquetas: List[str] = Query(default_factory=list),
+    es_publico: Optional[bool] = None,
+    max_etiquetas: int = tema_facets.MAX_ETIQUETAS_FACETA,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Conteos por categoría, dificultad, es_publico y etiquetas de los temas filtrados.
+
+    Acepta los mismos filtros que ``GET /api/db/temas`` y responde con una sola consulta.
+    """
+    consulta = tema_facets.consulta_facetas(
+        Tema, db.bind.dialect.name, max(1, min(max_etiquetas, 500)),
+        categoria=categoria, dificultad=dificultad, etiquetas=etiquetas, es_publico=es_publico,
+    )
+    return tema_facets.agrupar_facetas((await db.execute(consulta)).all())
+
+@router.get("/api/db/temas/search", response_model=List[TemaResponse])
+async def search_temas_db(
+    request: Request,
+    response: Response,
+    q: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Buscar temas por nombre, descripción y palabras (prefijos, sin acentos), por relevancia."""
+    tamano = page_size(limit, 50)
+    try:
+        ids, siguiente = await buscar_temas(db, q, tamano, cursor)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    temas = {tema.id: tema for tema in (await db.scalars(select(Tema).where(Tema.id.in_(ids)))).all()} if ids else {}
+    anunciar_siguiente(request, response, siguiente)
+    return [tema_to_response(temas[tema_id]) for tema_id in ids if tema_id in temas]
@@ -0,0 +1,117 @@
+# backend_fastapi/schemas.py
+"""
+Modelos Pydantic de la API /api/db, compartidos por main.py y los routers.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PalabraSchema(BaseModel):
+    texto: str
+
+
+class TemaBase(BaseModel):
+    nombre: str
+    descripcion: Optional[str] = None
+    palabras: List[PalabraSchema] = Field(default_factory=list)
+    categoria: Optional[str] = None
+    etiquetas: List[str] = Field(default_factory=list)
+    dificultad: Optional[str] = "medio"
+
+
+class TemaCreate(TemaBase):
+    """Modelo para crear o actualizar un tema."""
+
+
+class TemaResponse(TemaBase):
+    """Modelo de respuesta para un tema."""
+    id: str
+    imagen_principal_url: Optional[str] = None
+    icono_url: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+class LibroCreate(BaseModel):
+    """Modelo para crear un nuevo libro."""
+    nombre: str
+    descripcion: Optional[str] = None
+    plantilla: Optional[str] = "basico"
+    temaIds: Optional[List[str]] = None
+
+class LibroResponse(BaseModel):
+    """Modelo de respuesta para un libro."""
+    id: str
+    nombre: str
+    descripcion: Optional[str]
+    plantilla: str
+    estado: str
+    progreso_creacion: float
+    paginas_totales: int
+    created_at: str
+    updated_at: str
+
+class PaginaCreate(BaseModel):
+    """Modelo para crear una nueva página."""
+    libro_id: str
+    numero_pagina: int
+    titulo: Optional[str] = None
+    tema_id: Optional[str] = None
+    contenido_json: Dict[str, Any] = Field(default_factory=dict)
+
+class SopaGeneradaBase(BaseModel):
+    tema_id: Optional[str] = None
+    palabras: List[str]
+    grid: List[List[str]]
+    word_positions: List[Dict[str, Any]]
+    grid_size: int = 15
+    dificultad: str = "medio"
+    tiempo_generacion: Optional[float] = None
+    compartible: bool = False
+
+class SopaGeneradaCreate(SopaGeneradaBase):
+    pass
+
+class SopaGeneradaResponse(SopaGeneradaBase):
+    id: str
+    enlace_publico: Optional[str] = None
+    dificultad_score: Optional[float] = None
+    metricas: Optional[Dict[str, Any]] = None
+    created_at: str
+
+class LibroItemBase(BaseModel):
+    tema_id: str
+    orden: int = 0
+    configuracion: Dict[str, Any] = Field(default_factory=dict)
+
+class LibroItemCreate(LibroItemBase):
+    pass
+
+class LibroItemOrden(BaseModel):
+    item_id: str
+    orden: int
+
+class LibroItemResponse(LibroItemBase):
+    id: str
+    libro_id: str
+    tema_nombre: str
+    created_at: str
+
+    class Config:
+        from_attributes = True
+
+class LibroConItemsResponse(BaseModel):
+    id: str
+    nombre: str
+    descripcion: str
+    plantilla: str
+    estado: str
+    progreso_creacion: float
+    paginas_totales: int
+    created_at: str
+    updated_at: str
+    items: List[LibroItemResponse] = []
+
+    class Config:
+        from_attributes = True
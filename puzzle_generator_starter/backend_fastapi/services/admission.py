@@ -0,0 +1,203 @@
+# backend_fastapi/services/admission.py
+"""
+Control de admisión con carriles de prioridad para la generación.
+
+Un número limitado de generaciones se ejecuta a la vez; el resto espera en una
+cola acotada por carril. Los editores interactivos siempre pasan antes que los
+trabajos por lotes, y los lotes nunca ocupan todos los huecos. Cuando un carril
+está lleno la petición se rechaza de inmediato (503 + Retry-After), y el
+trabajo en cola se descarta si vence su plazo o el cliente se desconecta.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)  # en orden de prioridad
+
+
+class AdmissionRejected(Exception):
+    """No hay capacidad: el cliente debe reintentar pasados ``retry_after`` segundos."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientGone(Exception):
+    """El cliente se desconectó mientras su petición esperaba en la cola."""
+
+
+class AdmissionController:
+    """Semáforo con colas acotadas por carril, plazos y detección de desconexión."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: Optional[Dict[str, int]] = None,
+        queue_timeout: Optional[Dict[str, float]] = None,
+        batch_max_concurrent: Optional[int] = None,
+        poll_interval: float = 0.25,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        # Los lotes dejan al menos un hueco libre para los editores interactivos
+        self.batch_max_concurrent = batch_max_concurrent or max(1, self.max_concurrent - 1)
+        self.max_queue = {INTERACTIVE: 32, BATCH: 64, **(max_queue or {})}
+        self.queue_timeout = {INTERACTIVE: 10.0, BATCH: 60.0, **(queue_timeout or {})}
+        self.poll_interval = poll_interval
+
+        self._active = {lane: 0 for lane in LANES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+
+        self.admitted = {lane: 0 for lane in LANES}
+        self.rejected = {lane: 0 for lane in LANES}
+        self.expired = {lane: 0 for lane in LANES}
+        self.abandoned = {lane: 0 for lane in LANES}
+        self._service_seconds = 0.0
+        self._served = 0
+
+    @classmethod
+    def from_env(cls, default_concurrency: int) -> "AdmissionController":
+        """Construir el controlador a partir de variables de entorno."""
+        return cls(
+            max_concurrent=int(os.getenv("SOPA_ADMISSION_CONCURRENCY", str(default_concurrency))),
+            max_queue={
+                INTERACTIVE: int(os.getenv("SOPA_ADMISSION_QUEUE_INTERACTIVE", "32")),
+                BATCH: int(os.getenv("SOPA_ADMISSION_QUEUE_BATCH", "64")),
+            },
+            queue_timeout={
+                INTERACTIVE: float(os.getenv("SOPA_ADMISSION_TIMEOUT_INTERACTIVE", "10")),
+                BATCH: float(os.getenv("SOPA_ADMISSION_TIMEOUT_BATCH", "60")),
+            },
+        )
+
+    # ---------- estado ----------
+
+    @property
+    def active(self) -> int:
+        return sum(self._active.values())
+
+    def _can_run(self, lane: str) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        if lane == BATCH:
+            return self._active[BATCH] < self.batch_max_concurrent
+        return True
+
+    def _queued(self, lane: str) -> int:
+        return sum(1 for f in self._waiters[lane] if not f.done())
+
+    def retry_after(self) -> int:
+        """Estimación en segundos de cuándo habrá capacidad libre."""
+        media = self._service_seconds / self._served if self._served else 1.0
+        en_cola = sum(self._queued(lane) for lane in LANES)
+        return max(1, int(round(media * (en_cola + 1) / self.max_concurrent)))
+
+    def _wake_next(self) -> None:
+        """Ceder huecos libres a los siguientes en espera, por orden de prioridad."""
+        for lane in LANES:
+            cola = self._waiters[lane]
+            while cola and self._can_run(lane):
+                futuro = cola.popleft()
+                if futuro.done():
+                    continue
+                self._active[lane] += 1
+                futuro.set_result(True)
+
+    # ---------- API pública ----------
+
+    async def acquire(
+        self,
+        lane: str = INTERACTIVE,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> None:
+        """Esperar un hueco en el carril indicado o lanzar AdmissionRejected/ClientGone."""
+        if lane not in LANES:
+            lane = INTERACTIVE
+        if self._can_run(lane) and not any(
+            self._queued(previo) for previo in LANES[:LANES.index(lane) + 1]
+        ):
+            self._active[lane] += 1
+            self.admitted[lane] += 1
+            return
+
+        if self._queued(lane) >= self.max_queue[lane]:
+            self.rejected[lane] += 1
+            raise AdmissionRejected("Servidor ocupado, reintente más tarde", self.retry_after())
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(futuro)
+        plazo = time.monotonic() + self.queue_timeout[lane]
+        try:
+            while True:
+                restante = plazo - time.monotonic()
+                if restante <= 0:
+                    self.expired[lane] += 1
+                    raise AdmissionRejected("Tiempo de espera en cola agotado", self.retry_after())
+                await asyncio.wait({futuro}, timeout=min(self.poll_interval, restante))
+                if futuro.done():
+                    self.admitted[lane] += 1
+                    return
+                if is_disconnected is not None and await is_disconnected():
+                    self.abandoned[lane] += 1
+                    raise ClientGone("El cliente se desconectó mientras esperaba")
+        except BaseException:
+            if futuro.done() and not futuro.cancelled():
+                # El hueco llegó justo al abandonar: devolverlo
+                self.release(lane)
+            else:
+                futuro.cancel()
+            raise
+
+    def try_acquire(self, lane: str = INTERACTIVE) -> bool:
+        """Tomar un hueco adicional solo si está libre ahora y nadie espera en ninguna cola.
+
+        Para repartir un trabajo ya admitido entre más procesos sin quitar sitio
+        a peticiones en cola; cada ``True`` se devuelve con ``release``.
+        """
+        if lane not in LANES:
+            lane = INTERACTIVE
+        if not self._can_run(lane) or any(self._queued(carril) for carril in LANES):
+            return False
+        self._active[lane] += 1
+        return True
+
+    def release(self, lane: str = INTERACTIVE, service_seconds: Optional[float] = None) -> None:
+        """Liberar un hueco y despertar al siguiente en espera."""
+        if lane not in LANES:
+            lane = INTERACTIVE
+        self._active[lane] = max(0, self._active[lane] - 1)
+        if service_seconds is not None:
+            self._service_seconds += service_seconds
+            self._served += 1
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, lane: str = INTERACTIVE, is_disconnected=None):
+        """``async with controller.slot(lane):`` adquiere y libera un hueco."""
+        await self.acquire(lane, is_disconnected)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(lane, time.perf_counter() - inicio)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupación, colas y contadores por carril."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "batch_max_concurrent": self.batch_max_concurrent,
+            "active": dict(self._active),
+            "queued": {lane: self._queued(lane) for lane in LANES},
+            "max_queue": dict(self.max_queue),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "expired": dict(self.expired),
+            "abandoned": dict(self.abandoned),
+            "avg_service_ms": round(self._service_seconds / self._served * 1000, 3) if self._served else 0.0,
+        }
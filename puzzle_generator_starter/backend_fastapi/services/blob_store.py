@@ -0,0 +1,260 @@
+# backend_fastapi/services/blob_store.py
+"""
+Almacén de binarios direccionado por contenido (imágenes de temas y páginas).
+
+Cada binario se guarda una sola vez en ``<raíz>/ab/cd/<sha256>`` y las filas de
+la base de datos solo guardan el hash. Los archivos son inmutables: el mismo
+contenido siempre tiene el mismo nombre, así que se pueden servir con caché de
+larga duración y dos temas con la misma imagen comparten el archivo.
+
+Para sacar de la base de datos los binarios ya guardados (una sola vez):
+
+    python -m services.blob_store migrate --batch-size 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, List, Optional
+
+DEFAULT_BLOB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "blobs")
+
+_HASH_VALIDO = re.compile(r"^[0-9a-f]{64}$")
+
+# Columnas binarias heredadas y la columna de hash que las sustituye
+COLUMNAS_BINARIAS = (
+    ("Tema", "imagen_principal", "imagen_principal_hash"),
+    ("Tema", "icono", "icono_hash"),
+    ("PaginaLibro", "imagen_generada", "imagen_generada_hash"),
+)
+
+_FIRMAS = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF", "application/pdf"),
+)
+
+
+# Únicos tipos que se sirven en línea: cualquier otro (SVG, PDF...) puede llevar
+# scripts o contenido activo y se entrega como descarga (ver cabeceras_descarga)
+TIPOS_EN_LINEA = frozenset({"image/png", "image/jpeg", "image/gif", "image/webp"})
+
+# Tamaño mínimo de cada escritura del temporal en put_async (una ida al hilo por bloque)
+BLOQUE_ESCRITURA = 1024 * 1024
+
+
+def cabeceras_descarga(tipo: str) -> Dict[str, str]:
+    """Cabeceras de seguridad para servir un blob de tipo ``tipo`` desde el origen de la API.
+
+    Los tipos rasterizados se muestran en línea; el resto se fuerza a descarga
+    sin permitir que el navegador ejecute nada (evita XSS con SVG subidos).
+    """
+    cabeceras = {"X-Content-Type-Options": "nosniff"}
+    if tipo not in TIPOS_EN_LINEA:
+        cabeceras["Content-Security-Policy"] = "default-src 'none'; sandbox"
+        cabeceras["Content-Disposition"] = "attachment"
+    return cabeceras
+
+
+def tipo_mime(cabecera: bytes) -> str:
+    """Tipo MIME deducido de los primeros bytes del archivo."""
+    for firma, tipo in _FIRMAS:
+        if cabecera.startswith(firma):
+            return tipo
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "image/webp"
+    if cabecera.lstrip()[:5] in (b"<?xml", b"<svg ") or b"<svg" in cabecera[:256]:
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+class BlobStore:
+    """Archivos inmutables nombrados por su SHA-256."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        """Ruta del archivo de un hash (ValueError si el hash no es válido)."""
+        if not _HASH_VALIDO.match(digest or ""):
+            raise ValueError(f"Hash de blob inválido: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.exists(self.path(digest))
+        except ValueError:
+            return False
+
+    def _subida(self) -> "_Subida":
+        os.makedirs(self.root, exist_ok=True)
+        return _Subida(self)
+
+    def _guardar(self, chunks: Iterable[bytes]) -> str:
+        subida = self._subida()
+        try:
+            for chunk in chunks:
+                subida.write(chunk)
+        except BaseException:
+            subida.abort()
+            raise
+        return subida.commit()
+
+    def put(self, data: bytes) -> str:
+        """Guardar un binario y devolver su hash."""
+        return self._guardar([data])
+
+    def put_stream(self, fileobj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+        """Guardar el contenido de un archivo abierto sin cargarlo entero en memoria."""
+        return self._guardar(iter(lambda: fileobj.read(chunk_size), b""))
+
+    async def put_async(self, chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> str:
+        """Guardar un cuerpo HTTP a medida que llega (p. ej. ``request.stream()``).
+
+        El disco se toca siempre en un hilo, nunca en el bucle de eventos; los
+        trozos se agrupan en bloques de ``BLOQUE_ESCRITURA`` para no saltar al
+        hilo por cada trozo pequeño.
+        """
+        subida = await asyncio.to_thread(self._subida)
+        pendiente: List[bytes] = []
+        tamano_pendiente = 0
+        recibido = 0
+        try:
+            async for chunk in chunks:
+                recibido += len(chunk)
+                if max_bytes is not None and recibido > max_bytes:
+                    raise ValueError(f"El archivo supera el máximo de {max_bytes} bytes")
+                pendiente.append(chunk)
+                tamano_pendiente += len(chunk)
+                if tamano_pendiente >= BLOQUE_ESCRITURA:
+                    await asyncio.to_thread(subida.write, b"".join(pendiente))
+                    pendiente, tamano_pendiente = [], 0
+            if pendiente:
+                await asyncio.to_thread(subida.write, b"".join(pendiente))
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(subida.abort))
+            raise
+        return await asyncio.to_thread(subida.commit)
+
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as origen:
+            return origen.read()
+
+    def delete(self, digest: str) -> bool:
+        """Borrar un blob. Quien llama debe comprobar que ninguna fila lo referencia."""
+        try:
+            os.unlink(self.path(digest))
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+
+class _Subida:
+    """Archivo temporal que se renombra a su hash al terminar de escribirse."""
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self.size = 0
+        self._sha = hashlib.sha256()
+        fd, self._temporal = tempfile.mkstemp(dir=store.root, prefix=".subida-")
+        self._destino = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._sha.update(chunk)
+        self._destino.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> str:
+        self._destino.close()
+        digest = self._sha.hexdigest()
+        final = self.store.path(digest)
+        if os.path.exists(final):
+            os.unlink(self._temporal)  # mismo contenido ya guardado
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(self._temporal, final)  # atómico: nunca se ve un archivo a medias
+        return digest
+
+    def abort(self) -> None:
+        self._destino.close()
+        if os.path.exists(self._temporal):
+            os.unlink(self._temporal)
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Almacén en ``SOPA_BLOB_DIR`` (por defecto ``data/blobs``)."""
+    global _store  # pylint: disable=global-statement
+    raiz = os.getenv("SOPA_BLOB_DIR", DEFAULT_BLOB_DIR)
+    if _store is None or _store.root != raiz:
+        _store = BlobStore(raiz)
+    return _store
+
+
+def migrar_binarios(db, store: BlobStore, batch_size: int = 200) -> Dict[str, int]:
+    """Mover a ``store`` los binarios que aún están en la base de datos, por lotes.
+
+    Cada lote lee a lo sumo ``batch_size`` filas con binario, escribe los
+    archivos, guarda el hash, vacía la columna binaria y confirma. Se puede
+    interrumpir y relanzar: solo procesa las filas que aún tienen binario.
+    """
+    import database  # pylint: disable=import-outside-toplevel
+    from sqlalchemy import select, update  # pylint: disable=import-outside-toplevel
+
+    stats: Dict[str, int] = {}
+    for modelo_nombre, columna, columna_hash in COLUMNAS_BINARIAS:
+        modelo = getattr(database, modelo_nombre)
+        binario = getattr(modelo, columna)
+        movidos = 0
+        ultimo_id = ""
+        while True:
+            lote = db.execute(
+                select(modelo.id, binario)
+                .where(modelo.id > ultimo_id, binario.isnot(None))
+                .order_by(modelo.id)
+                .limit(batch_size)
+            ).all()
+            if not lote:
+                break
+            for fila_id, datos in lote:
+                digest = store.put(bytes(datos))
+                db.execute(update(modelo).where(modelo.id == fila_id).values({columna: None, columna_hash: digest}))
+            db.commit()
+            movidos += len(lote)
+            ultimo_id = lote[-1][0]
+            print(f"   ... {modelo_nombre}.{columna}: {movidos} binarios movidos", file=sys.stderr)
+        stats[f"{modelo_nombre}.{columna}"] = movidos
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI del almacén de binarios."""
+    parser = argparse.ArgumentParser(description="Almacén de binarios direccionado por contenido")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    migrate = sub.add_parser("migrate", help="Mover las imágenes guardadas en la BD al almacén")
+    migrate.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal  # pylint: disable=import-outside-toplevel
+
+    store = get_blob_store()
+    db = SessionLocal()
+    try:
+        stats = migrar_binarios(db, store, args.batch_size)
+    finally:
+        db.close()
+    for columna, movidos in stats.items():
+        print(f"✅ {columna}: {movidos} binarios movidos a {store.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
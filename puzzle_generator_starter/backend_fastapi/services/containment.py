@@ -0,0 +1,101 @@
+# backend_fastapi/services/containment.py
+"""
+Detección de palabras contenidas en otras de la misma lista ("SOL" en "GIRASOL").
+
+Se construye un autómata Aho-Corasick (trie con enlaces de fallo) sobre las
+palabras normalizadas y se recorre cada palabra, y su inversa, una sola vez:
+el coste es lineal en el total de letras más el número de coincidencias, de
+modo que temas de miles de palabras se analizan en milisegundos.
+"""
+
+from collections import deque
+from typing import Dict, List, NamedTuple
+
+
+class Contencion(NamedTuple):
+    """``palabra`` aparece dentro de ``contenedora`` a partir de la letra ``offset``.
+
+    Si ``invertida`` es True, aparece leída al revés: empieza en la letra
+    ``offset`` de la contenedora y avanza hacia el principio.
+    """
+
+    contenedora: str
+    offset: int
+    invertida: bool
+
+
+def _construir_automata(palabras: List[str]):
+    hijos: List[Dict[str, int]] = [{}]
+    terminal: List[int] = [-1]
+    for indice, palabra in enumerate(palabras):
+        nodo = 0
+        for letra in palabra:
+            siguiente = hijos[nodo].get(letra)
+            if siguiente is None:
+                siguiente = len(hijos)
+                hijos[nodo][letra] = siguiente
+                hijos.append({})
+                terminal.append(-1)
+            nodo = siguiente
+        terminal[nodo] = indice
+
+    fallo = [0] * len(hijos)
+    # Siguiente nodo terminal en la cadena de fallos (enlace de salida)
+    salida = [0] * len(hijos)
+    cola = deque(hijos[0].values())
+    while cola:
+        nodo = cola.popleft()
+        for letra, hijo in hijos[nodo].items():
+            f = fallo[nodo]
+            while f and letra not in hijos[f]:
+                f = fallo[f]
+            destino = hijos[f].get(letra, 0)
+            fallo[hijo] = destino if destino != hijo else 0
+            salida[hijo] = fallo[hijo] if terminal[fallo[hijo]] >= 0 else salida[fallo[hijo]]
+            cola.append(hijo)
+    return hijos, terminal, fallo, salida
+
+
+def _coincidencias(texto: str, hijos, terminal, fallo, salida):
+    """Pares (índice de palabra, posición final) de todas las palabras presentes en ``texto``."""
+    nodo = 0
+    for pos, letra in enumerate(texto):
+        while nodo and letra not in hijos[nodo]:
+            nodo = fallo[nodo]
+        nodo = hijos[nodo].get(letra, 0)
+        actual = nodo if terminal[nodo] >= 0 else salida[nodo]
+        while actual:
+            yield terminal[actual], pos
+            actual = salida[actual]
+
+
+def analizar_contencion(palabras: List[str], allow_reverse: bool = True) -> Dict[str, Contencion]:
+    """Para cada palabra contenida en otra de la lista, su contenedora más larga.
+
+    ``palabras`` deben estar normalizadas y sin duplicados. Las contenedoras
+    nunca están contenidas a su vez, así que todas las relaciones apuntan a
+    palabras "raíz". Entre dos palabras de igual largo que son inversas entre
+    sí (``AMOR``/``ROMA``), la primera de la lista actúa como contenedora.
+
+    Con ``allow_reverse=False`` no se recorren las inversas: una contención
+    al revés no se leería en la sopa y no debe ocultar otra contenedora directa.
+    """
+    automata = _construir_automata(palabras)
+    rango = {p: (len(p), -i) for i, p in enumerate(palabras)}
+    mejor: Dict[str, Contencion] = {}
+
+    for contenedora in palabras:
+        largo = len(contenedora)
+        recorridos = ((contenedora, False), (contenedora[::-1], True)) if allow_reverse else ((contenedora, False),)
+        for texto, invertida in recorridos:
+            for indice, fin in _coincidencias(texto, *automata):
+                palabra = palabras[indice]
+                if palabra == contenedora or rango[contenedora] <= rango[palabra]:
+                    continue
+                previa = mejor.get(palabra)
+                if previa is not None and rango[previa.contenedora] >= rango[contenedora]:
+                    continue
+                inicio = fin - len(palabra) + 1
+                offset = largo - 1 - inicio if invertida else inicio
+                mejor[palabra] = Contencion(contenedora, offset, invertida)
+    return mejor
@@ -0,0 +1,287 @@
+# backend_fastapi/services/corpus.py
+"""
+Corpus binario de sopas pregeneradas con acceso aleatorio O(1) vía mmap.
+
+Formato (little-endian):
+
+    Cabecera (32 bytes)
+        magic "SPCX" | versión u16 | reservado u16 | n_sopas u64 | offset_indice u64 | reservado 8
+    Registros (uno por sopa, consecutivos)
+        filas u8 | columnas u8 | n_palabras u16 | semilla u32 | bytes_palabras u16
+        celdas: filas*columnas bytes (latin-1, una letra por celda)
+        colocaciones: n_palabras * (fila u8, columna u8, dirección u8, largo u8, offset_texto u16)
+        textos: palabras originales en UTF-8, concatenadas
+    Índice
+        n_sopas * u64 con el offset de cada registro
+
+Leer la sopa i solo requiere dos accesos al índice y decodificar ese registro.
+
+    python -m services.corpus build sopas.jsonl corpus.bin
+    python -m services.corpus info corpus.bin
+    python -m services.corpus get corpus.bin 42
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.sopa_generator import ALL_DIRECTIONS, Direction
+
+MAGIC = b"SPCX"
+VERSION = 1
+
+_CABECERA = struct.Struct("<4sHHQQ8x")
+_REGISTRO = struct.Struct("<BBHIH")
+_COLOCACION = struct.Struct("<BBBBH")
+_OFFSET = struct.Struct("<Q")
+
+_CODIGO_DIRECCION = {d.name.replace("_", " "): i for i, d in enumerate(ALL_DIRECTIONS)}
+
+
+class CorpusError(ValueError):
+    """Archivo de corpus inválido o sopa no representable."""
+
+
+def _codificar(resultado: Dict[str, Any]) -> bytes:
+    grid = resultado["grid"]
+    filas = len(grid)
+    cols = len(grid[0]) if filas else 0
+    if not (0 < filas < 256 and 0 < cols < 256):
+        raise CorpusError(f"Tamaño de grilla no soportado: {filas}x{cols}")
+
+    celdas = "".join("".join(fila) for fila in grid).encode("latin-1", errors="replace")
+    if len(celdas) != filas * cols:
+        raise CorpusError("La grilla debe tener exactamente un carácter por celda")
+
+    colocaciones = []
+    textos = bytearray()
+    for solucion in resultado.get("soluciones") or resultado.get("word_positions") or []:
+        (r0, c0), (r1, c1) = solucion["inicio"], solucion["fin"]
+        largo = max(abs(r1 - r0), abs(c1 - c0)) + 1
+        texto = str(solucion["palabra"]).encode("utf-8")
+        colocaciones.append(_COLOCACION.pack(
+            r0, c0, _CODIGO_DIRECCION[solucion["direccion"]], largo, len(textos)
+        ))
+        textos += texto
+
+    cabecera = _REGISTRO.pack(
+        filas, cols, len(colocaciones), int(resultado.get("seed") or 0) & 0xFFFFFFFF, len(textos)
+    )
+    return cabecera + celdas + b"".join(colocaciones) + bytes(textos)
+
+
+class CorpusWriter:
+    """Escritura secuencial de un corpus; el índice se añade al cerrar.
+
+    Se escribe en un temporal del mismo directorio que sustituye a ``path`` de
+    forma atómica en ``close()``: un servidor que tenga el corpus anterior
+    mapeado sigue leyéndolo intacto hasta que lo vuelve a abrir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        fd, self._tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path))
+        )
+        os.fchmod(fd, 0o644)  # mkstemp crea con 0600; el corpus lo lee el servidor
+        self._f = os.fdopen(fd, "wb")
+        self._f.write(_CABECERA.pack(MAGIC, VERSION, 0, 0, 0))
+        self._offsets: List[int] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def add(self, resultado: Dict[str, Any]) -> int:
+        """Añadir una sopa generada (formato de ``WordSearchGenerator.generate``)."""
+        registro = _codificar(resultado)
+        self._offsets.append(self._f.tell())
+        self._f.write(registro)
+        return len(self._offsets) - 1
+
+    def close(self):
+        if self._f.closed:
+            return
+        offset_indice = self._f.tell()
+        self._f.write(b"".join(_OFFSET.pack(o) for o in self._offsets))
+        self._f.seek(0)
+        self._f.write(_CABECERA.pack(MAGIC, VERSION, 0, len(self._offsets), offset_indice))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Descartar lo escrito y dejar ``path`` como estaba."""
+        if self._f.closed:
+            return
+        self._f.close()
+        os.unlink(self._tmp_path)
+
+
+class CorpusReader:
+    """Lectura por mmap: ``reader[i]`` decodifica solo el registro i."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")  # pylint: disable=consider-using-with
+        estado = os.fstat(self._f.fileno())
+        self.identidad = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._f.close()
+            raise CorpusError(f"Corpus vacío o ilegible: {path}") from e
+        magic, version, _, self.count, self._offset_indice = _CABECERA.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise CorpusError(f"Archivo de corpus no reconocido: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mm.close()
+        self._f.close()
+
+    def _offset(self, indice: int) -> int:
+        if not 0 <= indice < self.count:
+            raise IndexError(f"Índice fuera de rango: {indice}")
+        return _OFFSET.unpack_from(self._mm, self._offset_indice + indice * _OFFSET.size)[0]
+
+    def raw(self, indice: int) -> memoryview:
+        """Bytes del registro i sin copiar."""
+        inicio = self._offset(indice)
+        fin = self._offset(indice + 1) if indice + 1 < self.count else self._offset_indice
+        return memoryview(self._mm)[inicio:fin]
+
+    def __getitem__(self, indice: int) -> Dict[str, Any]:
+        pos = self._offset(indice)
+        filas, cols, n_palabras, seed, total_textos = _REGISTRO.unpack_from(self._mm, pos)
+        pos += _REGISTRO.size
+
+        celdas = self._mm[pos:pos + filas * cols].decode("latin-1")
+        pos += filas * cols
+        grid = [list(celdas[r * cols:(r + 1) * cols]) for r in range(filas)]
+
+        inicio_textos = pos + n_palabras * _COLOCACION.size
+        colocaciones = [
+            _COLOCACION.unpack_from(self._mm, pos + i * _COLOCACION.size) for i in range(n_palabras)
+        ]
+        soluciones = []
+        for i, (fila, col, codigo, largo, off) in enumerate(colocaciones):
+            fin_texto = colocaciones[i + 1][4] if i + 1 < n_palabras else total_textos
+            texto = self._mm[inicio_textos + off:inicio_textos + fin_texto].decode("utf-8")
+            direccion: Direction = ALL_DIRECTIONS[codigo]
+            dr, dc = direccion.value
+            soluciones.append({
+                "palabra": texto,
+                "inicio": (fila, col),
+                "fin": (fila + (largo - 1) * dr, col + (largo - 1) * dc),
+                "direccion": direccion.name.replace("_", " "),
+            })
+
+        return {
+            "success": True,
+            "indice": indice,
+            "grid": grid,
+            "soluciones": soluciones,
+            "tamaño": max(filas, cols),
+            "grid_size": max(filas, cols),
+            "todas_colocadas": True,
+            "seed": seed,
+        }
+
+
+def build_from_jsonl(jsonl_path: str, corpus_path: str) -> int:
+    """Empaquetar la salida JSONL de la generación masiva en un corpus binario."""
+    with open(jsonl_path, "r", encoding="utf-8") as f, CorpusWriter(corpus_path) as writer:
+        for linea in f:
+            if not linea.strip():
+                continue
+            resultado = json.loads(linea)
+            if resultado.get("success"):
+                writer.add(resultado)
+        return len(writer)
+
+
+def write_corpus(resultados: Iterable[Dict[str, Any]], corpus_path: str) -> int:
+    """Escribir un corpus a partir de cualquier iterable de resultados."""
+    with CorpusWriter(corpus_path) as writer:
+        for resultado in resultados:
+            if resultado.get("success", True):
+                writer.add(resultado)
+        return len(writer)
+
+
+_reader: Optional[CorpusReader] = None
+
+
+def get_corpus() -> Optional[CorpusReader]:
+    """Corpus configurado en ``SOPA_CORPUS_PATH``.
+
+    Se mantiene abierto entre peticiones y se reabre si el archivo se sustituye
+    (otro inodo, fecha o tamaño). El lector anterior no se cierra aquí: una
+    petición en curso puede estar usándolo y se libera al dejar de referenciarse.
+    """
+    global _reader  # pylint: disable=global-statement
+    path = os.getenv("SOPA_CORPUS_PATH")
+    if not path:
+        return None
+    try:
+        estado = os.stat(path)
+    except FileNotFoundError:
+        return None
+    identidad = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+    if _reader is None or _reader.path != path or _reader.identidad != identidad:
+        _reader = CorpusReader(path)
+    return _reader
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI para construir e inspeccionar corpus."""
+    parser = argparse.ArgumentParser(description="Corpus binario de sopas pregeneradas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    build = sub.add_parser("build", help="Empaquetar un JSONL de services.sopa_generator")
+    build.add_argument("jsonl")
+    build.add_argument("corpus")
+    info = sub.add_parser("info", help="Mostrar el número de sopas y el tamaño")
+    info.add_argument("corpus")
+    get = sub.add_parser("get", help="Imprimir la sopa i como JSON")
+    get.add_argument("corpus")
+    get.add_argument("indice", type=int)
+    args = parser.parse_args(argv)
+
+    if args.comando == "build":
+        total = build_from_jsonl(args.jsonl, args.corpus)
+        print(f"✅ Corpus escrito: {total} sopas en {args.corpus} ({os.path.getsize(args.corpus)} bytes)")
+    elif args.comando == "info":
+        with CorpusReader(args.corpus) as reader:
+            print(f"{args.corpus}: {len(reader)} sopas, {os.path.getsize(args.corpus)} bytes")
+    else:
+        with CorpusReader(args.corpus) as reader:
+            print(json.dumps(reader[args.indice], ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# backend_fastapi/services/difficulty.py
+"""
+Análisis objetivo de dificultad de una sopa de letras.
+
+Las métricas se calculan de forma vectorizada (numpy) sobre la grilla completa
+y las posiciones de las palabras: mezcla de direcciones, proporción de palabras
+invertidas y diagonales, celdas solapadas, densidad de señuelos (prefijos de
+palabras objetivo que aparecen en el relleno) y longitud media de palabra.
+
+Uso por lotes (reasignar dificultad a todo el histórico):
+
+    python -m services.difficulty --batch-size 2000
+"""
+
+import argparse
+import sys
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from services.sopa_generator import normalize_text
+
+# Las 8 direcciones en las que se puede leer una palabra
+_DIRECCIONES = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# Umbrales de la etiqueta a partir de la puntuación 0..1
+UMBRAL_MEDIO = 0.35
+UMBRAL_DIFICIL = 0.6
+
+# Pesos de cada componente de la puntuación (suman 1)
+_PESOS = {
+    "reversed_share": 0.3,
+    "diagonal_share": 0.25,
+    "decoys": 0.2,
+    "size": 0.15,
+    "overlap": 0.1,
+}
+
+
+def _grid_a_array(grid: Sequence[Sequence[str]]) -> np.ndarray:
+    """Convertir la grilla a una matriz de códigos de 5 bits (A=1 .. Z=26, 0 = otro)."""
+    filas = len(grid)
+    n_cols = len(grid[0]) if filas else 0
+    datos = "".join(map("".join, grid))
+    if len(datos) != filas * n_cols:
+        # Celdas vacías o de más de un carácter: normalizar fila a fila
+        filas_txt = ["".join((c or " ")[0] for c in fila) for fila in grid]
+        n_cols = max((len(f) for f in filas_txt), default=0)
+        datos = "".join(f.ljust(n_cols) for f in filas_txt)
+    arr = np.frombuffer(datos.encode("latin-1", errors="replace"), dtype=np.uint8)
+    arr = arr.reshape(filas, n_cols).astype(np.int32) - 64
+    arr[(arr < 1) | (arr > 26)] = 0
+    return arr
+
+
+def _codigo(texto: str) -> int:
+    """Código de 5 bits por letra; coincide con el de ``_contar_prefijos``."""
+    codigo = 0
+    for letra in texto:
+        valor = ord(letra) - 64
+        codigo = (codigo << 5) | (valor if 1 <= valor <= 26 else 0)
+    return codigo
+
+
+@lru_cache(maxsize=64)
+def _indices_lectura(filas: int, cols: int) -> np.ndarray:
+    """Índices (8, 3, filas, cols) de las 3 primeras letras leídas desde cada celda.
+
+    Apuntan a la grilla aplanada con un borde de 3 ceros, de modo que las
+    lecturas que salen del tablero recogen un 0.
+    """
+    ancho = cols + 6
+    r = np.arange(filas).reshape(1, 1, filas, 1) + 3
+    c = np.arange(cols).reshape(1, 1, 1, cols) + 3
+    paso = np.arange(3).reshape(1, 3, 1, 1)
+    dr = np.array([d[0] for d in _DIRECCIONES]).reshape(8, 1, 1, 1)
+    dc = np.array([d[1] for d in _DIRECCIONES]).reshape(8, 1, 1, 1)
+    return (r + paso * dr) * ancho + (c + paso * dc)
+
+
+def _contar_prefijos(arr: np.ndarray, pref2: Iterable[str], pref3: Iterable[str]) -> int:
+    """Contar, en las 8 direcciones, las lecturas que coinciden con algún prefijo de 2 o 3 letras.
+
+    Cada lectura se codifica como un entero de 5 bits por letra y se busca en
+    una tabla booleana; una lectura que sale del tablero contiene un 0 y nunca
+    coincide.
+    """
+    filas, cols = arr.shape
+    borde = np.zeros((filas + 6, cols + 6), dtype=np.int32)
+    borde[3:3 + filas, 3:3 + cols] = arr
+    letras = borde.ravel()[_indices_lectura(filas, cols)]
+    codigos2 = (letras[:, 0] << 5) | letras[:, 1]
+
+    total = 0
+    if pref2:
+        tabla2 = np.zeros(1 << 10, dtype=bool)
+        tabla2[[_codigo(p) for p in pref2]] = True
+        total += int(np.count_nonzero(tabla2[codigos2]))
+    if pref3:
+        tabla3 = np.zeros(1 << 15, dtype=bool)
+        tabla3[[_codigo(p) for p in pref3]] = True
+        total += int(np.count_nonzero(tabla3[(codigos2 << 5) | letras[:, 2]]))
+    return total
+
+
+def _coincidencias_propias(arr: np.ndarray, inicios: np.ndarray, pasos: np.ndarray,
+                           pref2: Iterable[str], pref3: Iterable[str]) -> int:
+    """Coincidencias de ``_contar_prefijos`` que son el comienzo de una palabra colocada.
+
+    Se lee cada colocación desde su inicio y en su dirección, igual que allí, y
+    se cuenta solo si esa lectura está en las tablas (las palabras cortas no
+    aportan prefijo). Dos colocaciones con el mismo inicio y dirección comparten
+    la coincidencia.
+    """
+    filas, cols = arr.shape
+    codigos2 = {_codigo(p) for p in pref2}
+    codigos3 = {_codigo(p) for p in pref3}
+    propias = 0
+    for r0, c0, dr, dc in set(zip(inicios[:, 0].tolist(), inicios[:, 1].tolist(),
+                                  pasos[:, 0].tolist(), pasos[:, 1].tolist())):
+        if dr == dc == 0:
+            continue
+        letras = [
+            int(arr[r0 + k * dr, c0 + k * dc]) if 0 <= r0 + k * dr < filas and 0 <= c0 + k * dc < cols else 0
+            for k in range(3)
+        ]
+        codigo2 = (letras[0] << 5) | letras[1]
+        propias += (codigo2 in codigos2) + (((codigo2 << 5) | letras[2]) in codigos3)
+    return propias
+
+
+def _longitud_y_paso(inicio, fin):
+    dr = int(fin[0]) - int(inicio[0])
+    dc = int(fin[1]) - int(inicio[1])
+    largo = max(abs(dr), abs(dc)) + 1
+    return largo, int(np.sign(dr)), int(np.sign(dc))
+
+
+def analizar_dificultad(
+    grid: Sequence[Sequence[str]],
+    word_positions: Iterable[Dict[str, Any]],
+    palabras: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Calcular métricas objetivas, puntuación (0..1) y etiqueta de dificultad."""
+    arr = _grid_a_array(grid)
+    filas, cols = arr.shape
+    celdas = max(filas * cols, 1)
+    posiciones = list(word_positions or [])
+
+    # ----- geometría de las colocaciones -----
+    inicios = np.array([p.get("inicio", (0, 0)) for p in posiciones], dtype=np.int64).reshape(-1, 2)
+    fines = np.array([p.get("fin", (0, 0)) for p in posiciones], dtype=np.int64).reshape(-1, 2)
+    deltas = fines - inicios
+    largos = np.abs(deltas).max(axis=1) + 1 if len(posiciones) else np.zeros(0, dtype=np.int64)
+    pasos = np.sign(deltas)
+
+    direcciones = [str(p.get("direccion", "")) for p in posiciones]
+    mezcla: Dict[str, int] = {}
+    for nombre in direcciones:
+        mezcla[nombre] = mezcla.get(nombre, 0) + 1
+    n_palabras = len(posiciones)
+    # Ambas por geometría, no por la etiqueta: las "_INV" de Direction son las que
+    # avanzan hacia la izquierda o, en vertical, hacia arriba
+    invertidas = int(np.count_nonzero((pasos[:, 1] < 0) | ((pasos[:, 1] == 0) & (pasos[:, 0] < 0))))
+    diagonales = int(np.count_nonzero((pasos[:, 0] != 0) & (pasos[:, 1] != 0)))
+
+    # Entropía normalizada de la mezcla de direcciones (0 = una sola dirección)
+    if n_palabras and len(mezcla) > 1:
+        p = np.array(list(mezcla.values()), dtype=np.float64) / n_palabras
+        entropia = float(-(p * np.log(p)).sum() / np.log(len(_DIRECCIONES)))
+    else:
+        entropia = 0.0
+
+    # ----- solapamientos: celdas cubiertas por más de una palabra -----
+    cobertura = np.zeros(filas * cols, dtype=np.int64)
+    if n_palabras:
+        total = int(largos.sum())
+        idx_palabra = np.repeat(np.arange(n_palabras), largos)
+        offsets = np.arange(total) - np.repeat(np.cumsum(largos) - largos, largos)
+        rr = inicios[idx_palabra, 0] + offsets * pasos[idx_palabra, 0]
+        cc = inicios[idx_palabra, 1] + offsets * pasos[idx_palabra, 1]
+        dentro = (rr >= 0) & (rr < filas) & (cc >= 0) & (cc < cols)
+        cobertura = np.bincount(rr[dentro] * cols + cc[dentro], minlength=filas * cols)
+    solapes = int(np.count_nonzero(cobertura > 1))
+    letras_colocadas = int(np.count_nonzero(cobertura))
+
+    # ----- señuelos: prefijos de palabras objetivo fuera de su colocación real -----
+    textos = list(palabras) if palabras else []
+    if not textos:
+        textos = ["".join(grid[r][c] for r, c in _celdas(p)) for p in posiciones]
+    textos = [normalize_text(t) for t in textos if t and len(t) >= 3]
+
+    senuelos = 0
+    if textos and filas and cols:
+        # Prefijo de 3 letras para palabras largas, de 2 para las de 3 letras
+        pref3 = {t[:3] for t in textos if len(t) >= 4}
+        pref2 = {t[:2] for t in textos if len(t) == 3}
+        coincidencias = _contar_prefijos(arr, pref2, pref3)
+        # Las coincidencias en el inicio de cada colocación son legítimas; las
+        # palabras de menos de 3 letras no aportan ninguna
+        senuelos = max(0, coincidencias - _coincidencias_propias(arr, inicios, pasos, pref2, pref3))
+
+    densidad_senuelos = senuelos / celdas
+    longitud_media = float(largos.mean()) if n_palabras else 0.0
+    proporcion_invertidas = invertidas / n_palabras if n_palabras else 0.0
+    proporcion_diagonales = diagonales / n_palabras if n_palabras else 0.0
+
+    componentes = {
+        "reversed_share": proporcion_invertidas,
+        "diagonal_share": proporcion_diagonales,
+        "decoys": min(1.0, densidad_senuelos * 20),
+        "size": min(1.0, max(0.0, (max(filas, cols) - 10) / 20)),
+        "overlap": min(1.0, solapes / max(n_palabras, 1)),
+    }
+    puntuacion = round(sum(_PESOS[k] * v for k, v in componentes.items()), 4)
+
+    return {
+        "dificultad": etiqueta_dificultad(puntuacion),
+        "puntuacion": puntuacion,
+        "metricas": {
+            "grid_size": max(filas, cols),
+            "palabras": n_palabras,
+            "mezcla_direcciones": mezcla,
+            "entropia_direcciones": round(entropia, 4),
+            "proporcion_invertidas": round(proporcion_invertidas, 4),
+            "proporcion_diagonales": round(proporcion_diagonales, 4),
+            "solapamientos": solapes,
+            "senuelos": senuelos,
+            "densidad_senuelos": round(densidad_senuelos, 4),
+            "longitud_media": round(longitud_media, 2),
+            "ocupacion": round(letras_colocadas / celdas, 4),
+        },
+    }
+
+
+def _celdas(posicion: Dict[str, Any]) -> List[tuple]:
+    inicio, fin = posicion.get("inicio", (0, 0)), posicion.get("fin", (0, 0))
+    largo, dr, dc = _longitud_y_paso(inicio, fin)
+    return [(int(inicio[0]) + i * dr, int(inicio[1]) + i * dc) for i in range(largo)]
+
+
+def etiqueta_dificultad(puntuacion: float) -> str:
+    """Traducir la puntuación numérica a la etiqueta usada en la API."""
+    if puntuacion >= UMBRAL_DIFICIL:
+        return "dificil"
+    if puntuacion >= UMBRAL_MEDIO:
+        return "medio"
+    return "facil"
+
+
+def asignar_dificultad_en_lote(db, batch_size: int = 1000, solo_pendientes: bool = False) -> int:
+    """Recalcular la dificultad de las sopas guardadas, por lotes con paginación por clave."""
+    from database import SopaGenerada  # pylint: disable=import-outside-toplevel
+
+    procesadas = 0
+    ultimo_id = ""
+    while True:
+        query = db.query(
+            SopaGenerada.id, SopaGenerada.grid, SopaGenerada.word_positions, SopaGenerada.palabras
+        ).filter(SopaGenerada.id > ultimo_id)
+        if solo_pendientes:
+            query = query.filter(SopaGenerada.dificultad_score.is_(None))
+        lote = query.order_by(SopaGenerada.id).limit(batch_size).all()
+        if not lote:
+            break
+
+        cambios = []
+        for sopa_id, grid, posiciones, palabras in lote:
+            analisis = analizar_dificultad(grid or [], posiciones or [], palabras)
+            cambios.append({
+                "id": sopa_id,
+                "dificultad": analisis["dificultad"],
+                "dificultad_score": analisis["puntuacion"],
+                "metricas": analisis["metricas"],
+            })
+        db.bulk_update_mappings(SopaGenerada, cambios)
+        db.commit()
+
+        procesadas += len(lote)
+        ultimo_id = lote[-1][0]
+        print(f"   ... {procesadas} sopas procesadas", file=sys.stderr)
+    return procesadas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI para reasignar la dificultad de todo el histórico."""
+    parser = argparse.ArgumentParser(description="Recalcular la dificultad de las sopas guardadas")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--solo-pendientes", action="store_true",
+                        help="Procesar solo sopas sin puntuación calculada")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        total = asignar_dificultad_en_lote(db, args.batch_size, args.solo_pendientes)
+    finally:
+        db.close()
+    print(f"✅ Dificultad asignada a {total} sopas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
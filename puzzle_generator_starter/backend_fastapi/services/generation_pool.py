@@ -0,0 +1,313 @@
+# backend_fastapi/services/generation_pool.py
+"""
+Pool persistente de procesos para el trabajo de CPU de la generación.
+
+El event loop solo espera el resultado: la generación corre en procesos
+separados, de modo que una sopa lenta no bloquea al resto de peticiones (ni a
+los health checks). El tamaño se configura con ``SOPA_POOL_SIZE`` (0 = ejecutar
+en el threadpool, útil para desarrollo) y el método de arranque con
+``SOPA_POOL_START_METHOD`` (por defecto ``spawn``, seguro con hilos activos).
+
+``stream`` ejecuta además con progreso: el proceso hijo envía eventos por una
+cola compartida de un ``multiprocessing.Manager`` y consulta si su stream fue
+cancelado, de modo que el cliente puede abandonar una generación larga y
+liberar el proceso. Un único hilo lector reparte los eventos de todos los
+streams a sus ``asyncio.Queue`` con ``call_soon_threadsafe``: un stream abierto
+no ocupa ningún hilo del threadpool.
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+def _ejecutar_medido(fn: Callable, args: tuple) -> Tuple[float, Any]:
+    """Ejecutar ``fn`` en el proceso hijo y devolver también su tiempo de ejecución."""
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def _ejecutar_con_progreso(fn: Callable, args: tuple, reportero: "_Reportero") -> Tuple[float, Any]:
+    inicio = time.perf_counter()
+    try:
+        resultado = fn(*args, progress=reportero)
+    finally:
+        reportero.fin()
+    return time.perf_counter() - inicio, resultado
+
+
+class _Reportero:
+    """Callback de progreso enviado al proceso hijo.
+
+    Reenvía como mucho un evento cada ``intervalo`` segundos (y siempre al cambiar
+    de tamaño de grilla) y devuelve True cuando el solicitante pidió cancelar.
+    """
+
+    def __init__(self, cola, cancelados, stream_id: int, intervalo: float):
+        self.cola = cola
+        self.cancelados = cancelados
+        self.stream_id = stream_id
+        self.intervalo = intervalo
+        self._ultimo = 0.0
+        self._grid_size = None
+
+    def __call__(self, evento: Dict[str, Any]) -> bool:
+        ahora = time.monotonic()
+        if evento.get("grid_size") == self._grid_size and ahora - self._ultimo < self.intervalo:
+            return False
+        self._ultimo = ahora
+        self._grid_size = evento.get("grid_size")
+        self.cola.put((self.stream_id, evento))
+        return self.stream_id in self.cancelados
+
+    def fin(self) -> None:
+        """Marcar el último evento: el hilo lector puede ir por detrás del resultado."""
+        self.cola.put((self.stream_id, None))
+
+
+class _Canal:
+    """Cola de eventos y conjunto de cancelados compartidos por todos los streams.
+
+    El hilo lector es el único que habla con el Manager desde el proceso
+    principal: entrega cada evento al bucle de su stream y aplica las
+    cancelaciones, así el bucle de eventos nunca hace E/S bloqueante.
+    """
+
+    ESPERA = 0.05
+
+    def __init__(self, cola, cancelados):
+        self.cola = cola
+        self.cancelados = cancelados
+        self._suscriptores: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self._pendientes: "queue.SimpleQueue[Tuple[int, bool]]" = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._leer, name="generation-pool-eventos", daemon=True)
+        self._hilo.start()
+
+    def suscribir(self) -> Tuple[int, asyncio.Queue]:
+        stream_id = next(self._ids)
+        eventos: asyncio.Queue = asyncio.Queue()
+        self._suscriptores[stream_id] = (asyncio.get_running_loop(), eventos)
+        return stream_id, eventos
+
+    def terminar(self, stream_id: int, cancelar: bool) -> None:
+        """Dejar de repartir eventos del stream y pedirle que pare o borrar su marca."""
+        self._suscriptores.pop(stream_id, None)
+        self._pendientes.put((stream_id, cancelar))
+
+    def cerrar(self) -> None:
+        self._parar.set()
+
+    def _aplicar_pendientes(self) -> None:
+        while True:
+            try:
+                stream_id, cancelar = self._pendientes.get_nowait()
+            except queue.Empty:
+                return
+            if cancelar:
+                self.cancelados[stream_id] = True
+            else:
+                self.cancelados.pop(stream_id, None)
+
+    def _leer(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self._aplicar_pendientes()
+                stream_id, evento = self.cola.get(timeout=self.ESPERA)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):  # el Manager se detuvo
+                return
+            destino = self._suscriptores.get(stream_id)
+            if destino is not None:
+                loop, eventos = destino
+                try:
+                    loop.call_soon_threadsafe(eventos.put_nowait, evento)
+                except RuntimeError:  # el bucle de ese stream ya se cerró
+                    self._suscriptores.pop(stream_id, None)
+
+
+class GenerationPool:
+    """ProcessPoolExecutor de vida larga con métricas de cola y de ejecución."""
+
+    def __init__(self, max_workers: Optional[int] = None, start_method: Optional[str] = None):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._canal_eventos: Optional[_Canal] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.pending = 0
+        self.total_exec_seconds = 0.0
+        self.max_exec_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "GenerationPool":
+        """Construir el pool a partir de variables de entorno."""
+        size = os.getenv("SOPA_POOL_SIZE")
+        return cls(
+            max_workers=int(size) if size else None,
+            start_method=os.getenv("SOPA_POOL_START_METHOD", "spawn"),
+        )
+
+    def start(self) -> None:
+        """Crear los procesos (idempotente)."""
+        if self.max_workers <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                contexto = multiprocessing.get_context(self.start_method) if self.start_method else None
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=contexto)
+
+    def shutdown(self) -> None:
+        """Detener los procesos y cancelar el trabajo aún no iniciado."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._canal_eventos is not None:
+                self._canal_eventos.cerrar()
+                self._canal_eventos = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+    def _canal(self) -> _Canal:
+        """Canal de eventos compartible con el ejecutor actual (se crea una vez)."""
+        with self._lock:
+            if self._canal_eventos is None:
+                if self._executor is None:
+                    self._canal_eventos = _Canal(queue.Queue(), {})
+                else:
+                    if self._manager is None:
+                        contexto = (multiprocessing.get_context(self.start_method)
+                                    if self.start_method else multiprocessing)
+                        self._manager = contexto.Manager()
+                    self._canal_eventos = _Canal(self._manager.Queue(), self._manager.dict())
+            return self._canal_eventos
+
+    def _registrar(self, segundos: float, encolado: float) -> None:
+        self.completed += 1
+        self.total_exec_seconds += segundos
+        self.max_exec_seconds = max(self.max_exec_seconds, segundos)
+        self.total_wait_seconds += max(0.0, time.perf_counter() - encolado - segundos)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Ejecutar ``fn(*args)`` en el pool sin bloquear el event loop.
+
+        ``fn`` debe ser una función de nivel de módulo (se envía por pickle).
+        """
+        self.start()
+        self.submitted += 1
+        self.pending += 1
+        encolado = time.perf_counter()
+        try:
+            if self._executor is None:
+                segundos, resultado = await run_in_threadpool(_ejecutar_medido, fn, args)
+            else:
+                loop = asyncio.get_running_loop()
+                segundos, resultado = await loop.run_in_executor(self._executor, _ejecutar_medido, fn, args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self._registrar(segundos, encolado)
+        return resultado
+
+    async def stream(self, fn: Callable, *args, interval: float = 0.1) -> AsyncIterator[Tuple[str, Any]]:
+        """Ejecutar ``fn(*args, progress=...)`` y producir ``("progreso", evento)`` y ``("resultado", r)``.
+
+        Si el consumidor deja de iterar (p. ej. el cliente se desconecta), se pide
+        al proceso hijo que se detenga en su siguiente reporte de progreso.
+        """
+        self.start()
+        canal = self._canal_eventos
+        if canal is None:
+            # Solo al principio: arrancar el Manager bloquea unos instantes
+            canal = self._canal() if self._executor is None else await run_in_threadpool(self._canal)
+        stream_id, eventos = canal.suscribir()
+        reportero = _Reportero(canal.cola, canal.cancelados, stream_id, interval)
+        self.submitted += 1
+        self.pending += 1
+        encolado = time.perf_counter()
+        if self._executor is None:
+            futuro = asyncio.ensure_future(run_in_threadpool(_ejecutar_con_progreso, fn, args, reportero))
+        else:
+            futuro = asyncio.get_running_loop().run_in_executor(
+                self._executor, _ejecutar_con_progreso, fn, args, reportero
+            )
+        # Si se abandona el futuro, evitar "exception was never retrieved"
+        futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+        terminado = False
+        try:
+            while True:
+                if futuro.done() and (futuro.cancelled() or futuro.exception() is not None):
+                    break  # si el proceso hijo murió, la marca de fin no llegará
+                siguiente = asyncio.ensure_future(eventos.get())
+                try:
+                    await asyncio.wait({siguiente} if futuro.done() else {siguiente, futuro},
+                                       return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    siguiente.cancel()
+                if siguiente.done() and not siguiente.cancelled():
+                    evento = siguiente.result()
+                    if evento is None:
+                        break
+                    yield "progreso", evento
+            try:
+                segundos, resultado = await futuro
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                terminado = True
+                self.pending -= 1
+            self._registrar(segundos, encolado)
+            yield "resultado", resultado
+        finally:
+            canal.terminar(stream_id, cancelar=not terminado)
+            if not terminado:
+                self.pending -= 1
+                self.cancelled += 1
+                # La marca de cancelación se borra cuando el proceso hijo por fin termina
+                futuro.add_done_callback(lambda _f: canal.terminar(stream_id, cancelar=False))
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de cola y tiempos de ejecución."""
+        workers = max(self.max_workers, 0)
+        en_ejecucion = min(self.pending, workers) if workers else self.pending
+        return {
+            "workers": workers,
+            "started": self._executor is not None,
+            "pending": self.pending,
+            "running": en_ejecucion,
+            "queue_depth": self.pending - en_ejecucion,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "avg_exec_ms": round(self.total_exec_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "max_exec_ms": round(self.max_exec_seconds * 1000, 3),
+            "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+        }
+
+
+# Pool compartido por el router de diagramación; main.py lo arranca y detiene con la app
+generation_pool = GenerationPool.from_env()
@@ -0,0 +1,242 @@
+# backend_fastapi/services/grid_codec.py
+"""
+Codificación compacta de la grilla y las colocaciones de ``sopas_generadas``.
+
+En JSON, una grilla de 30x30 es una lista de listas de letras entrecomilladas
+(~4,5 KB) y cada colocación un diccionario con claves repetidas. En formato
+compacto se guardan como una única cadena JSON:
+
+- grilla: ``g1:<filas>:<columnas>:<letras fila a fila>``
+- colocaciones: ``p1:<registros>:<palabras>`` con un registro de ancho fijo
+  por palabra (inicio, fin y dirección; 9 bytes en base64) y las palabras
+  separadas por ``\\x1f``
+
+Con ``SOPA_GRID_STORAGE=compact+zlib`` (o ``compact+zstd`` si está instalado
+``zstandard``) el contenido además se comprime (prefijos ``g1z``/``p1z`` y
+``g1s``/``p1s``). Lo que no encaja en el formato (celdas de varias letras,
+colocaciones con otras claves) se guarda tal cual en JSON. La lectura acepta
+ambos formatos, así que las filas antiguas siguen funcionando; para
+convertirlas:
+
+    python -m services.grid_codec backfill --batch-size 1000
+"""
+
+import argparse
+import base64
+import json
+import os
+import struct
+import sys
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:  # zstd es opcional: sin el paquete se usa zlib
+    import zstandard
+except ImportError:  # pragma: no cover - depende del entorno
+    zstandard = None
+
+STORAGE_MODES = ("json", "compact", "compact+zlib", "compact+zstd")
+
+DIRECCIONES = (
+    "HORIZONTAL", "HORIZONTAL INV", "VERTICAL", "VERTICAL INV",
+    "DIAGONAL", "DIAGONAL INV", "ANTI DIAGONAL", "ANTI DIAGONAL INV",
+)
+_CODIGO_DIRECCION = {nombre: i for i, nombre in enumerate(DIRECCIONES)}
+_REGISTRO = struct.Struct(">HHHHB")
+_CLAVES_COLOCACION = {"palabra", "inicio", "fin", "direccion"}
+_SEPARADOR = "\x1f"
+
+
+def storage_mode() -> str:
+    """Formato de escritura configurado en ``SOPA_GRID_STORAGE`` (por defecto ``compact``)."""
+    modo = os.getenv("SOPA_GRID_STORAGE", "compact").lower()
+    if modo not in STORAGE_MODES:
+        raise ValueError(f"SOPA_GRID_STORAGE desconocido: {modo} (opciones: {', '.join(STORAGE_MODES)})")
+    if modo == "compact+zstd" and zstandard is None:
+        return "compact+zlib"
+    return modo
+
+
+# ---------- compresión ----------
+
+def _comprimir(datos: bytes, modo: str) -> Tuple[str, str]:
+    """(sufijo de prefijo, base64) del contenido comprimido."""
+    if modo == "compact+zstd" and zstandard is not None:
+        return "s", base64.b64encode(zstandard.ZstdCompressor(level=10).compress(datos)).decode("ascii")
+    return "z", base64.b64encode(zlib.compress(datos, 9)).decode("ascii")
+
+
+def _descomprimir(sufijo: str, texto: str) -> bytes:
+    datos = base64.b64decode(texto)
+    if sufijo == "s":
+        if zstandard is None:
+            raise ValueError("Sopa comprimida con zstd pero el paquete zstandard no está instalado")
+        return zstandard.ZstdDecompressor().decompress(datos)
+    return zlib.decompress(datos)
+
+
+# ---------- grilla ----------
+
+def encode_grid(grid: Any, modo: Optional[str] = None) -> Any:
+    """Grilla en formato compacto, o la misma grilla si no encaja en el formato."""
+    modo = modo or storage_mode()
+    if modo == "json" or not isinstance(grid, list) or not grid:
+        return grid
+    columnas = len(grid[0]) if isinstance(grid[0], list) else -1
+    if columnas <= 0 or any(
+        not isinstance(fila, list) or len(fila) != columnas
+        or not all(isinstance(celda, str) and len(celda) == 1 for celda in fila)
+        for fila in grid
+    ):
+        return grid
+    letras = "".join("".join(fila) for fila in grid)
+    if modo == "compact":
+        return f"g1:{len(grid)}:{columnas}:{letras}"
+    sufijo, datos = _comprimir(letras.encode("utf-8"), modo)
+    return f"g1{sufijo}:{len(grid)}:{columnas}:{datos}"
+
+
+def decode_grid(valor: Any) -> Any:
+    """Grilla como lista de listas a partir de cualquiera de los formatos."""
+    if not isinstance(valor, str) or not valor.startswith("g1"):
+        return valor
+    prefijo, filas, columnas, datos = valor.split(":", 3)
+    if prefijo != "g1":
+        datos = _descomprimir(prefijo[2:], datos).decode("utf-8")
+    filas, columnas = int(filas), int(columnas)
+    return [list(datos[i * columnas:(i + 1) * columnas]) for i in range(filas)]
+
+
+# ---------- colocaciones ----------
+
+def _registro(colocacion: Any) -> Optional[bytes]:
+    if not isinstance(colocacion, dict) or set(colocacion) != _CLAVES_COLOCACION:
+        return None
+    palabra = colocacion["palabra"]
+    codigo = _CODIGO_DIRECCION.get(colocacion["direccion"])
+    try:
+        (r0, c0), (r1, c1) = colocacion["inicio"], colocacion["fin"]
+        if codigo is None or not isinstance(palabra, str) or _SEPARADOR in palabra:
+            return None
+        return _REGISTRO.pack(r0, c0, r1, c1, codigo)
+    except (TypeError, ValueError, struct.error):
+        return None
+
+
+def encode_positions(posiciones: Any, modo: Optional[str] = None) -> Any:
+    """Colocaciones como registros de ancho fijo, o las mismas si alguna no encaja."""
+    modo = modo or storage_mode()
+    if modo == "json" or not isinstance(posiciones, list) or not posiciones:
+        return posiciones
+    registros = [_registro(p) for p in posiciones]
+    if any(r is None for r in registros):
+        return posiciones
+    palabras = _SEPARADOR.join(p["palabra"] for p in posiciones)
+    if modo == "compact":
+        return f"p1:{base64.b64encode(b''.join(registros)).decode('ascii')}:{palabras}"
+    contenido = struct.pack(">I", len(registros)) + b"".join(registros) + palabras.encode("utf-8")
+    sufijo, datos = _comprimir(contenido, modo)
+    return f"p1{sufijo}:{datos}"
+
+
+def decode_positions(valor: Any) -> Any:
+    """Colocaciones como lista de diccionarios a partir de cualquiera de los formatos."""
+    if not isinstance(valor, str) or not valor.startswith("p1"):
+        return valor
+    prefijo, resto = valor.split(":", 1)
+    if prefijo == "p1":
+        registros_b64, palabras = resto.split(":", 1)
+        registros = base64.b64decode(registros_b64)
+    else:
+        contenido = _descomprimir(prefijo[2:], resto)
+        (cantidad,) = struct.unpack_from(">I", contenido)
+        fin_registros = 4 + cantidad * _REGISTRO.size
+        registros = contenido[4:fin_registros]
+        palabras = contenido[fin_registros:].decode("utf-8")
+    return [
+        {"palabra": palabra, "inicio": [r0, c0], "fin": [r1, c1], "direccion": DIRECCIONES[codigo]}
+        for palabra, (r0, c0, r1, c1, codigo) in zip(
+            palabras.split(_SEPARADOR), _REGISTRO.iter_unpack(registros)
+        )
+    ]
+
+
+# ---------- backfill ----------
+
+def convertir_sopas(db, batch_size: int = 1000, modo: Optional[str] = None,
+                    progreso: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """Reescribir en formato compacto las sopas guardadas en JSON, por lotes de id.
+
+    Se puede interrumpir y relanzar: las filas ya compactas se saltan.
+    """
+    from sqlalchemy import column, select, table, update  # pylint: disable=import-outside-toplevel
+    from database import JSON_TYPE  # pylint: disable=import-outside-toplevel
+
+    modo = modo or storage_mode()
+    # Vista de la tabla con JSON sin decodificar: se lee y escribe el valor almacenado tal cual
+    sopas = table("sopas_generadas", column("id"), column("grid", JSON_TYPE), column("word_positions", JSON_TYPE))
+    stats = {"revisadas": 0, "convertidas": 0, "bytes_antes": 0, "bytes_despues": 0}
+    ultimo_id = ""
+    while True:
+        lote = db.execute(
+            select(sopas.c.id, sopas.c.grid, sopas.c.word_positions)
+            .where(sopas.c.id > ultimo_id)
+            .order_by(sopas.c.id)
+            .limit(batch_size)
+        ).all()
+        if not lote:
+            break
+        for sopa_id, grid, posiciones in lote:
+            nuevo_grid = encode_grid(decode_grid(grid), modo)
+            nuevas_posiciones = encode_positions(decode_positions(posiciones), modo)
+            if nuevo_grid == grid and nuevas_posiciones == posiciones:
+                continue
+            stats["convertidas"] += 1
+            stats["bytes_antes"] += len(json.dumps(grid)) + len(json.dumps(posiciones))
+            stats["bytes_despues"] += len(json.dumps(nuevo_grid)) + len(json.dumps(nuevas_posiciones))
+            db.execute(
+                update(sopas).where(sopas.c.id == sopa_id)
+                .values(grid=nuevo_grid, word_positions=nuevas_posiciones)
+            )
+        db.commit()
+        stats["revisadas"] += len(lote)
+        ultimo_id = lote[-1][0]
+        if progreso:
+            progreso(stats)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI de conversión de sopas antiguas."""
+    parser = argparse.ArgumentParser(description="Formato compacto de grillas y colocaciones")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    backfill = sub.add_parser("backfill", help="Convertir las sopas guardadas en JSON")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.add_argument("--modo", choices=STORAGE_MODES, default=None,
+                          help="Formato destino (por defecto SOPA_GRID_STORAGE); 'json' revierte")
+    backfill.add_argument("--vacuum", action="store_true", help="Compactar el archivo SQLite al terminar")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import text  # pylint: disable=import-outside-toplevel
+    from database import SessionLocal, engine  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        stats = convertir_sopas(
+            db, args.batch_size, args.modo,
+            progreso=lambda s: print(f"   ... {s['revisadas']} sopas revisadas, {s['convertidas']} convertidas",
+                                     file=sys.stderr),
+        )
+    finally:
+        db.close()
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as conexion:
+            conexion.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    reduccion = stats["bytes_antes"] / stats["bytes_despues"] if stats["bytes_despues"] else 0
+    print(f"✅ {stats['convertidas']} de {stats['revisadas']} sopas convertidas "
+          f"({stats['bytes_antes']} → {stats['bytes_despues']} bytes, {reduccion:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
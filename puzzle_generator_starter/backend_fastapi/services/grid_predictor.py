@@ -0,0 +1,349 @@
+# backend_fastapi/services/grid_predictor.py
+"""
+Predicción del tamaño inicial de grilla a partir del histórico de generaciones.
+
+La regla fija ``max(16, palabra más larga + 6)`` se queda corta con listas
+largas: el generador agota 200 intentos por tamaño antes de crecer. Este módulo
+ajusta una regresión logística pequeña que estima la probabilidad de éxito a
+un tamaño dado a partir de rasgos de la lista (número de palabras, letras
+totales, palabra más larga, direcciones permitidas) y elige el menor tamaño
+con probabilidad alta. Sin modelo entrenado se usa la regla de siempre.
+
+El entrenamiento es offline: se reproducen las listas del histórico
+(``sopas_generadas``) o de un JSONL probando tamaños crecientes, y se guarda un
+JSON con los coeficientes en ``SOPA_GRID_MODEL_PATH``.
+
+    python -m services.grid_predictor train --from-db --limite 5000
+    python -m services.grid_predictor train --input listas.jsonl
+    python -m services.grid_predictor predict sol luna estrella cometa
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TAMANO_MINIMO = 16
+TAMANO_MAXIMO = 100
+OBJETIVO_POR_DEFECTO = 0.9
+
+CARACTERISTICAS = (
+    "sesgo",
+    "densidad",
+    "densidad_cuadrado",
+    "largo_relativo",
+    "palabras_por_lado",
+    "direcciones",
+    "densidad_por_direcciones",
+)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "grid_size_model.json")
+
+
+def regla_tamano(largo_maximo: int) -> int:
+    """Regla fija histórica del generador."""
+    return max(TAMANO_MINIMO, largo_maximo + 6)
+
+
+def _matriz(longitudes: Sequence[int], n_direcciones: int, tamanos: np.ndarray) -> np.ndarray:
+    """Rasgos de la lista para cada tamaño candidato (una fila por tamaño)."""
+    tamanos = np.asarray(tamanos, dtype=np.float64)
+    densidad = sum(longitudes) / (tamanos * tamanos)
+    direcciones = np.full_like(tamanos, n_direcciones / 8.0)
+    return np.column_stack([
+        np.ones_like(tamanos),
+        densidad,
+        densidad * densidad,
+        max(longitudes) / tamanos,
+        len(longitudes) / tamanos,
+        direcciones,
+        densidad * direcciones,
+    ])
+
+
+class GridSizePredictor:
+    """Regresión logística sobre los rasgos de ``_matriz``."""
+
+    def __init__(self, coeficientes: Sequence[float], objetivo: float = OBJETIVO_POR_DEFECTO,
+                 info: Optional[Dict[str, Any]] = None):
+        if len(coeficientes) != len(CARACTERISTICAS):
+            raise ValueError("Número de coeficientes incompatible con los rasgos del modelo")
+        self.coeficientes = np.asarray(coeficientes, dtype=np.float64)
+        self.objetivo = objetivo
+        self.info = info or {}
+
+    def probabilidades(self, longitudes: Sequence[int], n_direcciones: int, tamanos: Sequence[int]) -> np.ndarray:
+        """Probabilidad estimada de colocar todas las palabras con cada tamaño."""
+        z = _matriz(longitudes, n_direcciones, np.asarray(tamanos)) @ self.coeficientes
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -50, 50)))
+
+    def predecir(self, longitudes: Sequence[int], n_direcciones: int,
+                 minimo: Optional[int] = None, maximo: int = TAMANO_MAXIMO) -> Optional[int]:
+        """Menor tamaño con probabilidad >= objetivo, o ``None`` si ninguno la alcanza."""
+        minimo = minimo if minimo is not None else max(TAMANO_MINIMO, max(longitudes))
+        if minimo > maximo:
+            return None
+        tamanos = np.arange(minimo, maximo + 1)
+        aptos = np.flatnonzero(self.probabilidades(longitudes, n_direcciones, tamanos) >= self.objetivo)
+        return int(tamanos[aptos[0]]) if aptos.size else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "caracteristicas": list(CARACTERISTICAS),
+            "coeficientes": [float(c) for c in self.coeficientes],
+            "objetivo": self.objetivo,
+            **self.info,
+        }
+
+    @classmethod
+    def from_dict(cls, datos: Dict[str, Any]) -> "GridSizePredictor":
+        if datos.get("caracteristicas") != list(CARACTERISTICAS):
+            raise ValueError("El modelo se entrenó con otros rasgos; vuelva a entrenarlo")
+        info = {k: v for k, v in datos.items() if k not in ("version", "caracteristicas", "coeficientes", "objetivo")}
+        return cls(datos["coeficientes"], datos.get("objetivo", OBJETIVO_POR_DEFECTO), info)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporal = f"{path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temporal, path)
+
+    @classmethod
+    def load(cls, path: str) -> "GridSizePredictor":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+_predictor: Optional[GridSizePredictor] = None
+_predictor_origen: Optional[Tuple[str, float]] = None
+
+
+def get_predictor() -> Optional[GridSizePredictor]:
+    """Modelo en ``SOPA_GRID_MODEL_PATH`` (recargado si el archivo cambia), o ``None``."""
+    global _predictor, _predictor_origen  # pylint: disable=global-statement
+    path = os.getenv("SOPA_GRID_MODEL_PATH", DEFAULT_MODEL_PATH)
+    try:
+        origen = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    if origen != _predictor_origen:
+        try:
+            _predictor = GridSizePredictor.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Modelo de tamaño de grilla inválido ({path}): {e}", file=sys.stderr)
+            _predictor = None
+        _predictor_origen = origen
+    return _predictor
+
+
+def tamano_inicial(longitudes: Sequence[int], n_direcciones: int) -> int:
+    """Tamaño con el que empezar a generar: predicción del modelo o, en su defecto, la regla fija."""
+    predictor = get_predictor()
+    if predictor is not None:
+        predicho = predictor.predecir(longitudes, n_direcciones)
+        if predicho is not None:
+            return predicho
+    return regla_tamano(max(longitudes))
+
+
+# ========== ENTRENAMIENTO ==========
+
+def _etiquetar(trabajo: Dict[str, Any]) -> List[Tuple[List[int], int, int, bool]]:
+    """Reproducir una lista con tamaños crecientes hasta el primero que funciona."""
+    from services.sopa_generator import WordSearchGenerator  # pylint: disable=import-outside-toplevel
+
+    generador = WordSearchGenerator(
+        trabajo["palabras"],
+        grid_size=TAMANO_MAXIMO,
+        allow_diagonal=trabajo.get("allow_diagonal", True),
+        allow_reverse=trabajo.get("allow_reverse", True),
+        seed=trabajo["seed"],
+    )
+    longitudes = [len(w) for w in generador.words]
+    n_direcciones = len(generador.directions)
+    # Por debajo de este tamaño las letras no caben ni solapándose poco: fracaso seguro
+    tamano = max(max(longitudes), math.isqrt(sum(longitudes)))
+    muestras = []
+    while tamano <= TAMANO_MAXIMO:
+        generador.grid_size = tamano
+        exito = generador.try_current_size() is not None
+        muestras.append((longitudes, n_direcciones, tamano, exito))
+        if exito:
+            break
+        tamano += 1
+    return muestras
+
+
+def ajustar(muestras: Sequence[Tuple[Sequence[int], int, int, bool]], l2: float = 1e-3,
+            iteraciones: int = 100) -> np.ndarray:
+    """Regresión logística por Newton-Raphson (IRLS) con regularización L2."""
+    x = np.vstack([_matriz(lon, dirs, np.array([tam])) for lon, dirs, tam, _ in muestras])
+    y = np.array([1.0 if exito else 0.0 for *_, exito in muestras])
+    w = np.zeros(x.shape[1])
+    identidad = np.eye(x.shape[1]) * l2
+    for _ in range(iteraciones):
+        p = 1.0 / (1.0 + np.exp(-np.clip(x @ w, -50, 50)))
+        gradiente = x.T @ (p - y) + l2 * w
+        hessiana = (x.T * (p * (1 - p))) @ x + identidad
+        paso = np.linalg.solve(hessiana, gradiente)
+        w -= paso
+        if np.max(np.abs(paso)) < 1e-8:
+            break
+    return w
+
+
+def entrenar(trabajos: Sequence[Dict[str, Any]], workers: int = 1,
+             objetivo: float = OBJETIVO_POR_DEFECTO) -> GridSizePredictor:
+    """Etiquetar las listas reproduciéndolas y ajustar el modelo."""
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lotes = list(pool.map(_etiquetar, trabajos, chunksize=16))
+    else:
+        lotes = [_etiquetar(t) for t in trabajos]
+    muestras = [m for lote in lotes for m in lote]
+    if not any(m[3] for m in muestras) or all(m[3] for m in muestras):
+        raise ValueError("Hacen falta listas con éxitos y fracasos para entrenar el modelo")
+
+    predictor = GridSizePredictor(ajustar(muestras), objetivo)
+    # Tamaño mínimo que funcionó en cada lista frente a la regla fija y a la predicción;
+    # empezar por debajo obliga a agotar 200 intentos antes de crecer
+    finales = [lote[-1] for lote in lotes if lote and lote[-1][3]]
+    necesarios = np.array([f[2] for f in finales], dtype=np.float64)
+    regla = np.array([regla_tamano(max(lon)) for lon, *_ in finales], dtype=np.float64)
+    predichos = np.array([predictor.predecir(lon, dirs) or regla_tamano(max(lon))
+                          for lon, dirs, *_ in finales], dtype=np.float64)
+    predictor.info = {
+        "listas": len(trabajos),
+        "muestras": len(muestras),
+        "entrenado": datetime.now(timezone.utc).isoformat(),
+    }
+    if finales:
+        predictor.info.update({
+            "tamano_necesario_medio": round(float(necesarios.mean()), 3),
+            "tamano_regla_medio": round(float(regla.mean()), 3),
+            "tamano_predicho_medio": round(float(predichos.mean()), 3),
+            "crecen_con_regla": round(float((regla < necesarios).mean()), 4),
+            "crecen_con_prediccion": round(float((predichos < necesarios).mean()), 4),
+        })
+    return predictor
+
+
+def _leer_historial_db(limite: int) -> Iterator[Dict[str, Any]]:
+    """Listas de las sopas guardadas más recientes, con las direcciones que se usaron."""
+    from database import SessionLocal, SopaGenerada  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        query = (db.query(SopaGenerada.palabras, SopaGenerada.word_positions)
+                 .order_by(SopaGenerada.created_at.desc())
+                 .limit(limite)
+                 .yield_per(500))
+        for palabras, posiciones in query:
+            textos = [
+                p.get("texto", "").strip() if isinstance(p, dict) else str(p).strip()
+                for p in (palabras or [])
+            ]
+            textos = [t for t in textos if t]
+            if not textos:
+                continue
+            direcciones = [str(p.get("direccion", "")) for p in (posiciones or []) if isinstance(p, dict)]
+            yield {
+                "palabras": textos,
+                "allow_diagonal": any("DIAGONAL" in d for d in direcciones),
+                "allow_reverse": any("INV" in d for d in direcciones),
+            }
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI para entrenar y consultar el modelo."""
+    parser = argparse.ArgumentParser(description="Predicción del tamaño inicial de grilla")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    train = sub.add_parser("train", help="Entrenar a partir del histórico o de un archivo de listas")
+    origen = train.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--from-db", action="store_true", help="Usar las listas de sopas_generadas")
+    origen.add_argument("--input", help="Archivo .jsonl o .csv (formato de services.sopa_generator)")
+    train.add_argument("--limite", type=int, default=5000, help="Máximo de listas a reproducir")
+    train.add_argument("--output", default=os.getenv("SOPA_GRID_MODEL_PATH", DEFAULT_MODEL_PATH))
+    train.add_argument("--objetivo", type=float, default=OBJETIVO_POR_DEFECTO,
+                       help="Probabilidad de éxito mínima para elegir un tamaño")
+    train.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    train.add_argument("--seed", type=int, default=0)
+
+    predict = sub.add_parser("predict", help="Tamaño inicial para una lista de palabras")
+    predict.add_argument("palabras", nargs="+")
+    predict.add_argument("--sin-diagonales", action="store_true")
+    predict.add_argument("--sin-reves", action="store_true")
+    args = parser.parse_args(argv)
+
+    from services.sopa_generator import (  # pylint: disable=import-outside-toplevel
+        WordSearchGenerator,
+        _leer_trabajos_csv,
+        _leer_trabajos_jsonl,
+        derive_seed,
+    )
+
+    if args.comando == "predict":
+        generador = WordSearchGenerator(
+            args.palabras, grid_size=TAMANO_MAXIMO,
+            allow_diagonal=not args.sin_diagonales, allow_reverse=not args.sin_reves,
+        )
+        longitudes = [len(w) for w in generador.words]
+        print(json.dumps({
+            "regla": regla_tamano(max(longitudes)),
+            "tamano_inicial": tamano_inicial(longitudes, len(generador.directions)),
+            "modelo": get_predictor() is not None,
+        }, ensure_ascii=False))
+        return 0
+
+    if args.from_db:
+        registros = _leer_historial_db(args.limite)
+    elif args.input.lower().endswith(".csv"):
+        registros = _leer_trabajos_csv(args.input)
+    else:
+        registros = _leer_trabajos_jsonl(args.input)
+
+    rng = random.Random(args.seed)
+    trabajos = []
+    for numero, registro in enumerate(registros):
+        if len(trabajos) >= args.limite:
+            break
+        if registro.get("palabras"):
+            trabajos.append({**registro, "seed": derive_seed(args.seed, str(registro.get("id", numero)))})
+    rng.shuffle(trabajos)
+    if not trabajos:
+        print("❌ No hay listas de palabras para entrenar", file=sys.stderr)
+        return 1
+
+    inicio = time.perf_counter()
+    try:
+        predictor = entrenar(trabajos, workers=args.workers, objetivo=args.objetivo)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    predictor.save(args.output)
+    info = predictor.info
+    print(f"✅ Modelo entrenado con {info['listas']} listas ({info['muestras']} muestras) "
+          f"en {time.perf_counter() - inicio:.1f}s → {args.output}")
+    if "tamano_regla_medio" in info:
+        print(f"   Tamaño inicial medio: regla {info['tamano_regla_medio']}, predicho {info['tamano_predicho_medio']} "
+              f"(necesario {info['tamano_necesario_medio']})")
+        print(f"   Listas que deben crecer: regla {info['crecen_con_regla']:.1%}, "
+              f"predicción {info['crecen_con_prediccion']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# backend_fastapi/services/migraciones.py
+"""
+Migraciones versionadas del esquema con alembic (carpeta ``migrations/``).
+
+``database`` ya no crea las tablas al importarse. Al arrancar, la aplicación
+solo lee la revisión guardada en ``alembic_version`` y la compara con la última
+de ``migrations/versions``; si la base está atrasada la actualiza, o con
+``SOPA_AUTO_MIGRATE=0`` se niega a arrancar hasta que se migre a mano:
+
+    alembic upgrade head                          # desde backend_fastapi/
+    alembic revision --autogenerate -m "..."      # tras cambiar un modelo
+
+La revisión base adopta las bases creadas antes con ``create_all`` y
+``add_columns.py``: solo añade lo que les falta, índices incluidos.
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTO_MIGRAR = os.getenv("SOPA_AUTO_MIGRATE", "1") != "0"
+
+# Objetos que crean services.tema_search y services.tema_facets fuera de los modelos
+_TABLAS_AJENAS = ("temas_fts", "tema_etiquetas")
+_INDICES_AJENOS = {"ix_tema_search", "ix_tema_etiquetas_gin", "ix_tema_etiquetas_tema"}
+
+
+def incluir_objeto(_objeto, nombre, tipo, _reflejado, _comparado) -> bool:
+    """Filtro de autogenerate: no proponer borrar el índice de búsqueda ni el de etiquetas."""
+    if tipo == "table":
+        return not (nombre or "").startswith(_TABLAS_AJENAS)
+    if tipo == "index":
+        return nombre not in _INDICES_AJENOS
+    if tipo == "column":
+        return nombre != "search_vector"
+    return True
+
+
+def _config(conexion=None):
+    from alembic.config import Config  # pylint: disable=import-outside-toplevel
+
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    if conexion is not None:
+        config.attributes["connection"] = conexion
+    return config
+
+
+@lru_cache(maxsize=1)
+def revision_objetivo() -> str:
+    """Última revisión de ``migrations/versions`` (la que espera el código)."""
+    from alembic.script import ScriptDirectory  # pylint: disable=import-outside-toplevel
+
+    return ScriptDirectory.from_config(_config()).get_current_head()
+
+
+def revision_actual(conexion) -> Optional[str]:
+    """Revisión aplicada a la base, o ``None`` si nunca se migró."""
+    from alembic.runtime.migration import MigrationContext  # pylint: disable=import-outside-toplevel
+
+    return MigrationContext.configure(conexion).get_current_revision()
+
+
+def actualizar(engine=None, revision: str = "head") -> None:
+    """Aplicar las migraciones pendientes (equivale a ``alembic upgrade head``)."""
+    from alembic import command  # pylint: disable=import-outside-toplevel
+
+    if engine is None:
+        from database import engine  # pylint: disable=import-outside-toplevel
+    with engine.begin() as conexion:
+        command.upgrade(_config(conexion), revision)
+
+
+def comprobar(engine=None, auto_migrar: bool = AUTO_MIGRAR) -> str:
+    """Verificar al arrancar que la base está en la última revisión.
+
+    Con la base al día solo cuesta leer ``alembic_version``. Devuelve la
+    revisión final; lanza ``RuntimeError`` si falta migrar y ``auto_migrar``
+    está desactivado.
+    """
+    if engine is None:
+        from database import engine  # pylint: disable=import-outside-toplevel
+    with engine.connect() as conexion:
+        actual = revision_actual(conexion)
+    objetivo = revision_objetivo()
+    if actual == objetivo:
+        return actual
+    if not auto_migrar:
+        raise RuntimeError(
+            f"La base de datos está en la revisión {actual or 'ninguna'} y el código espera "
+            f"{objetivo}: ejecuta 'alembic upgrade head'"
+        )
+    print(f"🔄 Migrando base de datos: {actual or 'sin versión'} → {objetivo}")
+    actualizar(engine)
+    return objetivo
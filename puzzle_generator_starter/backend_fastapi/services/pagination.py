@@ -0,0 +1,88 @@
+# backend_fastapi/services/pagination.py
+"""
+Paginación por clave ("keyset") de los listados de la API.
+
+Las páginas se ordenan por ``(created_at, id)`` descendente y el cursor es la
+clave de la última fila devuelta, codificada de forma opaca. La siguiente página
+es ``WHERE (created_at, id) < cursor``: con el índice compuesto adecuado cuesta
+lo mismo la página 1 que la 10 000, a diferencia de ``OFFSET``.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("SOPA_PAGE_SIZE", "200"))
+MAX_PAGE_SIZE = int(os.getenv("SOPA_MAX_PAGE_SIZE", "1000"))
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no lo generó esta API."""
+
+
+def _encode(clave: List[Any]) -> str:
+    data = json.dumps(clave, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> List[Any]:
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise CursorInvalido("Cursor de paginación inválido") from e
+    if not isinstance(clave, list) or len(clave) != 2:
+        raise CursorInvalido("Cursor de paginación inválido")
+    return clave
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Cursor opaco a partir de la clave de la última fila."""
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Clave ``(created_at, id)`` de un cursor, o CursorInvalido."""
+    created_at, row_id = _decode(cursor)
+    try:
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido("Cursor de paginación inválido") from e
+
+
+def encode_rank_cursor(rank: float, row_id: str) -> str:
+    """Cursor opaco para resultados ordenados por relevancia ``(rank, id)``."""
+    return _encode([rank, row_id])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, str]:
+    """Clave ``(rank, id)`` de un cursor de búsqueda, o CursorInvalido."""
+    rank, row_id = _decode(cursor)
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool):
+        raise CursorInvalido("Cursor de paginación inválido")
+    return float(rank), str(row_id)
+
+
+def page_size(limit: Optional[int], default: Optional[int] = None) -> int:
+    """Tamaño de página pedido, acotado a ``[1, MAX_PAGE_SIZE]``."""
+    return max(1, min(limit or default or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def keyset(query, modelo, cursor: Optional[str], limit: int):
+    """Aplicar orden, cursor y límite (+1 para saber si hay otra página) a ``query``."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(modelo.created_at, modelo.id) < tuple_(created_at, row_id))
+    return query.order_by(modelo.created_at.desc(), modelo.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Filas de la página y cursor de la siguiente (``None`` si es la última)."""
+    if len(rows) <= limit:
+        return list(rows), None
+    pagina = list(rows[:limit])
+    ultima = pagina[-1]
+    return pagina, encode_cursor(ultima.created_at, ultima.id)
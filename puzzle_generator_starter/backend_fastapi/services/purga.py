@@ -0,0 +1,187 @@
+# backend_fastapi/services/purga.py
+"""
+Purga de temas y libros eliminados (borrado lógico) tras un periodo de retención.
+
+Los endpoints solo marcan ``deleted_at``; esta purga borra de verdad las filas
+eliminadas hace más de ``SOPA_PURGE_RETENTION_DAYS`` días (30 por defecto) junto
+con sus dependientes, igual que las cascadas del ORM:
+
+- libro: sus items y sus páginas
+- tema: sus recursos y los items de libros que lo usan; las páginas y sopas que
+  lo referencian conservan la fila pero quedan sin tema
+
+Trabaja por lotes pequeños (``ix_*_papelera`` localiza las filas sin recorrer la
+tabla) con un commit por lote, así ninguna transacción retiene el bloqueo de
+escritura mucho tiempo. Opcionalmente archiva las filas en JSONL antes de
+borrarlas y elimina del almacén de binarios las imágenes que ya nadie usa.
+
+La aplicación la lanza cada ``SOPA_PURGE_INTERVAL_S`` segundos (3600 por
+defecto, 0 la desactiva). A mano:
+
+    python -m services.purga --dias 30 --archivo papelera.jsonl
+    python -m services.purga --dry-run
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, TextIO
+
+from sqlalchemy import LargeBinary, delete, func, select, update
+
+RETENCION_DIAS = int(os.getenv("SOPA_PURGE_RETENTION_DAYS", "30"))
+INTERVALO_S = float(os.getenv("SOPA_PURGE_INTERVAL_S", "3600"))
+BATCH_SIZE = int(os.getenv("SOPA_PURGE_BATCH_SIZE", "200"))
+
+
+def _archivar(db, archivo: Optional[TextIO], modelo, condicion) -> None:
+    """Escribir en ``archivo`` las filas de ``modelo`` que cumplen ``condicion`` (sin binarios)."""
+    if archivo is None:
+        return
+    columnas = [c for c in modelo.__table__.columns if not isinstance(c.type, LargeBinary)]
+    for fila in db.execute(select(*columnas).where(condicion)).mappings():
+        archivo.write(json.dumps({"tabla": modelo.__tablename__, "fila": dict(fila)}, default=str,
+                                 ensure_ascii=False) + "\n")
+
+
+def _hashes(db, columnas, condicion) -> set:
+    return {h for fila in db.execute(select(*columnas).where(condicion)) for h in fila if h}
+
+
+def _purgar_libros(db, ids: List[str], archivo) -> set:
+    from database import Libro, LibroItem, PaginaLibro  # pylint: disable=import-outside-toplevel
+
+    hashes = _hashes(db, [PaginaLibro.imagen_generada_hash], PaginaLibro.libro_id.in_(ids))
+    for modelo, condicion in (
+        (Libro, Libro.id.in_(ids)),
+        (LibroItem, LibroItem.libro_id.in_(ids)),
+        (PaginaLibro, PaginaLibro.libro_id.in_(ids)),
+    ):
+        _archivar(db, archivo, modelo, condicion)
+    db.execute(delete(LibroItem).where(LibroItem.libro_id.in_(ids)))
+    db.execute(delete(PaginaLibro).where(PaginaLibro.libro_id.in_(ids)))
+    db.execute(delete(Libro).where(Libro.id.in_(ids)))
+    return hashes
+
+
+def _purgar_temas(db, ids: List[str], archivo) -> set:
+    from database import (  # pylint: disable=import-outside-toplevel
+        LibroItem, PaginaLibro, RecursoTema, SopaGenerada, Tema,
+    )
+
+    hashes = _hashes(db, [Tema.imagen_principal_hash, Tema.icono_hash], Tema.id.in_(ids))
+    for modelo, condicion in (
+        (Tema, Tema.id.in_(ids)),
+        (RecursoTema, RecursoTema.tema_id.in_(ids)),
+        (LibroItem, LibroItem.tema_id.in_(ids)),
+    ):
+        _archivar(db, archivo, modelo, condicion)
+    db.execute(delete(RecursoTema).where(RecursoTema.tema_id.in_(ids)))
+    db.execute(delete(LibroItem).where(LibroItem.tema_id.in_(ids)))
+    db.execute(update(PaginaLibro).where(PaginaLibro.tema_id.in_(ids)).values(tema_id=None))
+    db.execute(update(SopaGenerada).where(SopaGenerada.tema_id.in_(ids)).values(tema_id=None))
+    db.execute(delete(Tema).where(Tema.id.in_(ids)))
+    return hashes
+
+
+def _borrar_blobs_huerfanos(db, store, hashes: set) -> int:
+    """Borrar del almacén los binarios que ninguna fila referencia ya."""
+    import database  # pylint: disable=import-outside-toplevel
+    from services.blob_store import COLUMNAS_BINARIAS  # pylint: disable=import-outside-toplevel
+
+    if not hashes or store is None:
+        return 0
+    en_uso = set()
+    for modelo_nombre, _columna, columna_hash in COLUMNAS_BINARIAS:
+        columna = getattr(getattr(database, modelo_nombre), columna_hash)
+        en_uso |= set(db.scalars(select(columna).where(columna.in_(hashes))))
+    return sum(store.delete(h) for h in hashes - en_uso)
+
+
+def purgar(db, retencion_dias: int = RETENCION_DIAS, batch_size: int = BATCH_SIZE,
+           archivo: Optional[TextIO] = None, store=None, pausa: float = 0.0,
+           dry_run: bool = False, ahora: Optional[datetime] = None) -> Dict[str, int]:
+    """Borrar definitivamente libros y temas eliminados hace más de ``retencion_dias``.
+
+    Se puede interrumpir y relanzar: cada lote se confirma por separado.
+    ``pausa`` (segundos) se espera entre lotes para ceder la base de datos.
+    """
+    from database import Libro, Tema  # pylint: disable=import-outside-toplevel
+
+    limite = (ahora or datetime.now(timezone.utc)) - timedelta(days=retencion_dias)
+    stats = {"libros": 0, "temas": 0, "blobs": 0}
+    # Libros primero: sus items dejan de referenciar temas que también se purgan
+    for clave, modelo, purgar_lote in (("libros", Libro, _purgar_libros), ("temas", Tema, _purgar_temas)):
+        vencidos = modelo.deleted_at.isnot(None) & (modelo.deleted_at < limite)
+        if dry_run:
+            stats[clave] = db.scalar(select(func.count()).select_from(modelo).where(vencidos))
+            continue
+        while True:
+            ids = list(db.scalars(
+                select(modelo.id).where(vencidos).order_by(modelo.deleted_at).limit(batch_size)
+            ))
+            if not ids:
+                break
+            hashes = purgar_lote(db, ids, archivo)
+            db.commit()
+            stats[clave] += len(ids)
+            stats["blobs"] += _borrar_blobs_huerfanos(db, store, hashes)
+            db.rollback()  # cerrar la transacción de lectura antes de la pausa
+            if pausa:
+                time.sleep(pausa)
+    return stats
+
+
+def purgar_con_sesion(**opciones) -> Dict[str, int]:
+    """Purga con una sesión propia (para hilos y la tarea periódica)."""
+    from database import SessionLocal  # pylint: disable=import-outside-toplevel
+    from services.blob_store import get_blob_store  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        opciones.setdefault("store", get_blob_store())
+        return purgar(db, **opciones)
+    finally:
+        db.close()
+
+
+async def purga_periodica(intervalo: float = INTERVALO_S) -> None:
+    """Tarea de fondo: purgar cada ``intervalo`` segundos en un hilo, sin bloquear el bucle."""
+    while True:
+        try:
+            stats = await asyncio.to_thread(purgar_con_sesion, pausa=0.05)
+            if stats["libros"] or stats["temas"]:
+                print(f"🗑️  Purga: {stats['libros']} libros, {stats['temas']} temas, {stats['blobs']} binarios")
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"⚠ Error en la purga periódica: {exc}")
+        await asyncio.sleep(intervalo)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI de purga."""
+    parser = argparse.ArgumentParser(description="Purgar temas y libros eliminados")
+    parser.add_argument("--dias", type=int, default=RETENCION_DIAS, help="Retención en días")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--archivo", help="Archivar las filas purgadas en este JSONL (se añade al final)")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos de espera entre lotes")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar lo que se purgaría")
+    args = parser.parse_args(argv)
+
+    archivo = open(args.archivo, "a", encoding="utf-8") if args.archivo else None
+    try:
+        stats = purgar_con_sesion(retencion_dias=args.dias, batch_size=args.batch_size, archivo=archivo,
+                                  pausa=args.pausa, dry_run=args.dry_run)
+    finally:
+        if archivo:
+            archivo.close()
+    verbo = "se purgarían" if args.dry_run else "purgados"
+    print(f"✅ {stats['libros']} libros y {stats['temas']} temas {verbo}, {stats['blobs']} binarios borrados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# backend_fastapi/services/replica.py
+"""
+Lecturas en una réplica con "lee lo que escribiste" (read-your-writes).
+
+Con ``DATABASE_READ_URL`` definida, los endpoints de solo lectura usan la
+réplica (``database.get_async_read_db``) y las escrituras el primario. Como la
+réplica puede ir unos instantes por detrás, tras una escritura correcta el
+cliente recibe una cookie y sus lecturas van al primario durante
+``SOPA_READ_STICKY_S`` segundos (5 por defecto). La cookie guarda el instante
+de caducidad, así que funciona igual con varias instancias de la aplicación.
+"""
+
+import math
+import os
+import time
+
+VENTANA_S = float(os.getenv("SOPA_READ_STICKY_S", "5"))
+COOKIE = "sopa_primario_hasta"
+METODOS_LECTURA = frozenset({"GET", "HEAD", "OPTIONS"})
+# Solo estas rutas escriben en la base; el resto (p. ej. generar sopas) no fija el primario
+PREFIJO_ESCRITURAS = "/api/db/"
+
+
+def leer_del_primario(cookies) -> bool:
+    """``True`` si el cliente escribió hace menos de la ventana (según su cookie)."""
+    valor = cookies.get(COOKIE)
+    if not valor:
+        return False
+    try:
+        return float(valor) > time.time()
+    except ValueError:
+        return False
+
+
+def cabecera_cookie(ventana_s: float = VENTANA_S) -> bytes:
+    """``Set-Cookie`` que manda las lecturas al primario durante ``ventana_s`` segundos."""
+    hasta = time.time() + ventana_s
+    return (f"{COOKIE}={hasta:.3f}; Max-Age={math.ceil(ventana_s)}; Path=/; HttpOnly; "
+            "SameSite=Lax").encode("latin-1")
+
+
+class LeerTusEscrituras:
+    """Middleware ASGI: marca con la cookie las respuestas correctas a escrituras en la base.
+
+    ASGI puro (no ``BaseHTTPMiddleware``) para no envolver cada petición en otra tarea.
+    """
+
+    def __init__(self, app, ventana_s: float = VENTANA_S):
+        self.app = app
+        self.ventana_s = ventana_s
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] in METODOS_LECTURA
+                or not scope["path"].startswith(PREFIJO_ESCRITURAS)):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                mensaje = dict(mensaje)
+                mensaje["headers"] = [*mensaje.get("headers", []), (b"set-cookie", cabecera_cookie(self.ventana_s))]
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,321 @@
+# backend_fastapi/services/result_cache.py
+"""
+Caché de resultados de generación de sopas de letras.
+
+Nivel en memoria LRU + TTL acotado por número de entradas y por bytes, con un
+nivel opcional en disco (SQLite) que sobrevive a reinicios del proceso. Las
+entradas se indexan por un hash canónico de la petición normalizada y pueden
+etiquetarse (p. ej. ``tema:<id>``) para invalidarlas en bloque.
+
+Desde código async se usan ``aget``/``aset``/``ainvalidate_tag``: la memoria se
+consulta en el propio bucle y el nivel en disco se atiende en un hilo, para no
+bloquear el bucle de eventos con SQLite.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Cada cuántas escrituras en disco se borran expiradas y se recuenta la tabla
+DISK_TRIM_EVERY = 256
+# Al pasar del límite se recorta hasta esta fracción, para no recortar en cada escritura
+DISK_TRIM_TO = 0.9
+
+
+def canonical_key(payload: Dict[str, Any]) -> str:
+    """Hash estable de una petición normalizada (independiente del orden de claves)."""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Caché LRU + TTL con límite de memoria y nivel opcional en disco."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        disk_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        # key -> (expires_at, tag, payload serializado)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # La conexión SQLite tiene su propio candado: un acierto en memoria no espera al disco
+        self._disk_lock = threading.Lock()
+        self._disk_count = 0  # aproximado: se corrige en cada recorte
+        self._disk_writes = 0
+        # Sube con cada invalidación: una lectura de disco anterior no repuebla la memoria
+        self._generation = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        """Construir la caché a partir de variables de entorno."""
+        return cls(
+            max_entries=int(os.getenv("SOPA_CACHE_MAX_ENTRIES", "512")),
+            max_bytes=int(os.getenv("SOPA_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("SOPA_CACHE_TTL", "3600")),
+            disk_path=os.getenv("SOPA_CACHE_DISK_PATH") or None,
+        )
+
+    # ---------- nivel en disco ----------
+
+    def _open_disk(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY, tag TEXT, expires_at REAL NOT NULL, payload BLOB NOT NULL)"
+        )
+        self._disk.execute("CREATE INDEX IF NOT EXISTS ix_cache_tag ON cache_entries (tag)")
+        self._disk.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires ON cache_entries (expires_at)")
+        self._disk_count = self._disk.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT expires_at, tag, payload FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] > now:
+                return row[0], row[1], bytes(row[2])
+            self._disk.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._disk_count -= 1
+        # Los contadores se comparten con el nivel en memoria: van con su lock, nunca anidado en el del disco
+        with self._lock:
+            self.expirations += 1
+        return None
+
+    def _disk_set(self, key: str, expires_at: float, tag: Optional[str], payload: bytes, now: float):
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, tag, expires_at, payload) VALUES (?, ?, ?, ?)",
+                (key, tag, expires_at, payload),
+            )
+            # Un reemplazo también cuenta: el recuento se corrige en el siguiente recorte
+            self._disk_count += 1
+            self._disk_writes += 1
+            if self._disk_count <= self.max_disk_entries and self._disk_writes % DISK_TRIM_EVERY:
+                return
+            expulsadas = self._disk_trim(now)
+        if expulsadas:
+            with self._lock:
+                self.evictions += expulsadas
+
+    def _disk_trim(self, now: float) -> int:
+        """Borrar expiradas, recontar y, si pasa del límite, expulsar las que antes caducan.
+
+        Devuelve cuántas entradas vigentes se expulsaron.
+        """
+        self._disk.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        total = self._disk.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        sobrantes = 0
+        if total > self.max_disk_entries:
+            objetivo = int(self.max_disk_entries * DISK_TRIM_TO)
+            sobrantes = total - objetivo
+            self._disk.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                " SELECT key FROM cache_entries ORDER BY expires_at LIMIT ?)",
+                (sobrantes,),
+            )
+            total = objetivo
+        self._disk_count = total
+        return sobrantes
+
+    # ---------- nivel en memoria ----------
+
+    def _remove(self, key: str) -> None:
+        _, tag, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _store(self, key: str, expires_at: float, tag: Optional[str], payload: bytes) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, tag, payload)
+        self._bytes += len(payload)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    # ---------- API pública ----------
+
+    def _memory_get(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._remove(key)
+            self.expirations += 1
+            return None
+
+    def _from_disk(self, key: str, now: float) -> Optional[bytes]:
+        generation = self._generation
+        disk_entry = self._disk_get(key, now) if self._disk is not None else None
+        with self._lock:
+            if disk_entry is None:
+                self.misses += 1
+                return None
+            if generation == self._generation:
+                self._store(key, *disk_entry)
+            self.hits += 1
+            self.disk_hits += 1
+            return disk_entry[2]
+
+    def _prepare(self, key: str, value: Dict[str, Any], tag: Optional[str]) -> tuple:
+        """Guardar en memoria y devolver los argumentos de la escritura en disco."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._store(key, expires_at, tag, payload)
+        return key, expires_at, tag, payload, now
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Obtener una copia del resultado cacheado, o ``None`` si no existe o expiró."""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            payload = self._from_disk(key, now)
+        return json.loads(payload) if payload is not None else None
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """``get`` para código async: solo un fallo en memoria va al disco, en un hilo."""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            if self._disk is not None:
+                payload = await asyncio.to_thread(self._from_disk, key, now)
+            else:
+                payload = self._from_disk(key, now)
+        return json.loads(payload) if payload is not None else None
+
+    def set(self, key: str, value: Dict[str, Any], tag: Optional[str] = None) -> None:
+        """Guardar un resultado serializable a JSON."""
+        escritura = self._prepare(key, value, tag)
+        if self._disk is not None:
+            self._disk_set(*escritura)
+
+    async def aset(self, key: str, value: Dict[str, Any], tag: Optional[str] = None) -> None:
+        """``set`` para código async: la escritura en disco se hace en un hilo."""
+        escritura = self._prepare(key, value, tag)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_set, *escritura)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Eliminar todas las entradas asociadas a una etiqueta."""
+        with self._lock:
+            self._generation += 1
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+        removed = len(keys)
+        if self._disk is not None:
+            with self._disk_lock:
+                cursor = self._disk.execute("DELETE FROM cache_entries WHERE tag = ?", (tag,))
+                self._disk_count -= cursor.rowcount
+                removed = max(removed, cursor.rowcount)
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    async def ainvalidate_tag(self, tag: str) -> int:
+        """``invalidate_tag`` para código async (el borrado en disco va en un hilo)."""
+        if self._disk is None:
+            return self.invalidate_tag(tag)
+        return await asyncio.to_thread(self.invalidate_tag, tag)
+
+    def clear(self) -> None:
+        """Vaciar ambos niveles de la caché."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM cache_entries")
+                self._disk_count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso de la caché."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "disk_enabled": self._disk is not None,
+            }
+            if self._disk is not None:
+                stats["disk_entries"] = self._disk_count  # aproximado entre recortes
+            return stats
+
+
+def tema_tag(tema_id: str) -> str:
+    """Etiqueta de caché para resultados generados a partir de un tema."""
+    return f"tema:{tema_id}"
+
+
+# Instancia compartida por el router de diagramación y los endpoints de temas
+result_cache = ResultCache.from_env()
+
+
+def invalidate_tema(tema_id: str) -> int:
+    """Invalidar los resultados cacheados que dependen de un tema."""
+    return result_cache.invalidate_tag(tema_tag(tema_id))
+
+
+async def ainvalidate_tema(tema_id: str) -> int:
+    """``invalidate_tema`` para endpoints async."""
+    return await result_cache.ainvalidate_tag(tema_tag(tema_id))
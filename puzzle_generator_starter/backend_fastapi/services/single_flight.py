@@ -0,0 +1,52 @@
+# backend_fastapi/services/single_flight.py
+"""
+Coalescencia "single-flight" de trabajos asíncronos idénticos.
+
+Las peticiones concurrentes con la misma clave esperan una única ejecución en
+curso y comparten su resultado. La ejecución corre en su propia tarea y cada
+espera está protegida con ``asyncio.shield``: cancelar a un solicitante (p. ej.
+porque el cliente cerró la conexión) no cancela el trabajo de los demás.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Agrupa ejecuciones concurrentes por clave."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecutar ``fn`` una sola vez por clave entre todos los solicitantes concurrentes."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: str) -> bool:
+        """Indica si ya hay una ejecución en curso para la clave."""
+        return key in self._inflight
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evitar "Task exception was never retrieved" si todos los solicitantes se cancelaron
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Métricas de coalescencia."""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,260 @@
+# backend_fastapi/services/sopa_dedup.py
+"""
+Deduplicación por contenido de ``sopas_generadas``.
+
+Cada sopa guardada lleva ``content_hash``: un SHA-256 canónico del tema, las
+palabras, la grilla, las colocaciones y el tamaño. Un índice único sobre esa
+columna convierte los guardados en "upserts": volver a guardar una sopa idéntica
+devuelve la fila existente en lugar de duplicar la grilla completa.
+
+Para colapsar los duplicados que ya existen (trabajo de una sola vez):
+
+    python -m services.sopa_dedup --batch-size 2000
+    python -m services.sopa_dedup --dry-run
+"""
+
+import argparse
+import secrets
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.exc import IntegrityError
+
+from services.result_cache import canonical_key
+
+
+def hash_sopa(
+    tema_id: Optional[str],
+    palabras: Sequence[Any],
+    grid: Sequence[Sequence[str]],
+    word_positions: Iterable[Dict[str, Any]],
+    grid_size: Optional[int],
+) -> str:
+    """Hash estable del contenido de una sopa (independiente del orden de las colocaciones)."""
+    colocaciones = sorted(
+        (
+            str(p.get("palabra", "")),
+            list(p.get("inicio") or []),
+            list(p.get("fin") or []),
+            str(p.get("direccion", "")),
+        )
+        for p in word_positions or []
+    )
+    return canonical_key({
+        "tema_id": tema_id,
+        "palabras": list(palabras or []),
+        "grid": [list(fila) for fila in grid or []],
+        "colocaciones": colocaciones,
+        "grid_size": grid_size,
+    })
+
+
+def hash_de_valores(valores: Dict[str, Any]) -> str:
+    """``hash_sopa`` a partir de un diccionario de columnas de ``SopaGenerada``."""
+    return hash_sopa(
+        valores.get("tema_id"),
+        valores.get("palabras"),
+        valores.get("grid"),
+        valores.get("word_positions"),
+        valores.get("grid_size"),
+    )
+
+
+def guardar_sopa(
+    db, valores: Dict[str, Any], completar: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Tuple[Any, bool]:
+    """Insertar una sopa o devolver la idéntica ya guardada.
+
+    Devuelve ``(sopa, creada)``. ``completar`` se llama solo si hay que insertar,
+    para no repetir cálculos caros (p. ej. la dificultad) en los reintentos. Si la
+    sopa existente no era compartible y la nueva sí, se le asigna un enlace
+    público en lugar de crear otra fila.
+    """
+    from database import SopaGenerada  # pylint: disable=import-outside-toplevel
+
+    valores = dict(valores)
+    valores["content_hash"] = hash_de_valores(valores)
+
+    existente = db.query(SopaGenerada).filter(SopaGenerada.content_hash == valores["content_hash"]).first()
+    if existente is None:
+        if completar is not None:
+            completar(valores)
+        sopa = SopaGenerada(**valores)
+        db.add(sopa)
+        try:
+            db.commit()
+            db.refresh(sopa)
+            return sopa, True
+        except IntegrityError:
+            # Otra petición guardó la misma sopa entre la consulta y la inserción
+            db.rollback()
+            existente = db.query(SopaGenerada).filter(
+                SopaGenerada.content_hash == valores["content_hash"]
+            ).first()
+            if existente is None:
+                raise
+
+    if valores.get("compartible") and not existente.compartible:
+        existente.compartible = True
+        existente.enlace_publico = (
+            existente.enlace_publico or valores.get("enlace_publico") or secrets.token_urlsafe(16)
+        )
+        db.commit()
+        db.refresh(existente)
+    return existente, False
+
+
+def insertar_sin_duplicados(db, filas: List[Dict[str, Any]]) -> int:
+    """Inserción masiva que ignora las sopas ya guardadas; devuelve las filas nuevas."""
+    from database import SopaGenerada  # pylint: disable=import-outside-toplevel
+
+    if not filas:
+        return 0
+    for fila in filas:
+        fila.setdefault("content_hash", hash_de_valores(fila))
+
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto  # pylint: disable=import-outside-toplevel
+    elif dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto  # pylint: disable=import-outside-toplevel
+    else:
+        insert_dialecto = None
+
+    if insert_dialecto is not None:
+        sentencia = insert_dialecto(SopaGenerada).on_conflict_do_nothing(index_elements=["content_hash"])
+        # Core (no ORM) para obtener el número real de filas insertadas
+        resultado = db.connection().execute(sentencia, filas)
+        return resultado.rowcount if resultado.rowcount is not None and resultado.rowcount >= 0 else len(filas)
+
+    # Otros motores: filtrar primero los hashes ya presentes
+    hashes = {f["content_hash"] for f in filas}
+    presentes = {h for (h,) in db.query(SopaGenerada.content_hash).filter(SopaGenerada.content_hash.in_(hashes))}
+    nuevas = {}
+    for fila in filas:
+        if fila["content_hash"] not in presentes:
+            nuevas.setdefault(fila["content_hash"], fila)
+    if nuevas:
+        db.connection().execute(insert(SopaGenerada), list(nuevas.values()))
+    return len(nuevas)
+
+
+def asegurar_indice_unico(db) -> bool:
+    """Crear el índice único sobre ``content_hash`` si aún no existe."""
+    try:
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_sopa_content_hash ON sopas_generadas (content_hash)"
+        ))
+        db.commit()
+        return True
+    except Exception as e:  # pylint: disable=broad-except
+        db.rollback()
+        print(f"⚠️  No se pudo crear el índice único de content_hash: {e}", file=sys.stderr)
+        return False
+
+
+def colapsar_duplicados(db, batch_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    """Calcular ``content_hash`` de las sopas antiguas y eliminar las repetidas.
+
+    Se recorren por lotes (paginación por id) las filas sin hash. La primera con
+    un contenido dado se conserva; las repetidas se borran. Si una repetida tiene
+    enlace público y la conservada no, el enlace pasa a la conservada; si ambas
+    tienen enlace propio, la repetida se conserva (con un hash marcado con su id)
+    para no romper enlaces ya compartidos.
+    """
+    from database import SopaGenerada  # pylint: disable=import-outside-toplevel
+
+    if not dry_run:
+        asegurar_indice_unico(db)
+
+    stats = {"procesadas": 0, "eliminadas": 0, "enlaces_movidos": 0, "conservadas_por_enlace": 0}
+    # En simulación los hashes no se escriben: recordar los vistos en lotes anteriores
+    vistos: Dict[str, Tuple[str, Optional[str]]] = {}
+    ultimo_id = ""
+    while True:
+        lote = (db.query(
+            SopaGenerada.id, SopaGenerada.tema_id, SopaGenerada.palabras, SopaGenerada.grid,
+            SopaGenerada.word_positions, SopaGenerada.grid_size, SopaGenerada.enlace_publico,
+        ).filter(SopaGenerada.id > ultimo_id, SopaGenerada.content_hash.is_(None))
+            .order_by(SopaGenerada.id)
+            .limit(batch_size)
+            .all())
+        if not lote:
+            break
+
+        hashes = {
+            fila.id: hash_sopa(fila.tema_id, fila.palabras, fila.grid, fila.word_positions, fila.grid_size)
+            for fila in lote
+        }
+        # Sopa conservada por hash: (id, enlace_publico), ya sea de la BD o de este lote
+        conservadas = {
+            h: (sopa_id, enlace)
+            for h, sopa_id, enlace in db.query(
+                SopaGenerada.content_hash, SopaGenerada.id, SopaGenerada.enlace_publico
+            ).filter(SopaGenerada.content_hash.in_(set(hashes.values())))
+        }
+        if dry_run:
+            conservadas.update({h: vistos[h] for h in hashes.values() if h in vistos})
+
+        for fila in lote:
+            h = hashes[fila.id]
+            previa = conservadas.get(h)
+            if previa is None:
+                conservadas[h] = (fila.id, fila.enlace_publico)
+                if not dry_run:
+                    db.execute(update(SopaGenerada).where(SopaGenerada.id == fila.id).values(content_hash=h))
+                continue
+
+            id_conservada, enlace_conservada = previa
+            if fila.enlace_publico and enlace_conservada:
+                stats["conservadas_por_enlace"] += 1
+                if not dry_run:
+                    marcado = canonical_key({"content_hash": h, "id": fila.id})
+                    db.execute(update(SopaGenerada).where(SopaGenerada.id == fila.id).values(content_hash=marcado))
+                continue
+
+            stats["eliminadas"] += 1
+            if not dry_run:
+                db.execute(delete(SopaGenerada).where(SopaGenerada.id == fila.id))
+            if fila.enlace_publico:
+                stats["enlaces_movidos"] += 1
+                conservadas[h] = (id_conservada, fila.enlace_publico)
+                if not dry_run:
+                    db.execute(update(SopaGenerada).where(SopaGenerada.id == id_conservada).values(
+                        compartible=True, enlace_publico=fila.enlace_publico
+                    ))
+        if dry_run:
+            vistos.update(conservadas)
+        else:
+            db.commit()
+
+        stats["procesadas"] += len(lote)
+        ultimo_id = lote[-1].id
+        print(f"   ... {stats['procesadas']} sopas procesadas, {stats['eliminadas']} duplicadas", file=sys.stderr)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI para colapsar las sopas duplicadas del histórico."""
+    parser = argparse.ArgumentParser(description="Eliminar sopas duplicadas por contenido")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin modificar la base de datos")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        stats = colapsar_duplicados(db, args.batch_size, args.dry_run)
+    finally:
+        db.close()
+    prefijo = "🔎 (simulación) " if args.dry_run else "✅ "
+    print(f"{prefijo}{stats['procesadas']} sopas revisadas: {stats['eliminadas']} duplicadas eliminadas, "
+          f"{stats['enlaces_movidos']} enlaces públicos movidos, "
+          f"{stats['conservadas_por_enlace']} conservadas por tener enlace propio")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,21 @@
 # backend_fastapi/services/sopa_generator.py
+import argparse
+import csv
+import hashlib
+import json
+import os
 import random
-from typing import List, Dict, Optional
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from functools import lru_cache
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple, Union
 from enum import Enum
 
+from services.containment import Contencion, analizar_contencion
+from services.grid_predictor import tamano_inicial
+
 class Direction(Enum):
     HORIZONTAL = (0, 1)
     HORIZONTAL_INV = (0, -1)
@@ -15,32 +28,116 @@ class Direction(Enum):
 
 ALL_DIRECTIONS = list(Direction)
 
+# Qué hacer con palabras contenidas en otras ("SOL" en "GIRASOL"):
+#   warn    colocarlas por separado e informarlas en "contenidas"
+#   drop    no colocarlas (se informan en "descartadas")
+#   overlap colocarlas dentro de su contenedora, compartiendo las letras
+CONTAINED_MODES = ("warn", "drop", "overlap")
+
+MAX_ATTEMPTS_PER_SIZE = 200
+
+class GenerationCancelled(Exception):
+    """El observador de progreso pidió detener la generación."""
+
+
 def normalize_text(text: str) -> str:
     replacements = str.maketrans("ÁÉÍÓÚÑ", "AEIOUN")
     return text.upper().translate(replacements)
 
+class PalabrasPreparadas:
+    """Lista normalizada y sin duplicados, reutilizable entre varias generaciones.
+
+    Las variantes de una misma lista comparten este objeto: la normalización,
+    el orden por longitud y el análisis de contención se calculan una sola vez
+    (este último, una por valor de ``allow_reverse``).
+    """
+
+    def __init__(self, words: List[str]):
+        self.original_words = [w.strip() for w in words if w.strip()]
+        self.words = [normalize_text(w) for w in self.original_words]
+        self.words = list(dict.fromkeys(self.words))  # eliminar duplicados
+
+        if not self.words:
+            raise ValueError("No hay palabras válidas")
+
+        self.originales: Dict[str, str] = {}
+        for original in self.original_words:
+            self.originales.setdefault(normalize_text(original), original)
+
+        self.longitudes = [len(w) for w in self.words]
+        self.por_largo = sorted(self.words, key=len, reverse=True)
+        self._contenidas: Dict[bool, Dict[str, Contencion]] = {}
+
+    def contenidas(self, allow_reverse: bool = True) -> Dict[str, Contencion]:
+        """Palabras contenidas en otras, leyendo al revés solo si ``allow_reverse``."""
+        if allow_reverse not in self._contenidas:
+            self._contenidas[allow_reverse] = analizar_contencion(self.words, allow_reverse)
+        return self._contenidas[allow_reverse]
+
+
+@lru_cache(maxsize=512)
+def _tabla_slots(
+    grid_size: int, largo: int, direcciones: Tuple[Direction, ...]
+) -> Tuple[Tuple[int, int, Direction], ...]:
+    """Todas las posiciones (fila, columna, dirección) donde cabe una palabra de ``largo`` letras.
+
+    Cacheada por proceso: todas las sopas (y variantes) del mismo tamaño la comparten.
+    """
+    slots = []
+    extension = largo - 1
+    for direction in direcciones:
+        dr, dc = direction.value
+        filas = range(max(0, -dr * extension), grid_size - max(0, dr * extension))
+        columnas = range(max(0, -dc * extension), grid_size - max(0, dc * extension))
+        slots.extend((r, c, direction) for r in filas for c in columnas)
+    return tuple(slots)
+
+
 class WordSearchGenerator:
     def __init__(
         self,
-        words: List[str],
+        words: Union[List[str], PalabrasPreparadas],
         grid_size: Optional[int] = None,
         allow_diagonal: bool = True,
         allow_reverse: bool = True,
+        seed: Optional[int] = None,
+        progress: Optional[Callable[[Dict], bool]] = None,
+        contained_words: str = "warn",
     ):
-        self.original_words = [w.strip() for w in words if w.strip()]
-        self.words = [normalize_text(w) for w in self.original_words]
-        self.words = list(dict.fromkeys(self.words))  # eliminar duplicados
+        if contained_words not in CONTAINED_MODES:
+            raise ValueError(f"contained_words debe ser uno de {', '.join(CONTAINED_MODES)}")
+        preparadas = words if isinstance(words, PalabrasPreparadas) else PalabrasPreparadas(words)
+        self.original_words = preparadas.original_words
+        self.originales = preparadas.originales
+        self.words = preparadas.words
 
-        if not self.words:
-            raise ValueError("No hay palabras válidas")
-
-        min_size = max(len(w) for w in self.words)
-        self.grid_size = grid_size or max(16, min_size + 6)
         self.allow_diagonal = allow_diagonal
         self.allow_reverse = allow_reverse
         self.directions = self._build_directions()
+        # Sin tamaño explícito: predicción aprendida del histórico o la regla fija
+        self.grid_size = grid_size or tamano_inicial(preparadas.longitudes, len(self.directions))
+        self._slot_key = tuple(self.directions)
+
+        # Una contención invertida solo es legible en la sopa si se admiten palabras al revés
+        self.contained = preparadas.contenidas(allow_reverse)
+        self.contained_words = contained_words
+        self._overlapping: Dict[str, List[Tuple[str, Contencion]]] = {}
+        if contained_words == "warn":
+            self.words_by_length = preparadas.por_largo
+        else:
+            self.words_by_length = [w for w in preparadas.por_largo if w not in self.contained]
+            if contained_words == "overlap":
+                for palabra, relacion in self.contained.items():
+                    self._overlapping.setdefault(relacion.contenedora, []).append((palabra, relacion))
+        self.total_words = len(self.words) - (len(self.contained) if contained_words == "drop" else 0)
+
         self.grid = None
         self.placed_words = []
+        # Semilla explícita => resultado reproducible (y cacheable)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        # Observador opcional: recibe un evento por intento; si devuelve True se cancela
+        self.progress = progress
 
     def _build_directions(self) -> List[Direction]:
         """Construir la lista de direcciones permitidas según la configuración."""
@@ -84,30 +181,12 @@ class WordSearchGenerator:
         })
 
     def generate(self) -> Dict:
-        original_grid_size = self.grid_size
-        max_attempts_per_size = 200
         max_grid_size = 100  # Sin límite práctico, máximo 100x100
 
         while self.grid_size <= max_grid_size:
-            attempts = 0
-            while attempts < max_attempts_per_size:
-                self.grid = [["" for _ in range(self.grid_size)] for _ in range(self.grid_size)]
-                self.placed_words = []  # Reset placed words for each attempt
-
-                words_to_place = sorted(self.words, key=len, reverse=True)
-                random.shuffle(words_to_place)
-
-                if self._place_all_words(words_to_place):
-                    self._fill_empty()
-                    return {
-                        "success": True,
-                        "grid": self.grid,
-                        "soluciones": self.placed_words,
-                        "tamaño": self.grid_size,
-                        "grid_size": self.grid_size,
-                        "todas_colocadas": True
-                    }
-                attempts += 1
+            resultado = self.try_current_size()
+            if resultado is not None:
+                return resultado
 
             # Si no se pudo con este tamaño, aumentar y continuar
             self.grid_size += 2
@@ -120,22 +199,62 @@ class WordSearchGenerator:
             "grid_size": self.grid_size
         }
 
+    def try_current_size(self, max_attempts: int = MAX_ATTEMPTS_PER_SIZE) -> Optional[Dict]:
+        """Intentar colocar todas las palabras con el tamaño actual; ``None`` si no se logra."""
+        attempts = 0
+        mejor = 0
+        while attempts < max_attempts:
+            self.grid = [["" for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+            self.placed_words = []  # Reset placed words for each attempt
+
+            words_to_place = list(self.words_by_length)
+            self.rng.shuffle(words_to_place)
+
+            if self._place_all_words(words_to_place):
+                self._fill_empty()
+                resultado = {
+                    "success": True,
+                    "grid": self.grid,
+                    "soluciones": self.placed_words,
+                    "tamaño": self.grid_size,
+                    "grid_size": self.grid_size,
+                    "todas_colocadas": True,
+                    "seed": self.seed
+                }
+                self._report_contained(resultado)
+                return resultado
+            attempts += 1
+            mejor = max(mejor, len(self.placed_words))
+            if self.progress is not None and self.progress({
+                "grid_size": self.grid_size,
+                "intento": attempts,
+                "max_intentos": max_attempts,
+                "palabras_colocadas": len(self.placed_words),
+                "mejor_colocadas": mejor,
+                "total_palabras": self.total_words,
+            }):
+                raise GenerationCancelled("Generación cancelada")
+        return None
+
     def _place_all_words(self, words: List[str]) -> bool:
         if not self.directions:
             return False
 
         for idx, word_norm in enumerate(words):
-            original = self.original_words[self.words.index(word_norm)]
+            original = self.originales[word_norm]
             placed = False
             local_attempts = 0
+            # Solo se sortean posiciones donde la palabra cabe dentro de la grilla
+            slots = _tabla_slots(self.grid_size, len(word_norm), self._slot_key)
+            if not slots:
+                return False
 
             while local_attempts < 400 and not placed:
-                direction = random.choice(self.directions)
-                row = random.randint(0, self.grid_size - 1)
-                col = random.randint(0, self.grid_size - 1)
+                row, col, direction = self.rng.choice(slots)
 
                 if self.can_place(word_norm, row, col, direction):
                     self.place_word(word_norm, original, row, col, direction)
+                    self._place_overlapping(word_norm, row, col, direction)
                     placed = True
                 local_attempts += 1
 
@@ -143,9 +262,424 @@ class WordSearchGenerator:
                 return False
         return True
 
+    def _place_overlapping(self, container: str, row: int, col: int, direction: Direction):
+        """Registrar las palabras contenidas en ``container`` dentro de su propia colocación."""
+        dr, dc = direction.value
+        for palabra, relacion in self._overlapping.get(container, ()):
+            inicio_r = row + relacion.offset * dr
+            inicio_c = col + relacion.offset * dc
+            sentido = Direction((-dr, -dc)) if relacion.invertida else direction
+            self.place_word(palabra, self.originales[palabra], inicio_r, inicio_c, sentido)
+
+    def _report_contained(self, resultado: Dict):
+        if not self.contained:
+            return
+        resultado["contenidas"] = [
+            {
+                "palabra": self.originales[palabra],
+                "en": self.originales[relacion.contenedora],
+                "invertida": relacion.invertida,
+            }
+            for palabra, relacion in self.contained.items()
+        ]
+        if self.contained_words == "drop":
+            resultado["descartadas"] = [self.originales[palabra] for palabra in self.contained]
+
     def _fill_empty(self):
         letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
         for i in range(self.grid_size):
             for j in range(self.grid_size):
                 if not self.grid[i][j]:
-                    self.grid[i][j] = random.choice(letters)
+                    self.grid[i][j] = self.rng.choice(letters)
+
+
+def generar_sopa(
+    palabras: Union[List[str], PalabrasPreparadas],
+    grid_size: Optional[int] = None,
+    allow_diagonal: bool = True,
+    allow_reverse: bool = True,
+    seed: Optional[int] = None,
+    contained_words: str = "warn",
+    progress: Optional[Callable[[Dict], bool]] = None,
+) -> Dict:
+    """Generar una sopa completa; función de nivel de módulo apta para pools de procesos."""
+    generator = WordSearchGenerator(
+        palabras,
+        grid_size=grid_size,
+        allow_diagonal=allow_diagonal,
+        allow_reverse=allow_reverse,
+        seed=seed,
+        progress=progress,
+        contained_words=contained_words,
+    )
+    resultado = generator.generate()
+    resultado["grid_size"] = resultado.get("tamaño", generator.grid_size)
+    resultado["tamaño"] = resultado.get("tamaño", generator.grid_size)
+    return resultado
+
+
+def generar_variantes(
+    palabras: Union[List[str], PalabrasPreparadas],
+    seeds: List[int],
+    grid_size: Optional[int] = None,
+    allow_diagonal: bool = True,
+    allow_reverse: bool = True,
+    contained_words: str = "warn",
+) -> List[Dict]:
+    """Generar una sopa por semilla a partir de la misma lista preparada."""
+    preparadas = palabras if isinstance(palabras, PalabrasPreparadas) else PalabrasPreparadas(palabras)
+    return [
+        generar_sopa(preparadas, grid_size, allow_diagonal, allow_reverse, seed, contained_words)
+        for seed in seeds
+    ]
+
+
+def semillas_de_variantes(base_seed: int, inicio: int, cantidad: int) -> List[int]:
+    """Semillas deterministas de las variantes ``inicio`` .. ``inicio + cantidad - 1``."""
+    return [derive_seed(base_seed, f"variante-{i}") for i in range(inicio, inicio + cantidad)]
+
+
+def firma_disposicion(resultado: Dict) -> Tuple:
+    """Identifica la colocación de las palabras; dos variantes con la misma firma son copiables."""
+    return tuple(sorted(
+        (s["palabra"], tuple(s["inicio"]), tuple(s["fin"])) for s in resultado.get("soluciones", [])
+    ))
+
+
+# ========== GENERACIÓN MASIVA (CLI) ==========
+#
+#   python -m services.sopa_generator --input listas.jsonl --output sopas.jsonl
+#   python -m services.sopa_generator --from-db --db --seed 2024
+#
+# Cada trabajo tiene un id estable; la semilla se deriva de (semilla base, id),
+# de modo que una misma ejecución produce siempre las mismas sopas sin importar
+# el orden en que los procesos terminen.
+
+def derive_seed(base_seed: int, job_id: str) -> int:
+    """Semilla determinista de 32 bits para un trabajo."""
+    digest = hashlib.sha256(f"{base_seed}:{job_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big")
+
+
+def _leer_trabajos_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            registro = json.loads(linea)
+            registro.setdefault("id", f"linea-{numero}")
+            if "palabras" not in registro and "words" in registro:
+                registro["palabras"] = registro.pop("words")
+            yield registro
+
+
+def _leer_trabajos_csv(path: str) -> Iterator[Dict]:
+    """CSV con columnas ``id`` y ``palabras`` (separadas por ';'), más opciones opcionales."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for numero, fila in enumerate(csv.DictReader(f), start=1):
+            registro: Dict = {"id": fila.get("id") or f"fila-{numero}"}
+            registro["palabras"] = [p.strip() for p in (fila.get("palabras") or "").split(";") if p.strip()]
+            if fila.get("tema_id"):
+                registro["tema_id"] = fila["tema_id"]
+            if fila.get("grid_size"):
+                registro["grid_size"] = int(fila["grid_size"])
+            if fila.get("seed"):
+                registro["seed"] = int(fila["seed"])
+            for opcion in ("allow_diagonal", "allow_reverse"):
+                if fila.get(opcion):
+                    registro[opcion] = fila[opcion].strip().lower() in ("1", "true", "si", "sí", "yes")
+            yield registro
+
+
+def _leer_trabajos_db() -> Iterator[Dict]:
+    """Temas activos con palabras, leídos directamente de la base de datos."""
+    from database import SessionLocal, Tema  # pylint: disable=import-outside-toplevel
+
+    db = SessionLocal()
+    try:
+        query = (db.query(Tema.id, Tema.palabras)
+                 .filter(Tema.deleted_at.is_(None))
+                 .order_by(Tema.id)
+                 .yield_per(500))
+        for tema_id, palabras in query:
+            textos = [
+                p.get("texto", "").strip() if isinstance(p, dict) else str(p).strip()
+                for p in (palabras or [])
+            ]
+            textos = [t for t in textos if t]
+            if textos:
+                yield {"id": tema_id, "tema_id": tema_id, "palabras": textos}
+    finally:
+        db.close()
+
+
+def _expandir_trabajos(registros: Iterable[Dict], copias: int, base_seed: int) -> Iterator[Dict]:
+    for registro in registros:
+        for copia in range(copias):
+            trabajo = dict(registro)
+            if copias > 1:
+                trabajo["id"] = f"{registro['id']}#{copia}"
+            if trabajo.get("seed") is None or copias > 1:
+                trabajo["seed"] = derive_seed(base_seed, str(trabajo["id"]))
+            yield trabajo
+
+
+def generar_trabajo(trabajo: Dict) -> Dict:
+    """Generar una sopa para un trabajo (ejecutado en un proceso del pool)."""
+    from services.difficulty import analizar_dificultad  # pylint: disable=import-outside-toplevel
+
+    inicio = time.perf_counter()
+    try:
+        generator = WordSearchGenerator(
+            trabajo["palabras"],
+            grid_size=trabajo.get("grid_size"),
+            allow_diagonal=trabajo.get("allow_diagonal", True),
+            allow_reverse=trabajo.get("allow_reverse", True),
+            seed=trabajo["seed"],
+            contained_words=trabajo.get("contained_words", "warn"),
+        )
+        resultado = generator.generate()
+    except ValueError as e:
+        resultado = {"success": False, "error": str(e)}
+    salida = {
+        "id": trabajo["id"],
+        "tema_id": trabajo.get("tema_id"),
+        "seed": trabajo["seed"],
+        "palabras": trabajo["palabras"],
+        "tiempo_generacion": round(time.perf_counter() - inicio, 6),
+        **resultado,
+    }
+    if resultado.get("success"):
+        analisis = analizar_dificultad(resultado["grid"], resultado["soluciones"], trabajo["palabras"])
+        salida["dificultad"] = analisis["dificultad"]
+        salida["dificultad_score"] = analisis["puntuacion"]
+        salida["metricas"] = analisis["metricas"]
+    return salida
+
+
+class _SalidaJsonl:
+    """Escritura incremental en JSONL; el propio archivo sirve de punto de control."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completados = set()
+        if os.path.exists(path):
+            self._recuperar()
+        self._f = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def _recuperar(self):
+        with open(self.path, "rb+") as f:
+            datos = f.read()
+            # Descartar una última línea incompleta tras una caída
+            fin_valido = datos.rfind(b"\n") + 1
+            if fin_valido < len(datos):
+                f.truncate(fin_valido)
+            for linea in datos[:fin_valido].splitlines():
+                if linea.strip():
+                    self.completados.add(json.loads(linea)["id"])
+
+    def escribir(self, resultado: Dict):
+        self._f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+    def confirmar(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def cerrar(self):
+        self.confirmar()
+        self._f.close()
+
+
+class _SalidaDb:
+    """Inserción por lotes en ``sopas_generadas`` con archivo de punto de control.
+
+    Las sopas idénticas a otras ya guardadas se omiten (``content_hash`` único).
+    """
+
+    def __init__(self, checkpoint_path: str, batch_size: int):
+        from database import SessionLocal  # pylint: disable=import-outside-toplevel
+
+        self.db = SessionLocal()
+        self.batch_size = batch_size
+        self.pendientes: List[Dict] = []
+        self.ids_pendientes: List[str] = []
+        self.checkpoint_path = checkpoint_path
+        self.completados = set()
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                self.completados = {linea.strip() for linea in f if linea.strip()}
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def escribir(self, resultado: Dict):
+        self.ids_pendientes.append(resultado["id"])
+        if resultado.get("success"):
+            self.pendientes.append({
+                "id": str(uuid.uuid4()),
+                "tema_id": resultado.get("tema_id"),
+                "palabras": resultado["palabras"],
+                "grid": resultado["grid"],
+                "word_positions": resultado["soluciones"],
+                "grid_size": resultado["grid_size"],
+                "dificultad": resultado.get("dificultad", "medio"),
+                "dificultad_score": resultado.get("dificultad_score"),
+                "metricas": resultado.get("metricas"),
+                "tiempo_generacion": resultado["tiempo_generacion"],
+            })
+        if len(self.ids_pendientes) >= self.batch_size:
+            self.confirmar()
+
+    def confirmar(self):
+        from services.sopa_dedup import insertar_sin_duplicados  # pylint: disable=import-outside-toplevel
+
+        if self.pendientes:
+            insertar_sin_duplicados(self.db, self.pendientes)
+            self.db.commit()
+        # Solo se marcan como hechos tras confirmar la transacción
+        self._checkpoint.write("".join(f"{i}\n" for i in self.ids_pendientes))
+        self._checkpoint.flush()
+        os.fsync(self._checkpoint.fileno())
+        self.pendientes = []
+        self.ids_pendientes = []
+
+    def cerrar(self):
+        self.confirmar()
+        self._checkpoint.close()
+        self.db.close()
+
+
+class _SalidaCorpus:
+    """Escritura directa en un corpus binario (services.corpus).
+
+    No admite reanudación: para trabajos largos es preferible generar JSONL y
+    empaquetarlo después con ``python -m services.corpus build``.
+    """
+
+    def __init__(self, path: str):
+        from services.corpus import CorpusWriter  # pylint: disable=import-outside-toplevel
+
+        self.writer = CorpusWriter(path)
+        self.completados = set()
+
+    def escribir(self, resultado: Dict):
+        if resultado.get("success"):
+            self.writer.add(resultado)
+
+    def confirmar(self):
+        pass
+
+    def cerrar(self):
+        self.writer.close()
+
+
+class _Progreso:
+    """Informe de progreso en stderr, como máximo dos veces por segundo."""
+
+    def __init__(self, total: Optional[int]):
+        self.total = total
+        self.inicio = time.perf_counter()
+        self._ultimo = 0.0
+
+    def __call__(self, hechos: int, fallidos: int, forzar: bool = False):
+        ahora = time.perf_counter()
+        if not forzar and ahora - self._ultimo < 0.5:
+            return
+        self._ultimo = ahora
+        _imprimir_progreso(hechos, fallidos, self.total, self.inicio)
+
+
+def _imprimir_progreso(hechos: int, fallidos: int, total: Optional[int], inicio: float):
+    transcurrido = max(time.perf_counter() - inicio, 1e-9)
+    ritmo = hechos / transcurrido
+    texto = f"\r   {hechos}"
+    if total:
+        restante = (total - hechos) / ritmo if ritmo else 0
+        texto += f"/{total} ({hechos * 100 // max(total, 1)}%) ETA {restante:.0f}s"
+    texto += f" | {ritmo:.1f} sopas/s | fallidas: {fallidos}"
+    print(texto, end="", file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la generación masiva."""
+    parser = argparse.ArgumentParser(description="Generación masiva de sopas de letras")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--input", help="Archivo .jsonl o .csv con listas de palabras")
+    origen.add_argument("--from-db", action="store_true", help="Usar los temas activos de la base de datos")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--output", help="Archivo .jsonl de salida (se reanuda si ya existe)")
+    destino.add_argument("--db", action="store_true", help="Insertar en sopas_generadas")
+    destino.add_argument("--corpus", help="Corpus binario de salida (services.corpus, sin reanudación)")
+    parser.add_argument("--checkpoint", default="sopas_bulk.checkpoint",
+                        help="Archivo de punto de control para --db")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=500, help="Resultados por transacción/flush")
+    parser.add_argument("--copias", type=int, default=1, help="Sopas distintas por lista de palabras")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla base para derivar semillas por trabajo")
+    parser.add_argument("--contenidas", choices=CONTAINED_MODES, default="warn",
+                        help="Palabras contenidas en otras: informar, descartar o solapar")
+    args = parser.parse_args(argv)
+
+    # Referencia por nombre de módulo para que los procesos hijos la importen (spawn en Windows)
+    from services.sopa_generator import generar_trabajo as tarea  # pylint: disable=import-outside-toplevel
+
+    if args.from_db:
+        registros = _leer_trabajos_db
+    elif args.input.lower().endswith(".csv"):
+        registros = lambda: _leer_trabajos_csv(args.input)  # noqa: E731
+    else:
+        registros = lambda: _leer_trabajos_jsonl(args.input)  # noqa: E731
+
+    total = None
+    if args.input:
+        total = sum(1 for _ in registros()) * args.copias
+
+    if args.output:
+        salida = _SalidaJsonl(args.output)
+    elif args.corpus:
+        salida = _SalidaCorpus(args.corpus)
+    else:
+        salida = _SalidaDb(args.checkpoint, args.batch_size)
+    trabajos = ({"contained_words": args.contenidas, **t}
+                for t in _expandir_trabajos(registros(), args.copias, args.seed)
+                if t["id"] not in salida.completados)
+    hechos = len(salida.completados)
+    if hechos:
+        print(f"↻ Reanudando: {hechos} trabajos ya completados", file=sys.stderr)
+
+    fallidos = 0
+    progreso = _Progreso(total)
+    ventana = max(args.workers * 4, 1)
+    desde_flush = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            en_curso = set()
+            for trabajo in trabajos:
+                en_curso.add(pool.submit(tarea, trabajo))
+                if len(en_curso) < ventana:
+                    continue
+                listos, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    resultado = futuro.result()
+                    fallidos += 0 if resultado.get("success") else 1
+                    salida.escribir(resultado)
+                    hechos += 1
+                    desde_flush += 1
+                if desde_flush >= args.batch_size and args.output:
+                    salida.confirmar()
+                    desde_flush = 0
+                progreso(hechos, fallidos)
+            for futuro in as_completed(en_curso):
+                resultado = futuro.result()
+                fallidos += 0 if resultado.get("success") else 1
+                salida.escribir(resultado)
+                hechos += 1
+                progreso(hechos, fallidos)
+    finally:
+        salida.cerrar()
+
+    print(f"\n✅ {hechos} sopas procesadas ({fallidos} fallidas)", file=sys.stderr)
+    return 0 if fallidos == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# backend_fastapi/services/tema_facets.py
+"""
+Filtros y facetas de temas: categoría, dificultad, etiquetas y es_publico.
+
+``Tema.etiquetas`` es una lista JSON; filtrar sobre ella directamente obliga a
+recorrer la tabla. Por eso:
+
+- SQLite: tabla normalizada ``tema_etiquetas (etiqueta, tema_id)`` con los
+  temas no eliminados, mantenida con triggers (como el índice de búsqueda) y
+  con clave primaria por etiqueta.
+- PostgreSQL: índice GIN ``jsonb_path_ops`` sobre ``etiquetas`` para ``@>``.
+
+Las etiquetas se comparan tal cual (mayúsculas y acentos incluidos). Los
+conteos de todas las facetas salen de una sola consulta ``UNION ALL``.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import String, cast, column, func, literal, select, table, true, type_coerce, union_all
+from sqlalchemy.dialects.postgresql import JSONB
+
+MAX_ETIQUETAS_FACETA = 50
+
+tema_etiquetas = table("tema_etiquetas", column("etiqueta"), column("tema_id"))
+
+_ETIQUETAS_DE = (
+    "SELECT DISTINCT value, {fila}.id FROM json_each({fila}.etiquetas) "
+    "WHERE type = 'text' AND value <> ''"
+)
+
+_DDL_SQLITE = (
+    "CREATE TABLE IF NOT EXISTS tema_etiquetas (etiqueta VARCHAR(100) NOT NULL, tema_id VARCHAR(36) NOT NULL, "
+    "PRIMARY KEY (etiqueta, tema_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_tema_etiquetas_tema ON tema_etiquetas (tema_id)",
+    "CREATE TRIGGER IF NOT EXISTS tema_etiquetas_ai AFTER INSERT ON temas WHEN NEW.deleted_at IS NULL BEGIN "
+    f"INSERT OR IGNORE INTO tema_etiquetas (etiqueta, tema_id) {_ETIQUETAS_DE.format(fila='NEW')}; END",
+    "CREATE TRIGGER IF NOT EXISTS tema_etiquetas_au AFTER UPDATE OF etiquetas, deleted_at ON temas BEGIN "
+    "DELETE FROM tema_etiquetas WHERE tema_id = OLD.id; "
+    f"INSERT OR IGNORE INTO tema_etiquetas (etiqueta, tema_id) {_ETIQUETAS_DE.format(fila='NEW')} "
+    "AND NEW.deleted_at IS NULL; END",
+    "CREATE TRIGGER IF NOT EXISTS tema_etiquetas_ad AFTER DELETE ON temas BEGIN "
+    "DELETE FROM tema_etiquetas WHERE tema_id = OLD.id; END",
+)
+
+_REBUILD_SQLITE = (
+    "DELETE FROM tema_etiquetas",
+    "INSERT OR IGNORE INTO tema_etiquetas (etiqueta, tema_id) "
+    "SELECT j.value, t.id FROM temas t, json_each(t.etiquetas) j "
+    "WHERE t.deleted_at IS NULL AND j.type = 'text' AND j.value <> ''",
+)
+
+_DDL_POSTGRES = (
+    "CREATE INDEX IF NOT EXISTS ix_tema_etiquetas_gin ON temas "
+    "USING GIN (etiquetas jsonb_path_ops) WHERE deleted_at IS NULL",
+)
+
+
+def instalar(conexion) -> None:
+    """Crear la tabla de etiquetas y sus triggers (SQLite) o el índice GIN (PostgreSQL)."""
+    dialecto = conexion.dialect.name
+    if dialecto == "sqlite":
+        for sentencia in _DDL_SQLITE:
+            conexion.exec_driver_sql(sentencia)
+        if conexion.exec_driver_sql("SELECT NOT EXISTS (SELECT 1 FROM tema_etiquetas)").scalar():
+            reconstruir(conexion)
+    elif dialecto == "postgresql":
+        for sentencia in _DDL_POSTGRES:
+            conexion.exec_driver_sql(sentencia)
+
+
+def reconstruir(conexion) -> None:
+    """Volver a llenar ``tema_etiquetas`` a partir de ``temas.etiquetas`` (solo SQLite)."""
+    if conexion.dialect.name == "sqlite":
+        for sentencia in _REBUILD_SQLITE:
+            conexion.exec_driver_sql(sentencia)
+
+
+def filtrar(query, modelo, dialecto: str, categoria: Optional[str] = None, dificultad: Optional[str] = None,
+            etiquetas: Optional[List[str]] = None, es_publico: Optional[bool] = None):
+    """Añadir a ``query`` los filtros de facetas; las etiquetas deben estar todas."""
+    if categoria:
+        query = query.where(modelo.categoria == categoria)
+    if dificultad:
+        query = query.where(modelo.dificultad == dificultad)
+    if es_publico is not None:
+        query = query.where(modelo.es_publico == es_publico)
+    etiquetas = sorted({e for e in etiquetas or [] if e})
+    if etiquetas:
+        if dialecto == "postgresql":
+            query = query.where(type_coerce(modelo.etiquetas, JSONB).contains(etiquetas))
+        else:
+            # JOIN en vez de IN: así SQLite parte de las etiquetas y no recorre todos los temas
+            con_etiquetas = (
+                select(tema_etiquetas.c.tema_id)
+                .where(tema_etiquetas.c.etiqueta.in_(etiquetas))
+                .group_by(tema_etiquetas.c.tema_id)
+                .having(func.count() == len(etiquetas))
+                .subquery()
+            )
+            query = query.join_from(con_etiquetas, modelo, modelo.id == con_etiquetas.c.tema_id)
+    return query
+
+
+def consulta_facetas(modelo, dialecto: str, max_etiquetas: int = MAX_ETIQUETAS_FACETA, **filtros):
+    """Una sola consulta con filas ``(faceta, valor, total)`` para los temas filtrados.
+
+    Cada rama repite los filtros sobre ``temas`` en vez de leer un CTE común:
+    así cada ``GROUP BY`` puede recorrer el índice ``ix_tema_vivo_facetas``.
+    """
+    def vivos(*columnas):
+        return filtrar(select(*columnas).where(modelo.deleted_at.is_(None)), modelo, dialecto, **filtros)
+
+    def por(nombre, columna):
+        return vivos(literal(nombre), cast(columna, String), func.count()).group_by(columna)
+
+    if dialecto == "postgresql":
+        filtrados = vivos(modelo.etiquetas).subquery()
+        elemento = (
+            func.jsonb_array_elements_text(type_coerce(filtrados.c.etiquetas, JSONB))
+            .table_valued("value")
+            .lateral()
+        )
+        etiqueta = elemento.c.value
+        conteo_etiquetas = select(etiqueta.label("valor"), func.count().label("total")).select_from(
+            filtrados.join(elemento, true())
+        )
+    else:
+        etiqueta = tema_etiquetas.c.etiqueta
+        conteo_etiquetas = select(etiqueta.label("valor"), func.count().label("total")).select_from(tema_etiquetas)
+        # tema_etiquetas solo tiene temas vivos: sin filtros no hace falta mirar temas
+        if any(valor not in (None, "", []) for valor in filtros.values()):
+            conteo_etiquetas = conteo_etiquetas.where(tema_etiquetas.c.tema_id.in_(vivos(modelo.id)))
+    top_etiquetas = (
+        conteo_etiquetas.group_by(etiqueta)
+        .order_by(func.count().desc(), etiqueta)
+        .limit(max_etiquetas)
+        .subquery()
+    )
+    return union_all(
+        vivos(literal("total"), literal(None, String), func.count()),
+        por("categoria", modelo.categoria),
+        por("dificultad", modelo.dificultad),
+        por("es_publico", modelo.es_publico),
+        select(literal("etiquetas"), top_etiquetas.c.valor, top_etiquetas.c.total),
+    )
+
+
+def agrupar_facetas(filas) -> Dict[str, Any]:
+    """``{"total": n, "facetas": {faceta: [{"valor", "total"}, ...]}}`` ordenado por total."""
+    resultado: Dict[str, Any] = {"total": 0, "facetas": {"categoria": [], "dificultad": [], "es_publico": [],
+                                                         "etiquetas": []}}
+    for faceta, valor, total in filas:
+        if faceta == "total":
+            resultado["total"] = total
+            continue
+        if faceta == "es_publico" and valor is not None:
+            valor = valor.lower() in ("1", "true", "t")
+        resultado["facetas"][faceta].append({"valor": valor, "total": total})
+    for valores in resultado["facetas"].values():
+        valores.sort(key=lambda v: (-v["total"], str(v["valor"])))
+    return resultado
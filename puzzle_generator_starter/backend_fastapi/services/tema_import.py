@@ -0,0 +1,268 @@
+# backend_fastapi/services/tema_import.py
+"""
+Importación masiva de temas desde JSONL o CSV.
+
+El archivo se procesa línea a línea: nunca se carga entero en memoria. Los
+nombres existentes se precargan en un conjunto con una sola consulta, los temas
+válidos se insertan por lotes (un ``INSERT`` con ``executemany`` y un commit
+por lote) y los errores se informan por número de línea.
+
+JSONL: un objeto por línea con ``nombre`` y opcionalmente ``descripcion``,
+``palabras`` (lista de textos o de ``{"texto": ...}``), ``categoria``,
+``etiquetas`` y ``dificultad``.
+
+CSV: cabecera con esas mismas columnas; ``palabras`` y ``etiquetas`` separadas
+por ``;`` o ``|``. Cada registro debe ocupar una sola línea.
+
+    python -m services.tema_import catalogo.jsonl
+    python -m services.tema_import catalogo.csv --batch-size 5000
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+FORMATOS = ("jsonl", "csv")
+DIFICULTADES = ("facil", "medio", "dificil")
+MAX_ERRORES = 1000  # se cuentan todos, pero solo se guardan los primeros
+MAX_PALABRA = 50
+MAX_NOMBRE = 255
+
+_SEPARADORES_LISTA = re.compile(r"[;|]")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class FilaInvalida(ValueError):
+    """Una línea del archivo no describe un tema válido."""
+
+
+def normalizar_palabras(palabras: Any) -> List[Dict[str, str]]:
+    """Palabras limpias y sin duplicados en el formato de ``Tema.palabras``."""
+    if isinstance(palabras, str):
+        palabras = _SEPARADORES_LISTA.split(palabras)
+    if not isinstance(palabras, list):
+        raise FilaInvalida("'palabras' debe ser una lista")
+    resultado, vistas = [], set()
+    for palabra in palabras:
+        if isinstance(palabra, dict):
+            palabra = palabra.get("texto", "")
+        if not isinstance(palabra, str):
+            raise FilaInvalida(f"Palabra inválida: {palabra!r}")
+        texto = _ESPACIOS.sub(" ", palabra).strip()
+        if not texto:
+            continue
+        if len(texto) > MAX_PALABRA:
+            raise FilaInvalida(f"Palabra demasiado larga: {texto[:20]}...")
+        if not any(c.isalpha() for c in texto):
+            raise FilaInvalida(f"La palabra no tiene letras: {texto!r}")
+        clave = texto.upper()
+        if clave not in vistas:
+            vistas.add(clave)
+            resultado.append({"texto": texto})
+    return resultado
+
+
+def validar_tema(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Columnas de ``Tema`` a partir de un registro del archivo, o FilaInvalida."""
+    if not isinstance(datos, dict):
+        raise FilaInvalida("Se esperaba un objeto")
+    nombre = _ESPACIOS.sub(" ", str(datos.get("nombre") or "")).strip()
+    if not nombre:
+        raise FilaInvalida("Falta 'nombre'")
+    if len(nombre) > MAX_NOMBRE:
+        raise FilaInvalida(f"'nombre' supera {MAX_NOMBRE} caracteres")
+    dificultad = (datos.get("dificultad") or "medio").strip().lower()
+    if dificultad not in DIFICULTADES:
+        raise FilaInvalida(f"'dificultad' debe ser una de: {', '.join(DIFICULTADES)}")
+    etiquetas = datos.get("etiquetas") or []
+    if isinstance(etiquetas, str):
+        etiquetas = _SEPARADORES_LISTA.split(etiquetas)
+    if not isinstance(etiquetas, list):
+        raise FilaInvalida("'etiquetas' debe ser una lista")
+    return {
+        "nombre": nombre,
+        "descripcion": datos.get("descripcion") or None,
+        "palabras": normalizar_palabras(datos.get("palabras") or []),
+        "categoria": (datos.get("categoria") or "").strip() or None,
+        "etiquetas": list(dict.fromkeys(str(e).strip() for e in etiquetas if str(e).strip())),
+        "dificultad": dificultad,
+    }
+
+
+class ImportadorTemas:
+    """Estado de una importación: parseo, deduplicación, lotes y estadísticas.
+
+    No hace E/S: quien lo usa le pasa las líneas (``agregar_linea``), inserta
+    los lotes que devuelve y llama a ``terminar`` para el último.
+    """
+
+    def __init__(self, nombres_existentes: Iterable[str], formato: str = "jsonl", batch_size: int = 1000):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato} (opciones: {', '.join(FORMATOS)})")
+        self.formato = formato
+        self.batch_size = max(1, batch_size)
+        self._nombres = set(nombres_existentes)
+        self._cabecera: Optional[List[str]] = None
+        self._lote: List[Dict[str, Any]] = []
+        self.lineas = 0
+        self.importados = 0
+        self.duplicados = 0
+        self.invalidos = 0
+        self.errores: List[Dict[str, Any]] = []
+
+    def _error(self, linea: int, mensaje: str) -> None:
+        self.invalidos += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({"linea": linea, "error": mensaje})
+
+    def _registro(self, texto: str) -> Optional[Dict[str, Any]]:
+        if self.formato == "jsonl":
+            try:
+                return json.loads(texto)
+            except json.JSONDecodeError as e:
+                raise FilaInvalida(f"JSON inválido: {e.msg}") from e
+        valores = next(csv.reader([texto]))
+        if self._cabecera is None:
+            self._cabecera = [c.strip().lower() for c in valores]
+            if "nombre" not in self._cabecera:
+                raise FilaInvalida("La cabecera CSV debe incluir la columna 'nombre'")
+            return None
+        return dict(zip(self._cabecera, valores))
+
+    def agregar_linea(self, texto: str) -> Optional[List[Dict[str, Any]]]:
+        """Procesar una línea; devuelve un lote completo para insertar, o ``None``."""
+        self.lineas += 1
+        texto = texto.strip().lstrip("﻿")
+        if not texto:
+            return None
+        try:
+            registro = self._registro(texto)
+            if registro is None:
+                return None
+            tema = validar_tema(registro)
+        except FilaInvalida as e:
+            self._error(self.lineas, str(e))
+            return None
+
+        # Mismo criterio que create_tema_db: nombre exacto entre los temas no eliminados
+        if tema["nombre"] in self._nombres:
+            self.duplicados += 1
+            return None
+        self._nombres.add(tema["nombre"])
+
+        ahora = datetime.now(timezone.utc)
+        tema.update(id=str(uuid.uuid4()), es_publico=False, created_at=ahora, updated_at=ahora)
+        self._lote.append(tema)
+        if len(self._lote) >= self.batch_size:
+            return self.terminar()
+        return None
+
+    def terminar(self) -> List[Dict[str, Any]]:
+        """Lote pendiente (puede estar vacío)."""
+        lote, self._lote = self._lote, []
+        self.importados += len(lote)
+        return lote
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lineas": self.lineas,
+            "importados": self.importados,
+            "duplicados": self.duplicados,
+            "invalidos": self.invalidos,
+            "errores": self.errores,
+        }
+
+
+def importar_temas(db, lineas: Iterable[str], formato: str = "jsonl", batch_size: int = 1000,
+                   progreso: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Importar temas con una sesión síncrona (CLI y scripts)."""
+    from sqlalchemy import insert, select  # pylint: disable=import-outside-toplevel
+    from database import Tema  # pylint: disable=import-outside-toplevel
+
+    nombres = db.scalars(select(Tema.nombre).where(Tema.deleted_at.is_(None)))
+    importador = ImportadorTemas(nombres, formato, batch_size)
+
+    def insertar(lote):
+        if lote:
+            db.execute(insert(Tema), lote)
+            db.commit()
+            if progreso:
+                progreso(importador.stats())
+
+    for linea in lineas:
+        insertar(importador.agregar_linea(linea))
+    insertar(importador.terminar())
+    return importador.stats()
+
+
+async def _lineas(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Líneas de texto de un cuerpo HTTP recibido por partes."""
+    pendiente = b""
+    async for chunk in chunks:
+        pendiente += chunk
+        *completas, pendiente = pendiente.split(b"\n")
+        for linea in completas:
+            yield linea.decode("utf-8", errors="replace")
+    if pendiente:
+        yield pendiente.decode("utf-8", errors="replace")
+
+
+async def importar_temas_async(db, chunks: AsyncIterator[bytes], formato: str = "jsonl",
+                               batch_size: int = 1000) -> Dict[str, Any]:
+    """Importar temas desde un cuerpo HTTP con una sesión asíncrona."""
+    from sqlalchemy import insert, select  # pylint: disable=import-outside-toplevel
+    from database import Tema  # pylint: disable=import-outside-toplevel
+
+    nombres = (await db.scalars(select(Tema.nombre).where(Tema.deleted_at.is_(None)))).all()
+    importador = ImportadorTemas(nombres, formato, batch_size)
+
+    async def insertar(lote):
+        if lote:
+            await db.execute(insert(Tema), lote)
+            await db.commit()
+
+    async for linea in _lineas(chunks):
+        await insertar(importador.agregar_linea(linea))
+    await insertar(importador.terminar())
+    return importador.stats()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI de importación masiva."""
+    parser = argparse.ArgumentParser(description="Importar temas desde JSONL o CSV")
+    parser.add_argument("archivo", help="Ruta del archivo, o '-' para leer de stdin")
+    parser.add_argument("--formato", choices=FORMATOS, help="Por defecto, según la extensión")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ("csv" if args.archivo.lower().endswith(".csv") else "jsonl")
+
+    from database import SessionLocal  # pylint: disable=import-outside-toplevel
+
+    origen = sys.stdin if args.archivo == "-" else open(args.archivo, encoding="utf-8", newline="")
+    db = SessionLocal()
+    try:
+        stats = importar_temas(
+            db, origen, formato, args.batch_size,
+            progreso=lambda s: print(f"   ... {s['lineas']} líneas, {s['importados']} temas importados",
+                                     file=sys.stderr),
+        )
+    finally:
+        db.close()
+        if origen is not sys.stdin:
+            origen.close()
+
+    for error in stats["errores"]:
+        print(f"   ⚠️  línea {error['linea']}: {error['error']}", file=sys.stderr)
+    print(f"✅ {stats['importados']} temas importados, {stats['duplicados']} duplicados omitidos, "
+          f"{stats['invalidos']} líneas inválidas")
+    return 0 if not stats["invalidos"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
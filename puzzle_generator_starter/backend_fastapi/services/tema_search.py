@@ -0,0 +1,216 @@
+# backend_fastapi/services/tema_search.py
+"""
+Búsqueda de texto completo en temas (nombre, descripción y palabras).
+
+- SQLite: tabla virtual FTS5 ``temas_fts`` con el tokenizador ``unicode61``
+  sin diacríticos. ``temas_fts_ids`` asigna a cada tema un rowid estable
+  (``INTEGER PRIMARY KEY``, que ``VACUUM`` no renumera) para localizar su fila
+  del índice sin recorrerlo.
+- PostgreSQL: columna ``search_vector`` (tsvector) con índice GIN parcial sobre
+  los temas no eliminados.
+
+En ambos casos el índice se mantiene con triggers, así que cualquier escritura
+(endpoints, importación masiva, scripts) lo actualiza, incluido el borrado
+lógico. Se instala con las migraciones (o ``create_all``) y se puede reconstruir con:
+
+    python -m services.tema_search rebuild
+"""
+
+import argparse
+import re
+import sys
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from services.pagination import decode_rank_cursor, encode_rank_cursor
+
+# Peso de cada columna en el ranking: el nombre pesa más que las palabras
+PESO_NOMBRE, PESO_DESCRIPCION, PESO_PALABRAS = 10.0, 1.0, 5.0
+
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+_CON_ACENTO = "áàäâéèëêíìïîóòöôúùüûñçÁÀÄÂÉÈËÊÍÌÏÎÓÒÖÔÚÙÜÛÑÇ"
+_SIN_ACENTO = "aaaaeeeeiiiioooouuuuncAAAAEEEEIIIIOOOOUUUUNC"
+
+# ---------- SQLite (FTS5) ----------
+
+_PALABRAS_SQLITE = (
+    "(SELECT coalesce(group_concat(CASE WHEN type = 'object' THEN json_extract(value, '$.texto') "
+    "ELSE value END, ' '), '') FROM json_each({fila}.palabras))"
+)
+
+
+def _insertar_fts_sqlite(fila: str, condicion: str = "") -> str:
+    return (
+        f"INSERT OR IGNORE INTO temas_fts_ids(tema_id) VALUES ({fila}.id); "
+        "INSERT INTO temas_fts(rowid, nombre, descripcion, palabras) "
+        f"SELECT m.rowid, {fila}.nombre, coalesce({fila}.descripcion, ''), {_PALABRAS_SQLITE.format(fila=fila)} "
+        f"FROM temas_fts_ids m WHERE m.tema_id = {fila}.id{condicion}; "
+    )
+
+
+def _borrar_fts_sqlite(fila: str) -> str:
+    return f"DELETE FROM temas_fts WHERE rowid = (SELECT rowid FROM temas_fts_ids WHERE tema_id = {fila}.id); "
+
+
+_DDL_SQLITE = (
+    "CREATE TABLE IF NOT EXISTS temas_fts_ids (rowid INTEGER PRIMARY KEY, tema_id VARCHAR(36) NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS temas_fts USING fts5("
+    "nombre, descripcion, palabras, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE TRIGGER IF NOT EXISTS temas_fts_ai AFTER INSERT ON temas WHEN NEW.deleted_at IS NULL BEGIN "
+    + _insertar_fts_sqlite("NEW") + "END",
+    "CREATE TRIGGER IF NOT EXISTS temas_fts_au AFTER UPDATE OF nombre, descripcion, palabras, deleted_at "
+    "ON temas BEGIN " + _borrar_fts_sqlite("OLD")
+    + _insertar_fts_sqlite("NEW", " AND NEW.deleted_at IS NULL") + "END",
+    "CREATE TRIGGER IF NOT EXISTS temas_fts_ad AFTER DELETE ON temas BEGIN " + _borrar_fts_sqlite("OLD")
+    + "DELETE FROM temas_fts_ids WHERE tema_id = OLD.id; END",
+)
+
+_REBUILD_SQLITE = (
+    "DELETE FROM temas_fts",
+    "DELETE FROM temas_fts_ids",
+    "INSERT INTO temas_fts_ids(tema_id) SELECT id FROM temas WHERE deleted_at IS NULL",
+    "INSERT INTO temas_fts(rowid, nombre, descripcion, palabras) "
+    f"SELECT m.rowid, t.nombre, coalesce(t.descripcion, ''), {_PALABRAS_SQLITE.format(fila='t')} "
+    "FROM temas t JOIN temas_fts_ids m ON m.tema_id = t.id",
+)
+
+_BUSCAR_SQLITE = f"""
+SELECT id, rank FROM (
+    SELECT t.id AS id, bm25(temas_fts, {PESO_NOMBRE}, {PESO_DESCRIPCION}, {PESO_PALABRAS}) AS rank
+    FROM temas_fts
+    JOIN temas_fts_ids m ON m.rowid = temas_fts.rowid
+    JOIN temas t ON t.id = m.tema_id
+    WHERE temas_fts MATCH :consulta AND t.deleted_at IS NULL
+)
+"""
+
+# ---------- PostgreSQL (tsvector + GIN) ----------
+
+_DDL_POSTGRES = (
+    "ALTER TABLE temas ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    # translate() en vez de la extensión unaccent: no requiere privilegios y es IMMUTABLE
+    "CREATE OR REPLACE FUNCTION sopa_sin_acentos(texto text) RETURNS text AS $$ "
+    f"SELECT translate(texto, '{_CON_ACENTO}', '{_SIN_ACENTO}') $$ LANGUAGE sql IMMUTABLE",
+    """CREATE OR REPLACE FUNCTION temas_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', sopa_sin_acentos(coalesce(NEW.nombre, ''))), 'A') ||
+        setweight(to_tsvector('simple', sopa_sin_acentos(coalesce((
+            SELECT string_agg(coalesce(p ->> 'texto', p #>> '{}'), ' ')
+            FROM jsonb_array_elements(CASE WHEN jsonb_typeof(NEW.palabras::jsonb) = 'array'
+                                           THEN NEW.palabras::jsonb ELSE '[]'::jsonb END) AS p
+        ), ''))), 'B') ||
+        setweight(to_tsvector('simple', sopa_sin_acentos(coalesce(NEW.descripcion, ''))), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS temas_search_vector ON temas",
+    "CREATE TRIGGER temas_search_vector BEFORE INSERT OR UPDATE OF nombre, descripcion, palabras "
+    "ON temas FOR EACH ROW EXECUTE FUNCTION temas_search_vector()",
+    "CREATE INDEX IF NOT EXISTS ix_tema_search ON temas USING GIN (search_vector) WHERE deleted_at IS NULL",
+)
+
+_REBUILD_POSTGRES = ("UPDATE temas SET nombre = nombre",)
+
+# ts_rank recibe los pesos en orden {D, C, B, A}: A = nombre, B = palabras, C = descripción.
+# Se niega el rank para ordenar de forma ascendente, como bm25 en SQLite.
+_BUSCAR_POSTGRES = """
+SELECT id, rank FROM (
+    SELECT t.id AS id, -ts_rank('{%(c)s, %(c)s, %(p)s, %(n)s}', t.search_vector, q) AS rank
+    FROM temas t, to_tsquery('simple', sopa_sin_acentos(:consulta)) AS q
+    WHERE t.deleted_at IS NULL AND t.search_vector @@ q
+) AS r
+""" % {"n": PESO_NOMBRE / PESO_NOMBRE, "p": PESO_PALABRAS / PESO_NOMBRE, "c": PESO_DESCRIPCION / PESO_NOMBRE}
+
+
+def instalar(conexion) -> None:
+    """Crear índice y triggers si faltan (idempotente); rellena el índice si está vacío."""
+    dialecto = conexion.dialect.name
+    if dialecto == "sqlite":
+        for sentencia in _DDL_SQLITE:
+            conexion.exec_driver_sql(sentencia)
+        vacio = conexion.exec_driver_sql("SELECT NOT EXISTS (SELECT 1 FROM temas_fts_ids)").scalar()
+    elif dialecto == "postgresql":
+        for sentencia in _DDL_POSTGRES:
+            conexion.exec_driver_sql(sentencia)
+        vacio = conexion.exec_driver_sql(
+            "SELECT EXISTS (SELECT 1 FROM temas WHERE search_vector IS NULL)"
+        ).scalar()
+    else:
+        return
+    if vacio:
+        reconstruir(conexion)
+
+
+def reconstruir(conexion) -> None:
+    """Volver a indexar todos los temas no eliminados."""
+    sentencias = _REBUILD_SQLITE if conexion.dialect.name == "sqlite" else _REBUILD_POSTGRES
+    for sentencia in sentencias:
+        conexion.exec_driver_sql(sentencia)
+
+
+def consulta_fts(q: str, dialecto: str) -> Optional[str]:
+    """Consulta de prefijos (todos los términos) a partir del texto del usuario.
+
+    Solo se conservan caracteres de palabra, así que la sintaxis de FTS5 o de
+    ``to_tsquery`` nunca llega desde la entrada. ``None`` si no queda ningún término.
+    """
+    terminos = _TERMINO.findall(q or "")
+    if not terminos:
+        return None
+    if dialecto == "postgresql":
+        return " & ".join(f"{t}:*" for t in terminos)
+    return " ".join(f'"{t}"*' for t in terminos)
+
+
+async def buscar_temas(db, q: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+    """Ids de temas que coinciden con ``q`` por relevancia y cursor de la página siguiente.
+
+    Se pagina por ``(rank, id)`` igual que los listados por ``(created_at, id)``.
+    En motores sin índice de texto completo se usa un ``LIKE`` sobre el nombre.
+    """
+    dialecto = db.bind.dialect.name
+    consulta = consulta_fts(q, dialecto)
+    if consulta is None:
+        return [], None
+
+    parametros = {"consulta": consulta, "limite": limit + 1}
+    if dialecto == "sqlite":
+        sql = _BUSCAR_SQLITE
+    elif dialecto == "postgresql":
+        sql = _BUSCAR_POSTGRES
+    else:
+        sql = "SELECT id, 0.0 AS rank FROM temas WHERE deleted_at IS NULL AND lower(nombre) LIKE :consulta"
+        parametros["consulta"] = f"%{' '.join(_TERMINO.findall(q)).lower()}%"
+    if cursor:
+        rank, ultimo_id = decode_rank_cursor(cursor)
+        sql = f"SELECT * FROM ({sql}) AS pagina WHERE rank > :rank OR (rank = :rank AND id > :ultimo_id)"
+        parametros.update(rank=rank, ultimo_id=ultimo_id)
+    sql = f"{sql} ORDER BY rank, id LIMIT :limite"
+
+    filas = (await db.execute(text(sql), parametros)).all()
+    if len(filas) <= limit:
+        return [fila.id for fila in filas], None
+    filas = filas[:limit]
+    return [fila.id for fila in filas], encode_rank_cursor(filas[-1].rank, filas[-1].id)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI del índice de búsqueda."""
+    parser = argparse.ArgumentParser(description="Índice de búsqueda de texto completo de temas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("rebuild", help="Instalar el índice y volver a indexar todos los temas")
+    parser.parse_args(argv)
+
+    from database import engine  # pylint: disable=import-outside-toplevel
+
+    with engine.begin() as conexion:
+        instalar(conexion)
+        reconstruir(conexion)
+    print(f"✅ Índice de búsqueda de temas reconstruido ({engine.dialect.name})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Pruebas del control de admisión por carriles (sin servidor HTTP)
+"""
+
+import asyncio
+
+from services.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected, ClientGone
+
+
+def test_interactivos_antes_que_lotes():
+    """Con la capacidad ocupada, un interactivo que llega después pasa antes que un lote"""
+    async def escenario():
+        control = AdmissionController(max_concurrent=1, poll_interval=0.01)
+        orden = []
+
+        async def peticion(nombre, carril, duracion):
+            async with control.slot(carril):
+                orden.append(nombre)
+                await asyncio.sleep(duracion)
+
+        primero = asyncio.ensure_future(peticion("ocupa", INTERACTIVE, 0.05))
+        await asyncio.sleep(0.01)
+        lote = asyncio.ensure_future(peticion("lote", BATCH, 0))
+        await asyncio.sleep(0.01)
+        editor = asyncio.ensure_future(peticion("editor", INTERACTIVE, 0))
+        await asyncio.gather(primero, lote, editor)
+        return orden
+
+    assert asyncio.run(escenario()) == ["ocupa", "editor", "lote"]
+
+
+def test_cola_llena_falla_rapido_con_retry_after():
+    """Si el carril está lleno se rechaza de inmediato con un Retry-After >= 1"""
+    async def escenario():
+        control = AdmissionController(max_concurrent=1, max_queue={INTERACTIVE: 1}, poll_interval=0.01)
+        await control.acquire(INTERACTIVE)
+        en_cola = asyncio.ensure_future(control.acquire(INTERACTIVE))
+        await asyncio.sleep(0.01)
+        try:
+            await control.acquire(INTERACTIVE)
+        except AdmissionRejected as e:
+            rechazo = e
+        en_cola.cancel()
+        return control, rechazo
+
+    control, rechazo = asyncio.run(escenario())
+    assert rechazo.retry_after >= 1
+    assert control.stats()["rejected"][INTERACTIVE] == 1
+
+
+def test_plazo_y_cliente_desconectado():
+    """El trabajo en cola se descarta al vencer el plazo o si el cliente se va"""
+    async def escenario():
+        control = AdmissionController(
+            max_concurrent=1, queue_timeout={INTERACTIVE: 0.05}, poll_interval=0.01
+        )
+        await control.acquire(INTERACTIVE)
+        resultados = []
+        try:
+            await control.acquire(INTERACTIVE)
+        except AdmissionRejected:
+            resultados.append("expirada")
+
+        async def desconectado():
+            return True
+
+        try:
+            await control.acquire(INTERACTIVE, desconectado)
+        except ClientGone:
+            resultados.append("abandonada")
+        control.release(INTERACTIVE)
+        return control, resultados
+
+    control, resultados = asyncio.run(escenario())
+    assert resultados == ["expirada", "abandonada"]
+    stats = control.stats()
+    assert stats["queued"][INTERACTIVE] == 0
+    assert stats["active"][INTERACTIVE] == 0
+
+
+def test_stream_libera_el_hueco_aunque_el_cuerpo_no_arranque():
+    """Si el envío falla antes de recorrer el cuerpo, el hueco adquirido se devuelve igual"""
+    from routers.diagramacion import _HuecoAdmitido, _StreamConHueco, admision
+
+    async def escenario():
+        await admision.acquire(INTERACTIVE)
+        ocupados = admision.active
+
+        async def cuerpo():
+            yield "nunca"
+
+        async def recibir():
+            return {"type": "http.disconnect"}
+
+        async def enviar(_mensaje):
+            raise OSError("el cliente ya se fue")
+
+        respuesta = _StreamConHueco(cuerpo(), _HuecoAdmitido(INTERACTIVE), media_type="text/event-stream")
+        try:
+            await respuesta({"type": "http", "method": "POST", "path": "/", "headers": []}, recibir, enviar)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        tras_respuesta = admision.active
+        respuesta.hueco.liberar()  # idempotente: no libera dos veces
+        return ocupados, tras_respuesta, admision.active
+
+    ocupados, tras_respuesta, despues = asyncio.run(escenario())
+    assert tras_respuesta == despues == ocupados - 1
+
+
+def test_variantes_reparten_solo_entre_huecos_libres():
+    """Cada proceso extra de las variantes ocupa un hueco libre y se devuelve al terminar"""
+    from routers import diagramacion
+
+    async def escenario():
+        control = AdmissionController(max_concurrent=3, poll_interval=0.01)
+        await control.acquire(INTERACTIVE)  # el de la propia petición
+        repartos = []
+
+        async def repartir(*args):
+            repartos.append((args[-1], control.active))
+            return {"success": True}
+
+        originales = diagramacion.admision, diagramacion._repartir_variantes
+        diagramacion.admision, diagramacion._repartir_variantes = control, repartir
+        try:
+            await diagramacion._generar_variantes(["SOL"], 8, None, None, None, None)
+            libres = control.active
+            await control.acquire(INTERACTIVE)
+            await control.acquire(INTERACTIVE)
+            await diagramacion._generar_variantes(["SOL"], 8, None, None, None, None)
+        finally:
+            diagramacion.admision, diagramacion._repartir_variantes = originales
+        return repartos, libres, control.active
+
+    repartos, tras_primera, tras_segunda = asyncio.run(escenario())
+    procesos = min(3, max(1, diagramacion.generation_pool.max_workers))
+    assert repartos == [(procesos, procesos), (1, 3)]
+    assert (tras_primera, tras_segunda) == (1, 3)
+
+
+def test_hueco_dura_lo_que_la_generacion_coalescida():
+    """Si el primer solicitante se cancela, el hueco sigue ocupado hasta que termina la tarea"""
+    from routers.diagramacion import _con_hueco, _HuecoAdmitido, admision
+    from services.single_flight import SingleFlight
+
+    async def escenario():
+        vuelos = SingleFlight()
+        fin = asyncio.Event()
+
+        async def trabajo():
+            await fin.wait()
+            return {"success": True}
+
+        antes = admision.active
+        await admision.acquire(INTERACTIVE)
+        primero = asyncio.ensure_future(vuelos.do("k", _con_hueco(trabajo, _HuecoAdmitido(INTERACTIVE))))
+        await asyncio.sleep(0.01)
+        primero.cancel()
+        await asyncio.sleep(0.01)
+        tras_cancelar = admision.active - antes
+        segundo = asyncio.ensure_future(vuelos.do("k", trabajo))  # se une sin hueco propio
+        await asyncio.sleep(0.01)
+        fin.set()
+        resultado = await segundo
+        return tras_cancelar, admision.active - antes, resultado
+
+    tras_cancelar, al_terminar, resultado = asyncio.run(escenario())
+    assert (tras_cancelar, al_terminar) == (1, 0)
+    assert resultado == {"success": True}
+
+
+if __name__ == "__main__":
+    test_interactivos_antes_que_lotes()
+    test_cola_llena_falla_rapido_con_retry_after()
+    test_plazo_y_cliente_desconectado()
+    test_stream_libera_el_hueco_aunque_el_cuerpo_no_arranque()
+    test_variantes_reparten_solo_entre_huecos_libres()
+    test_hueco_dura_lo_que_la_generacion_coalescida()
+    print("✅ Control de admisión OK")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los endpoints /api/db/* sobre la sesión asíncrona
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import Libro, LibroItem, Tema
+from db_de_prueba import cerrar_cliente, cliente_async
+
+
+def test_flujo_temas_libros_y_sopas():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        try:
+            assert cliente.get("/api/health").json()["database"] == "ok"
+
+            tema = cliente.post("/api/db/temas", json={"nombre": "Frutas", "palabras": [{"texto": "PERA"}]}).json()
+            assert cliente.post("/api/db/temas", json={"nombre": "Frutas"}).status_code == 422
+            actualizado = cliente.put(f"/api/db/temas/{tema['id']}", json={"nombre": "Frutas 2"}).json()
+            assert actualizado["nombre"] == "Frutas 2"
+            assert [t["id"] for t in cliente.get("/api/db/temas").json()] == [tema["id"]]
+
+            libro = cliente.post("/api/db/libros", json={"nombre": "Libro", "descripcion": "Frutas"}).json()
+            for _ in range(2):
+                respuesta = cliente.post(f"/api/db/libros/{libro['id']}/items", json={"tema_id": tema["id"]})
+                assert respuesta.status_code == 200
+            items = cliente.get(f"/api/db/libros/{libro['id']}/items").json()
+            assert [i["orden"] for i in items] == [0, 1]
+            assert items[0]["tema_nombre"] == "Frutas 2"
+            completo = cliente.get(f"/api/db/libros/{libro['id']}/completo").json()
+            assert len(completo["items"]) == 2
+
+            pagina = {"libro_id": libro["id"], "numero_pagina": 1}
+            cliente.post(f"/api/db/libros/{libro['id']}/paginas", json=pagina)
+            assert cliente.get(f"/api/db/libros/{libro['id']}").json()["paginas_totales"] == 1
+
+            sopa = {"palabras": ["SOL"], "grid": [["S", "O", "L"]] * 3, "grid_size": 3, "compartible": True,
+                    "word_positions": [{"palabra": "SOL", "inicio": [0, 0], "fin": [0, 2], "direccion": "horizontal"}]}
+            guardada = cliente.post("/api/db/sopas", json=sopa).json()
+            assert cliente.post("/api/db/sopas", json=sopa).json()["id"] == guardada["id"]
+            assert cliente.get(f"/api/public/sopas/{guardada['enlace_publico']}").status_code == 200
+
+            assert cliente.delete(f"/api/db/temas/{tema['id']}").status_code == 200
+            assert cliente.get(f"/api/db/temas/{tema['id']}").status_code == 404
+        finally:
+            cerrar_cliente(engine)
+
+
+def test_libro_completo_en_consultas_constantes():
+    """200 items se cargan con el mismo número de consultas que 1 y sin leer imágenes"""
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        sentencias = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda _c, _cur, sql, *_args: sentencias.append(sql))
+        try:
+            def crear_libro(nombre, cantidad):
+                async def crear():
+                    async with async_sessionmaker(engine)() as db:
+                        libro = Libro(nombre=nombre, descripcion="")
+                        temas = [Tema(nombre=f"{nombre}-{i}", imagen_principal=b"x" * 1024) for i in range(cantidad)]
+                        db.add_all([libro, *temas])
+                        await db.flush()
+                        libro_id = libro.id
+                        db.add_all(LibroItem(libro_id=libro_id, tema_id=t.id, orden=i) for i, t in enumerate(temas))
+                        await db.commit()
+                        return libro_id
+                return asyncio.run(crear())
+
+            consultas = {}
+            for cantidad in (1, 200):
+                libro_id = crear_libro(f"libro{cantidad}", cantidad)
+                for ruta in (f"/api/db/libros/{libro_id}/completo", f"/api/db/libros/{libro_id}/items"):
+                    sentencias.clear()
+                    respuesta = cliente.get(ruta).json()
+                    items = respuesta["items"] if isinstance(respuesta, dict) else respuesta
+                    assert len(items) == cantidad
+                    assert items[-1]["tema_nombre"] == f"libro{cantidad}-{cantidad - 1}"
+                    consultas.setdefault(ruta.rsplit("/", 1)[1], set()).add(len(sentencias))
+                    assert not any("imagen_principal" in sql for sql in sentencias)
+            assert consultas == {"completo": {2}, "items": {2}}
+        finally:
+            cerrar_cliente(engine)
+
+
+def test_imagenes_en_almacen_de_binarios():
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        os.environ["SOPA_BLOB_DIR"] = os.path.join(directorio, "blobs")
+        try:
+            tema = cliente.post("/api/db/temas", json={"nombre": "Animales"}).json()
+            con_imagen = cliente.put(f"/api/db/temas/{tema['id']}/imagenes/principal", content=png).json()
+            url = con_imagen["imagen_principal_url"]
+            assert url and cliente.get("/api/db/temas").json()[0]["imagen_principal_url"] == url
+
+            completa = cliente.get(url)
+            assert completa.content == png and completa.headers["content-type"] == "image/png"
+            assert "immutable" in completa.headers["cache-control"]
+            parcial = cliente.get(url, headers={"Range": "bytes=8-15"})
+            assert parcial.status_code == 206 and parcial.content == bytes(range(8))
+            assert cliente.get(url, headers={"If-None-Match": completa.headers["etag"]}).status_code == 304
+            assert cliente.get("/api/blobs/" + "0" * 64).status_code == 404
+            assert "content-disposition" not in completa.headers
+            assert completa.headers["x-content-type-options"] == "nosniff"
+
+            # Un SVG subido nunca se sirve en línea desde el origen de la API
+            svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+            icono = cliente.put(f"/api/db/temas/{tema['id']}/imagenes/icono", content=svg).json()
+            servido = cliente.get(icono["icono_url"])
+            assert servido.headers["content-disposition"] == "attachment"
+            assert servido.headers["content-security-policy"].startswith("default-src 'none'")
+            assert servido.headers["x-content-type-options"] == "nosniff"
+
+            sin_imagen = cliente.delete(f"/api/db/temas/{tema['id']}/imagenes/principal").json()
+            assert sin_imagen["imagen_principal_url"] is None
+        finally:
+            del os.environ["SOPA_BLOB_DIR"]
+            cerrar_cliente(engine)
+
+
+def test_paginacion_por_cursor():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        try:
+            creados = [cliente.post("/api/db/temas", json={"nombre": f"Tema {i}", "categoria": "c" if i % 2 else None})
+                       .json()["id"] for i in range(7)]
+
+            def recorrer(url):
+                vistos, paginas = [], 0
+                while url:
+                    respuesta = cliente.get(url)
+                    vistos += [t["id"] for t in respuesta.json()]
+                    paginas += 1
+                    siguiente = respuesta.headers.get("x-next-cursor")
+                    if siguiente:
+                        assert 'rel="next"' in respuesta.headers["link"]
+                    url = f"/api/db/temas?limit=3&cursor={siguiente}" if siguiente else None
+                return vistos, paginas
+
+            vistos, paginas = recorrer("/api/db/temas?limit=3")
+            assert paginas == 3 and vistos == list(reversed(creados))
+            primera = cliente.get("/api/db/temas?limit=2&categoria=c")
+            assert [t["id"] for t in primera.json()] == [creados[5], creados[3]]
+            segunda = cliente.get(f"/api/db/temas?limit=2&categoria=c&cursor={primera.headers['x-next-cursor']}")
+            assert [t["id"] for t in segunda.json()] == [creados[1]] and "x-next-cursor" not in segunda.headers
+            assert cliente.get("/api/db/temas?cursor=basura").status_code == 422
+
+            # Sin limit ni cursor la lista va completa, aunque supere el tamaño de página
+            with mock.patch("services.pagination.DEFAULT_PAGE_SIZE", 2):
+                completa = cliente.get("/api/db/temas")
+                assert len(completa.json()) == 7 and "x-next-cursor" not in completa.headers
+                assert len(cliente.get("/api/db/temas?cursor=" + primera.headers["x-next-cursor"]).json()) == 2
+        finally:
+            cerrar_cliente(engine)
+
+
+def test_operaciones_por_lotes_de_items():
+    """Añadir, reordenar y eliminar N items cuesta las mismas sentencias que 1"""
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        sentencias = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda _c, _cur, sql, *_args: sentencias.append(sql))
+        try:
+            libro = cliente.post("/api/db/libros", json={"nombre": "Lote", "descripcion": ""}).json()
+            base = f"/api/db/libros/{libro['id']}/items"
+            temas = [cliente.post("/api/db/temas", json={"nombre": f"T{i}"}).json()["id"] for i in range(100)]
+
+            sentencias.clear()
+            creados = cliente.post(f"{base}/batch", json=[{"tema_id": t} for t in temas]).json()
+            assert [i["orden"] for i in creados] == list(range(100))
+            assert creados[5]["tema_nombre"] == "T5"
+            assert sum(sql.lstrip().upper().startswith("INSERT") for sql in sentencias) == 1
+
+            mas = cliente.post(f"{base}/batch", json=[{"tema_id": temas[0]}, {"tema_id": temas[0]}]).json()
+            assert [i["orden"] for i in mas] == [100, 101]
+            faltante = cliente.post(f"{base}/batch", json=[{"tema_id": temas[0]}, {"tema_id": "no-existe"}])
+            assert faltante.status_code == 404 and faltante.json()["detail"]["tema_ids"] == ["no-existe"]
+            assert cliente.post(f"{base}/batch", json=[]).status_code == 422
+
+            ids = [i["id"] for i in creados]
+            sentencias.clear()
+            orden = [{"item_id": i, "orden": 99 - n} for n, i in enumerate(ids)]
+            respuesta = cliente.put(f"{base}/reorder", json=orden)
+            assert respuesta.json()["actualizados"] == 100
+            assert sum(sql.lstrip().upper().startswith("UPDATE") for sql in sentencias) == 1
+            assert [i["id"] for i in cliente.get(base).json()[:100]] == ids[::-1]
+
+            otro = cliente.post("/api/db/libros", json={"nombre": "Otro", "descripcion": ""}).json()
+            ajeno = cliente.put(f"/api/db/libros/{otro['id']}/items/reorder", json=[{"item_id": ids[0], "orden": 0}])
+            assert ajeno.status_code == 404
+
+            sentencias.clear()
+            assert cliente.post(f"{base}/remove", json=ids[:60]).json()["eliminados"] == 60
+            assert sum(sql.lstrip().upper().startswith("DELETE") for sql in sentencias) == 1
+            assert len(cliente.get(base).json()) == 42
+        finally:
+            cerrar_cliente(engine)
+
+
+if __name__ == "__main__":
+    test_flujo_temas_libros_y_sopas()
+    test_paginacion_por_cursor()
+    test_libro_completo_en_consultas_constantes()
+    test_imagenes_en_almacen_de_binarios()
+    test_operaciones_por_lotes_de_items()
+    print("✅ Endpoints asíncronos de BD OK")
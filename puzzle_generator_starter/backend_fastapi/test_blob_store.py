@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Pruebas del almacén de binarios direccionado por contenido
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, PaginaLibro, Libro, Tema
+from services.blob_store import BlobStore, migrar_binarios, tipo_mime
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def test_contenido_identico_se_guarda_una_vez():
+    with tempfile.TemporaryDirectory() as raiz:
+        store = BlobStore(raiz)
+        digest = store.put(PNG)
+        assert store.put_stream(io.BytesIO(PNG), chunk_size=7) == digest
+
+        async def trozos():
+            for i in range(0, len(PNG), 10):
+                yield PNG[i:i + 10]
+
+        assert asyncio.run(store.put_async(trozos())) == digest
+        archivos = [f for _, _, nombres in os.walk(raiz) for f in nombres]
+        assert archivos == [digest]
+        assert store.get(digest) == PNG
+        assert tipo_mime(PNG) == "image/png"
+
+
+def test_rechaza_hashes_invalidos_y_subidas_grandes():
+    with tempfile.TemporaryDirectory() as raiz:
+        store = BlobStore(raiz)
+        assert not store.exists("../../etc/passwd")
+        try:
+            store.path("../" + "a" * 61)
+            assert False, "la ruta no debe salir del almacén"
+        except ValueError:
+            pass
+
+        async def grande():
+            yield b"x" * 100
+            yield b"x" * 100
+
+        try:
+            asyncio.run(store.put_async(grande(), max_bytes=150))
+            assert False, "la subida debe rechazarse"
+        except ValueError:
+            pass
+        # No quedan temporales a medias
+        assert [f for _, _, nombres in os.walk(raiz) for f in nombres] == []
+
+
+def test_migracion_por_lotes():
+    with tempfile.TemporaryDirectory() as raiz:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        libro = Libro(nombre="Libro")
+        db.add(libro)
+        db.flush()
+        db.add_all([Tema(nombre=f"t{i}", imagen_principal=PNG, icono=b"icono") for i in range(5)])
+        db.add(PaginaLibro(libro_id=libro.id, numero_pagina=1, imagen_generada=b"render"))
+        db.commit()
+
+        store = BlobStore(raiz)
+        stats = migrar_binarios(db, store, batch_size=2)
+        assert stats == {"Tema.imagen_principal": 5, "Tema.icono": 5, "PaginaLibro.imagen_generada": 1}
+        assert db.scalar(select(Tema.id).where(Tema.imagen_principal.isnot(None))) is None
+        hashes = set(db.scalars(select(Tema.imagen_principal_hash)))
+        assert len(hashes) == 1 and store.get(hashes.pop()) == PNG
+        # Relanzar la migración no hace nada
+        assert set(migrar_binarios(db, store).values()) == {0}
+
+
+if __name__ == "__main__":
+    test_contenido_identico_se_guarda_una_vez()
+    test_rechaza_hashes_invalidos_y_subidas_grandes()
+    test_migracion_por_lotes()
+    print("✅ Almacén de binarios OK")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la generación masiva por CLI (python -m services.sopa_generator)
+"""
+
+import json
+import os
+import tempfile
+
+from services.sopa_generator import derive_seed, main
+
+
+def _escribir_entrada(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"lista-{i}", "palabras": ["sol", "luna", "estrella", "cometa"]}) + "\n")
+
+
+def _leer_salida(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {r["id"]: r for r in map(json.loads, f)}
+
+
+def test_semillas_deterministas():
+    """La semilla depende solo de la semilla base y del id del trabajo"""
+    assert derive_seed(1, "a") == derive_seed(1, "a")
+    assert derive_seed(1, "a") != derive_seed(2, "a")
+    assert derive_seed(1, "a") != derive_seed(1, "b")
+
+
+def test_jsonl_con_reanudacion():
+    """Una ejecución interrumpida se reanuda sin repetir ni alterar resultados"""
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = os.path.join(tmp, "listas.jsonl")
+        completa = os.path.join(tmp, "completa.jsonl")
+        parcial = os.path.join(tmp, "parcial.jsonl")
+        _escribir_entrada(entrada, 20)
+
+        argumentos = ["--input", entrada, "--workers", "2", "--seed", "7", "--copias", "2"]
+        assert main(argumentos + ["--output", completa]) == 0
+        esperado = _leer_salida(completa)
+        assert len(esperado) == 40
+
+        # Simular una caída: algunas líneas completas y una cortada a la mitad
+        with open(completa, "rb") as f:
+            lineas = f.read().splitlines(keepends=True)
+        with open(parcial, "wb") as f:
+            f.writelines(lineas[:10])
+            f.write(lineas[10][:25])
+
+        assert main(argumentos + ["--output", parcial]) == 0
+        reanudado = _leer_salida(parcial)
+        assert reanudado.keys() == esperado.keys()
+        assert all(reanudado[k]["grid"] == esperado[k]["grid"] for k in esperado)
+
+
+if __name__ == "__main__":
+    test_semillas_deterministas()
+    test_jsonl_con_reanudacion()
+    print("✅ Generación masiva OK")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Pruebas del análisis de palabras contenidas en otras
+"""
+
+import random
+
+from services.containment import analizar_contencion
+from services.sopa_generator import Direction, WordSearchGenerator, normalize_text
+
+
+def _leer(grid, solucion):
+    (r0, c0), (r1, c1) = solucion["inicio"], solucion["fin"]
+    dr, dc = Direction[solucion["direccion"].replace(" ", "_")].value
+    largo = max(abs(r1 - r0), abs(c1 - c0)) + 1
+    return "".join(grid[r0 + i * dr][c0 + i * dc] for i in range(largo))
+
+
+def test_detecta_contenidas_e_invertidas():
+    contenidas = analizar_contencion(["GIRASOL", "SOL", "LOS", "AMOR", "ROMA", "LUNA"])
+    assert contenidas["SOL"] == ("GIRASOL", 4, False)
+    assert contenidas["LOS"] == ("GIRASOL", 6, True)
+    # Inversas de igual largo: la primera de la lista contiene a la segunda
+    assert contenidas["ROMA"] == ("AMOR", 3, True)
+    assert "GIRASOL" not in contenidas and "AMOR" not in contenidas and "LUNA" not in contenidas
+
+
+def test_coincide_con_busqueda_directa():
+    """El autómata encuentra exactamente las mismas relaciones que una búsqueda ingenua"""
+    rng = random.Random(3)
+    for _ in range(200):
+        palabras = list(dict.fromkeys(
+            "".join(rng.choice("AB") for _ in range(rng.randint(1, 6))) for _ in range(8)
+        ))
+        contenidas = analizar_contencion(palabras)
+        for palabra in palabras:
+            posibles = [p for p in palabras if p != palabra and (len(p), -palabras.index(p)) >
+                        (len(palabra), -palabras.index(palabra)) and (palabra in p or palabra[::-1] in p)]
+            assert (palabra in contenidas) == bool(posibles)
+
+
+def test_modos_del_generador():
+    palabras = ["Girasol", "sol", "los", "Luna", "Cometa"]
+    solapado = WordSearchGenerator(palabras, seed=5, contained_words="overlap").generate()
+    por_palabra = {s["palabra"]: s for s in solapado["soluciones"]}
+    assert set(por_palabra) == set(palabras)
+    for solucion in solapado["soluciones"]:
+        assert _leer(solapado["grid"], solucion) == normalize_text(solucion["palabra"])
+    # SOL y LOS comparten las letras de GIRASOL
+    assert por_palabra["sol"]["fin"] == por_palabra["Girasol"]["fin"]
+    assert por_palabra["los"]["inicio"] == por_palabra["Girasol"]["fin"]
+    assert {c["palabra"] for c in solapado["contenidas"]} == {"sol", "los"}
+
+    descartado = WordSearchGenerator(palabras, seed=5, contained_words="drop").generate()
+    assert {s["palabra"] for s in descartado["soluciones"]} == {"Girasol", "Luna", "Cometa"}
+    assert set(descartado["descartadas"]) == {"sol", "los"}
+
+    # Sin palabras al revés, LOS no se lee dentro de GIRASOL
+    sin_reves = WordSearchGenerator(palabras, seed=5, allow_reverse=False, contained_words="drop").generate()
+    assert sin_reves["descartadas"] == ["sol"]
+
+
+def test_sin_reves_no_pierde_la_contenedora_directa():
+    """SOL está al revés en PALOSANTO ("LOS") y al derecho en SOLAR: sin reversas cuenta SOLAR"""
+    palabras = ["PALOSANTO", "SOLAR", "SOL"]
+    assert analizar_contencion(palabras)["SOL"] == ("PALOSANTO", 4, True)
+    assert analizar_contencion(palabras, allow_reverse=False) == {"SOL": ("SOLAR", 0, False)}
+
+    avisado = WordSearchGenerator(palabras, seed=2, allow_reverse=False).generate()
+    assert [c["palabra"] for c in avisado["contenidas"]] == ["SOL"]
+    descartado = WordSearchGenerator(palabras, seed=2, allow_reverse=False, contained_words="drop").generate()
+    assert descartado["descartadas"] == ["SOL"]
+    assert {s["palabra"] for s in descartado["soluciones"]} == {"PALOSANTO", "SOLAR"}
+    solapado = WordSearchGenerator(palabras, seed=2, allow_reverse=False, contained_words="overlap").generate()
+    por_palabra = {s["palabra"]: s for s in solapado["soluciones"]}
+    assert por_palabra["SOL"]["inicio"] == por_palabra["SOLAR"]["inicio"]
+    assert _leer(solapado["grid"], por_palabra["SOL"]) == "SOL"
+
+
+def test_palabras_duplicadas_conservan_su_original():
+    resultado = WordSearchGenerator(["Árbol", "ARBOL", "niño"], seed=1).generate()
+    assert sorted(s["palabra"] for s in resultado["soluciones"]) == ["niño", "Árbol"]
+
+
+if __name__ == "__main__":
+    test_detecta_contenidas_e_invertidas()
+    test_coincide_con_busqueda_directa()
+    test_modos_del_generador()
+    test_sin_reves_no_pierde_la_contenedora_directa()
+    test_palabras_duplicadas_conservan_su_original()
+    print("✅ Análisis de contención OK")
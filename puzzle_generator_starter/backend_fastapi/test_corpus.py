@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Pruebas del corpus binario de sopas pregeneradas
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from services import corpus
+from services.corpus import CorpusReader, CorpusWriter, get_corpus, write_corpus
+from services.sopa_generator import WordSearchGenerator
+
+
+def test_ida_y_vuelta_con_acceso_aleatorio():
+    """Lo que se escribe se lee igual, en cualquier orden"""
+    resultados = [
+        WordSearchGenerator(["sol", "luna", "estrella", "cometa", "ñandú"], seed=i).generate()
+        for i in range(25)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.bin")
+        with CorpusWriter(path) as writer:
+            for resultado in resultados:
+                writer.add(resultado)
+
+        with CorpusReader(path) as reader:
+            assert len(reader) == 25
+            for i in (24, 0, 13, 7):
+                leido = reader[i]
+                original = resultados[i]
+                assert leido["grid"] == original["grid"]
+                assert leido["seed"] == original["seed"]
+                assert leido["soluciones"] == [
+                    {**s, "inicio": tuple(s["inicio"]), "fin": tuple(s["fin"])}
+                    for s in original["soluciones"]
+                ]
+            # Cabecera del registro: filas y columnas en los dos primeros bytes
+            tamano = resultados[0]["grid_size"]
+            assert bytes(reader.raw(0)[:2]) == bytes([tamano, tamano])
+
+
+def test_indice_fuera_de_rango():
+    """Un índice inexistente lanza IndexError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vacio.bin")
+        with CorpusWriter(path):
+            pass
+        with CorpusReader(path) as reader:
+            assert len(reader) == 0
+            try:
+                reader[0]
+            except IndexError:
+                pass
+            else:
+                raise AssertionError("Se esperaba IndexError")
+
+
+def test_reescribir_no_rompe_al_lector_y_get_corpus_reabre():
+    """El corpus se sustituye atómicamente: el lector abierto sigue viendo el anterior"""
+    sopas = [WordSearchGenerator(["sol", "luna"], seed=i).generate() for i in range(3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.bin")
+        write_corpus(sopas[:2], path)
+        with mock.patch.dict(os.environ, {"SOPA_CORPUS_PATH": path}), mock.patch.object(corpus, "_reader", None):
+            anterior = get_corpus()
+            assert get_corpus() is anterior and len(anterior) == 2
+
+            try:
+                with CorpusWriter(path) as writer:
+                    writer.add(sopas[2])
+                    raise RuntimeError("fallo a mitad")
+            except RuntimeError:
+                pass
+            assert get_corpus() is anterior
+
+            write_corpus(sopas, path)
+            assert len(anterior) == 2 and anterior[1]["grid"] == sopas[1]["grid"]
+            nuevo = get_corpus()
+            assert nuevo is not anterior and len(nuevo) == 3
+            assert nuevo[2]["grid"] == sopas[2]["grid"]
+            assert os.listdir(tmp) == ["corpus.bin"]
+            anterior.close()
+            nuevo.close()
+
+
+if __name__ == "__main__":
+    test_ida_y_vuelta_con_acceso_aleatorio()
+    test_indice_fuera_de_rango()
+    test_reescribir_no_rompe_al_lector_y_get_corpus_reabre()
+    print("✅ Corpus binario OK")
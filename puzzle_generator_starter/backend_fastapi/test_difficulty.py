@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Pruebas del analizador de dificultad (sin servidor HTTP)
+"""
+
+import copy
+
+from services.difficulty import analizar_dificultad, etiqueta_dificultad
+from services.sopa_generator import WordSearchGenerator
+
+
+def test_metricas_basicas():
+    """Mezcla de direcciones, invertidas, diagonales y solapes en una grilla conocida"""
+    grid = [
+        list("SOLX"),
+        list("XUXX"),
+        list("XXNX"),
+        list("LOSA"),
+    ]
+    posiciones = [
+        {"palabra": "SOL", "inicio": (0, 0), "fin": (0, 2), "direccion": "HORIZONTAL"},
+        {"palabra": "SUNA", "inicio": (0, 0), "fin": (3, 3), "direccion": "DIAGONAL"},
+        {"palabra": "SOL", "inicio": (3, 2), "fin": (3, 0), "direccion": "HORIZONTAL INV"},
+    ]
+    analisis = analizar_dificultad(grid, posiciones, ["SOL", "SUNA"])
+    metricas = analisis["metricas"]
+
+    assert metricas["palabras"] == 3
+    assert metricas["mezcla_direcciones"] == {"HORIZONTAL": 1, "DIAGONAL": 1, "HORIZONTAL INV": 1}
+    assert metricas["proporcion_invertidas"] == round(1 / 3, 4)
+    assert metricas["proporcion_diagonales"] == round(1 / 3, 4)
+    assert metricas["solapamientos"] == 1  # (0, 0) es compartida por SOL y SUNA
+    assert metricas["longitud_media"] == round(10 / 3, 2)
+    assert 0.0 <= analisis["puntuacion"] <= 1.0
+    assert analisis["dificultad"] == etiqueta_dificultad(analisis["puntuacion"])
+
+    # Con otras etiquetas, invertidas y diagonales salen igual de la geometría
+    etiquetas = ["derecha", "diagonal", "izquierda"]
+    otras = [{**p, "direccion": e} for p, e in zip(posiciones, etiquetas)]
+    metricas_otras = analizar_dificultad(grid, otras, ["SOL", "SUNA"])["metricas"]
+    assert metricas_otras["proporcion_invertidas"] == metricas["proporcion_invertidas"]
+    assert metricas_otras["proporcion_diagonales"] == metricas["proporcion_diagonales"]
+
+
+def test_senuelos_prefijos_en_relleno():
+    """Un prefijo de palabra objetivo repetido en el relleno cuenta como señuelo"""
+    grid = [
+        list("GATO"),
+        list("XXXX"),
+        list("GAXX"),
+        list("XXXX"),
+    ]
+    posiciones = [{"palabra": "GATO", "inicio": (0, 0), "fin": (0, 3), "direccion": "HORIZONTAL"}]
+    sin_senuelos = analizar_dificultad([list("GATO")] + [list("XXXX")] * 3, posiciones, ["GATO"])
+    con_senuelos = analizar_dificultad(grid, posiciones, ["GATO"])
+
+    assert sin_senuelos["metricas"]["senuelos"] == 0
+    assert con_senuelos["metricas"]["senuelos"] == 0  # "GA" no alcanza el prefijo de 3 letras
+    grid[2][2] = "T"
+    assert analizar_dificultad(grid, posiciones, ["GATO"])["metricas"]["senuelos"] == 1
+
+    # Una palabra de 2 letras no aporta prefijo: no debe restar un señuelo real
+    grid[3][0], grid[3][1] = "O", "S"
+    con_corta = posiciones + [{"palabra": "OS", "inicio": (3, 0), "fin": (3, 1), "direccion": "HORIZONTAL"}]
+    assert analizar_dificultad(grid, con_corta, ["GATO", "OS"])["metricas"]["senuelos"] == 1
+    assert analizar_dificultad(grid, con_corta)["metricas"]["senuelos"] == 1
+
+
+def test_analisis_de_sopa_generada_es_estable():
+    """El análisis de una sopa generada es determinista y no modifica la entrada
+
+    El tiempo por sopa se mide en benchmark_difficulty.py, no aquí.
+    """
+    generator = WordSearchGenerator(
+        ["perro", "gato", "ratón", "elefante", "jirafa", "león", "tigre", "oso", "lobo", "zorro"],
+        seed=1,
+    )
+    resultado = generator.generate()
+    grid = copy.deepcopy(resultado["grid"])
+    soluciones = copy.deepcopy(resultado["soluciones"])
+
+    primero = analizar_dificultad(resultado["grid"], resultado["soluciones"], generator.words)
+    for _ in range(20):
+        assert analizar_dificultad(resultado["grid"], resultado["soluciones"], generator.words) == primero
+    assert resultado["grid"] == grid and resultado["soluciones"] == soluciones
+    assert 0.0 <= primero["puntuacion"] <= 1.0
+    assert primero["dificultad"] == etiqueta_dificultad(primero["puntuacion"])
+
+
+if __name__ == "__main__":
+    test_metricas_basicas()
+    test_senuelos_prefijos_en_relleno()
+    test_analisis_de_sopa_generada_es_estable()
+    print("✅ Analizador de dificultad OK")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Pruebas del progreso y la cancelación de la generación
+"""
+
+import asyncio
+from unittest import mock
+
+from services import generation_pool
+from services.generation_pool import GenerationPool
+from services.sopa_generator import GenerationCancelled, WordSearchGenerator, generar_sopa
+
+# Demasiadas palabras largas para una grilla de 8: obliga a reintentar y crecer
+PALABRAS_DIFICILES = ["ELEFANTE", "COCODRILO", "MARIPOSA", "HIPOPOTAMO", "RINOCERONTE", "ARDILLA"] * 3
+
+
+def test_generador_reporta_y_se_cancela():
+    eventos = []
+
+    def observador(evento):
+        eventos.append(evento)
+        return len(eventos) >= 5
+
+    try:
+        WordSearchGenerator(PALABRAS_DIFICILES, grid_size=8, seed=1, progress=observador).generate()
+        assert False, "Se esperaba GenerationCancelled"
+    except GenerationCancelled:
+        pass
+    assert len(eventos) == 5
+    assert [e["intento"] for e in eventos] == [1, 2, 3, 4, 5]
+    assert all(e["total_palabras"] == 6 and e["grid_size"] == 8 for e in eventos)
+
+
+def test_progreso_no_altera_el_resultado():
+    """Con observador o sin él, la misma semilla produce la misma sopa"""
+    sin_observador = generar_sopa(["GATO", "PERRO", "CABALLO"], seed=42)
+    con_observador = generar_sopa(["GATO", "PERRO", "CABALLO"], seed=42, progress=lambda e: False)
+    assert sin_observador == con_observador
+
+
+def test_stream_del_pool():
+    pool = GenerationPool(max_workers=0)
+
+    async def completo():
+        return [tipo async for tipo, _ in pool.stream(generar_sopa, ["GATO", "PERRO"], None, True, True, 3)]
+
+    async def abandonado():
+        agen = pool.stream(generar_sopa, PALABRAS_DIFICILES, 8, False, False, 1, interval=0)
+        async for tipo, _ in agen:
+            assert tipo == "progreso"
+            break
+        await agen.aclose()
+
+    assert asyncio.run(completo())[-1] == "resultado"
+    asyncio.run(abandonado())
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["cancelled"] == 1
+    assert stats["pending"] == 0
+
+
+def test_streams_no_ocupan_hilos_del_threadpool():
+    """Los eventos llegan por el hilo lector compartido: solo el trabajo en sí usa el threadpool"""
+    pool = GenerationPool(max_workers=0)
+    original = generation_pool.run_in_threadpool
+    usados = []
+
+    def contar(fn, *args):
+        usados.append(fn.__name__)
+        return original(fn, *args)
+
+    async def uno():
+        return [tipo async for tipo, _ in pool.stream(generar_sopa, PALABRAS_DIFICILES, 8, False, False, 1,
+                                                       interval=0)]
+
+    async def varios():
+        return await asyncio.gather(*[uno() for _ in range(4)])
+
+    with mock.patch.object(generation_pool, "run_in_threadpool", contar):
+        resultados = asyncio.run(varios())
+    assert all(tipos[-1] == "resultado" and "progreso" in tipos for tipos in resultados)
+    assert usados == ["_ejecutar_con_progreso"] * 4
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_generador_reporta_y_se_cancela()
+    test_progreso_no_altera_el_resultado()
+    test_stream_del_pool()
+    test_streams_no_ocupan_hilos_del_threadpool()
+    print("✅ Progreso y cancelación de la generación OK")
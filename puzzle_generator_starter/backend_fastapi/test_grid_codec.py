@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Pruebas del formato compacto de grillas y colocaciones
+"""
+
+import json
+import os
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, SopaGenerada
+from services.grid_codec import (
+    convertir_sopas, decode_grid, decode_positions, encode_grid, encode_positions,
+)
+from services.sopa_generator import generar_sopa
+
+
+def _sopa(tamano=12):
+    resultado = generar_sopa(["GIRASOL", "LUNA", "ÑANDÚ", "SOL:MAR"], grid_size=tamano, seed=5)
+    return resultado["grid"], [dict(s, inicio=list(s["inicio"]), fin=list(s["fin"]))
+                               for s in resultado["soluciones"]]
+
+
+def test_ida_y_vuelta_en_todos_los_modos():
+    grid, posiciones = _sopa()
+    for modo in ("compact", "compact+zlib", "compact+zstd"):
+        grid_compacto = encode_grid(grid, modo)
+        posiciones_compactas = encode_positions(posiciones, modo)
+        assert isinstance(grid_compacto, str) and isinstance(posiciones_compactas, str)
+        assert decode_grid(grid_compacto) == grid
+        assert decode_positions(posiciones_compactas) == posiciones
+    assert len(json.dumps(encode_grid(grid, "compact"))) * 3 < len(json.dumps(grid))
+    assert encode_grid(grid, "json") is grid
+
+
+def test_lo_que_no_encaja_se_guarda_tal_cual():
+    assert encode_grid([["AB", "C"]], "compact") == [["AB", "C"]]
+    extra = [{"palabra": "SOL", "inicio": [0, 0], "fin": [0, 2], "direccion": "HORIZONTAL", "color": "rojo"}]
+    assert encode_positions(extra, "compact") is extra
+    assert decode_grid([["A"]]) == [["A"]]
+
+
+def test_columnas_y_backfill():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    grid, posiciones = _sopa(30)
+
+    db.add(SopaGenerada(id="nueva", palabras=["X"], grid=grid, word_positions=posiciones, grid_size=30))
+    # Fila antigua: JSON escrito antes del formato compacto
+    db.execute(text("INSERT INTO sopas_generadas (id, palabras, grid, word_positions) VALUES "
+                    "('antigua', '[]', :g, :p)"), {"g": json.dumps(grid), "p": json.dumps(posiciones)})
+    db.commit()
+
+    almacenado = db.execute(text("SELECT grid FROM sopas_generadas WHERE id = 'nueva'")).scalar()
+    assert json.loads(almacenado).startswith("g1:")
+    for sopa in db.query(SopaGenerada):
+        assert sopa.grid == grid and sopa.word_positions == posiciones
+
+    stats = convertir_sopas(db, batch_size=1, modo="compact+zlib")
+    assert stats["revisadas"] == 2 and stats["convertidas"] == 2
+    assert stats["bytes_antes"] > 3 * stats["bytes_despues"]
+    assert convertir_sopas(db, modo="compact+zlib")["convertidas"] == 0
+    db.expire_all()
+    assert all(s.grid == grid for s in db.query(SopaGenerada))
+
+
+if __name__ == "__main__":
+    test_ida_y_vuelta_en_todos_los_modos()
+    test_lo_que_no_encaja_se_guarda_tal_cual()
+    test_columnas_y_backfill()
+    print("✅ Formato compacto de sopas OK")
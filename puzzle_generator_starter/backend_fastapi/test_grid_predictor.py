@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pruebas del predictor de tamaño de grilla
+"""
+
+import os
+import tempfile
+
+from services.grid_predictor import GridSizePredictor, ajustar, regla_tamano, tamano_inicial
+from services.sopa_generator import WordSearchGenerator
+
+LARGA = [10] * 40  # 40 palabras de 10 letras: la regla (16) se queda corta
+
+
+def _muestras_sinteticas():
+    """Éxito cuando la densidad de letras es <= 0.45 (frontera conocida)"""
+    muestras = []
+    for n in (5, 10, 20, 40, 60):
+        longitudes = [10] * n
+        for tamano in range(10, 60):
+            muestras.append((longitudes, 8, tamano, sum(longitudes) / tamano ** 2 <= 0.45))
+    return muestras
+
+
+def test_ajuste_aprende_la_frontera():
+    predictor = GridSizePredictor(ajustar(_muestras_sinteticas()), objetivo=0.9)
+    predicho = predictor.predecir(LARGA, 8)
+    frontera = next(t for t in range(10, 60) if 400 / t ** 2 <= 0.45)
+    assert frontera <= predicho <= frontera + 3
+    # Nunca por debajo del mínimo de producto ni de la palabra más larga
+    assert predictor.predecir([4, 5], 8) == 16
+
+
+def test_sin_modelo_usa_la_regla():
+    anterior = os.environ.get("SOPA_GRID_MODEL_PATH")
+    os.environ["SOPA_GRID_MODEL_PATH"] = os.path.join(tempfile.gettempdir(), "no-existe-modelo.json")
+    try:
+        assert tamano_inicial(LARGA, 8) == regla_tamano(10) == 16
+    finally:
+        if anterior is None:
+            del os.environ["SOPA_GRID_MODEL_PATH"]
+        else:
+            os.environ["SOPA_GRID_MODEL_PATH"] = anterior
+
+
+def test_modelo_guardado_elige_el_tamano_inicial():
+    predictor = GridSizePredictor(ajustar(_muestras_sinteticas()), objetivo=0.9, info={"listas": 5})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "modelo.json")
+        predictor.save(path)
+        cargado = GridSizePredictor.load(path)
+        assert cargado.info["listas"] == 5
+        assert cargado.predecir(LARGA, 8) == predictor.predecir(LARGA, 8)
+
+        anterior = os.environ.get("SOPA_GRID_MODEL_PATH")
+        os.environ["SOPA_GRID_MODEL_PATH"] = path
+        try:
+            palabras = [f"PALABRA{i:03d}" for i in range(40)]
+            generador = WordSearchGenerator(palabras, seed=1)
+            assert generador.grid_size == predictor.predecir(LARGA, 8)
+            # Un tamaño explícito siempre manda
+            assert WordSearchGenerator(palabras, grid_size=20).grid_size == 20
+        finally:
+            if anterior is None:
+                del os.environ["SOPA_GRID_MODEL_PATH"]
+            else:
+                os.environ["SOPA_GRID_MODEL_PATH"] = anterior
+
+
+if __name__ == "__main__":
+    test_ajuste_aprende_la_frontera()
+    test_sin_modelo_usa_la_regla()
+    test_modelo_guardado_elige_el_tamano_inicial()
+    print("✅ Predictor de tamaño de grilla OK")
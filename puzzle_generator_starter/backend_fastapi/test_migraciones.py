@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las migraciones versionadas (services.migraciones, migrations/)
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import event, inspect, text
+
+from database import Base, make_engine
+from services.migraciones import comprobar, incluir_objeto, revision_actual, revision_objetivo
+
+# Esquema que dejaban create_all y add_columns.py antes de los índices parciales
+ESQUEMA_ANTIGUO = """
+CREATE TABLE temas (id VARCHAR(36) PRIMARY KEY, nombre VARCHAR(255) NOT NULL, descripcion TEXT,
+    palabras JSON NOT NULL, imagen_principal BLOB, icono BLOB, categoria VARCHAR(100), etiquetas JSON,
+    dificultad VARCHAR(20), created_at DATETIME, updated_at DATETIME, deleted_at DATETIME);
+CREATE INDEX ix_tema_nombre ON temas (nombre);
+CREATE INDEX ix_tema_deleted_at ON temas (deleted_at);
+INSERT INTO temas (id, nombre, palabras, etiquetas) VALUES ('t1', 'Frutas', '["PERA"]', '["comida"]');
+"""
+
+
+def test_base_nueva_queda_igual_que_los_modelos():
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = make_engine(f"sqlite:///{os.path.join(directorio, 'nueva.db')}")
+        assert comprobar(engine) == revision_objetivo()
+        with engine.connect() as conexion:
+            assert revision_actual(conexion) == revision_objetivo()
+            contexto = MigrationContext.configure(conexion, opts={"include_object": incluir_objeto})
+            assert compare_metadata(contexto, Base.metadata) == []
+            assert conexion.execute(text("SELECT count(*) FROM temas_fts")).scalar() == 0
+        engine.dispose()
+
+
+def test_adopta_base_antigua_y_arranque_solo_lee_la_version():
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "antigua.db")
+        with sqlite3.connect(ruta) as conexion:
+            conexion.executescript(ESQUEMA_ANTIGUO)
+        engine = make_engine(f"sqlite:///{ruta}")
+
+        try:
+            comprobar(engine, auto_migrar=False)
+            raise AssertionError("debería exigir migrar")
+        except RuntimeError as exc:
+            assert "alembic upgrade head" in str(exc)
+
+        comprobar(engine)
+        inspector = inspect(engine)
+        columnas = {c["name"] for c in inspector.get_columns("temas")}
+        assert {"es_publico", "imagen_principal_hash", "icono_hash"} <= columnas
+        indices = {i["name"] for i in inspector.get_indexes("temas")}
+        assert "ix_tema_nombre" not in indices and "ix_tema_deleted_at" not in indices
+        assert {"ix_tema_vivo_nombre", "ix_tema_papelera"} <= indices
+        assert "sopas_generadas" in inspector.get_table_names()
+        with engine.connect() as conexion:
+            assert conexion.execute(text("SELECT es_publico FROM temas")).scalar() == 0
+            assert conexion.execute(text("SELECT tema_id FROM tema_etiquetas")).scalar() == "t1"
+            assert conexion.execute(text("SELECT count(*) FROM temas_fts WHERE temas_fts MATCH 'pera'")).scalar() == 1
+
+        sentencias = []
+        event.listen(engine, "before_cursor_execute", lambda _c, _cur, sql, *_a: sentencias.append(sql))
+        comprobar(engine)
+        assert len(sentencias) <= 2 and not any("CREATE" in s for s in sentencias)
+        engine.dispose()
+
+
+def test_importar_database_no_toca_la_base():
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "intacta.db")
+        entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta}")
+        subprocess.run([sys.executable, "-c", "import database"], check=True, env=entorno,
+                       cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True)
+        assert not os.path.exists(ruta)
+
+
+if __name__ == "__main__":
+    test_base_nueva_queda_igual_que_los_modelos()
+    test_adopta_base_antigua_y_arranque_solo_lee_la_version()
+    test_importar_database_no_toca_la_base()
+    print("✅ Migraciones OK")
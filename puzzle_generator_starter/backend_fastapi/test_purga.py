@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la purga de temas y libros eliminados (services.purga)
+"""
+
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from database import Libro, LibroItem, PaginaLibro, SopaGenerada, Tema, make_engine
+from db_de_prueba import cerrar_cliente, cliente_async, sesion_sqlite
+from services.blob_store import BlobStore
+from services.purga import purgar
+
+AHORA = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def test_purga_por_lotes_con_dependientes_archivo_y_binarios():
+    with tempfile.TemporaryDirectory() as directorio:
+        db, engine = sesion_sqlite(os.path.join(directorio, "purga.db"))
+        store = BlobStore(os.path.join(directorio, "blobs"))
+        propia, compartida = store.put(b"solo del tema viejo"), store.put(b"compartida")
+
+        viejo = AHORA - timedelta(days=40)
+        vencidos = [Tema(nombre=f"Viejo {i}", palabras=[], deleted_at=viejo) for i in range(5)]
+        vencidos[0].imagen_principal_hash, vencidos[0].icono_hash = propia, compartida
+        reciente = Tema(nombre="Reciente", palabras=[], deleted_at=AHORA - timedelta(days=5))
+        vivo = Tema(nombre="Vivo", palabras=[], icono_hash=compartida)
+        libro_vivo = Libro(nombre="Vivo")
+        libro_viejo = Libro(nombre="Viejo", deleted_at=viejo)
+        db.add_all([*vencidos, reciente, vivo, libro_vivo, libro_viejo])
+        db.flush()
+        db.add_all([
+            LibroItem(libro_id=libro_vivo.id, tema_id=vencidos[1].id),
+            LibroItem(libro_id=libro_vivo.id, tema_id=vivo.id),
+            LibroItem(libro_id=libro_viejo.id, tema_id=vivo.id),
+            PaginaLibro(libro_id=libro_viejo.id, numero_pagina=1),
+            PaginaLibro(libro_id=libro_vivo.id, numero_pagina=1, tema_id=vencidos[2].id),
+            SopaGenerada(tema_id=vencidos[3].id, palabras=["SOL"], grid=[["S"]], word_positions=[]),
+        ])
+        db.commit()
+
+        assert purgar(db, retencion_dias=30, dry_run=True, ahora=AHORA) == {"libros": 1, "temas": 5, "blobs": 0}
+
+        commits = []
+        event.listen(engine, "commit", lambda _c: commits.append(1))
+        archivo = io.StringIO()
+        stats = purgar(db, retencion_dias=30, batch_size=2, archivo=archivo, store=store, ahora=AHORA)
+        assert stats == {"libros": 1, "temas": 5, "blobs": 1}
+        assert len(commits) == 4  # 1 lote de libros + 3 de temas
+
+        assert {t.nombre for t in db.scalars(select(Tema))} == {"Reciente", "Vivo"}
+        assert [l.nombre for l in db.scalars(select(Libro))] == ["Vivo"]
+        items = list(db.scalars(select(LibroItem)))
+        assert [(i.libro_id, i.tema_id) for i in items] == [(libro_vivo.id, vivo.id)]
+        assert db.scalar(select(PaginaLibro.tema_id).where(PaginaLibro.libro_id == libro_vivo.id)) is None
+        assert db.scalar(select(func.count()).select_from(PaginaLibro)) == 1
+        assert db.scalar(select(SopaGenerada.tema_id)) is None
+        assert not store.exists(propia) and store.exists(compartida)
+
+        archivadas = [json.loads(linea) for linea in archivo.getvalue().splitlines()]
+        por_tabla = {}
+        for registro in archivadas:
+            por_tabla[registro["tabla"]] = por_tabla.get(registro["tabla"], 0) + 1
+        # libro_items: el del libro purgado y el del libro vivo que usaba un tema purgado
+        assert por_tabla == {"libros": 1, "libro_items": 2, "paginas_libro": 1, "temas": 5}
+        assert not any("imagen_principal" in r["fila"] for r in archivadas if r["tabla"] == "temas")
+
+        assert purgar(db, retencion_dias=30, ahora=AHORA) == {"libros": 0, "temas": 0, "blobs": 0}
+        db.close()
+        engine.dispose()
+
+
+def test_nombre_de_tema_eliminado_se_puede_reutilizar():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        try:
+            tema = cliente.post("/api/db/temas", json={"nombre": "Frutas"}).json()
+            assert cliente.post("/api/db/temas", json={"nombre": "Frutas"}).status_code == 422
+            cliente.delete(f"/api/db/temas/{tema['id']}")
+            assert cliente.post("/api/db/temas", json={"nombre": "Frutas"}).status_code == 200
+        finally:
+            cerrar_cliente(engine)
+
+
+def test_endpoints_borran_logicamente_y_la_purga_recoge_lo_eliminado():
+    png = b"\x89PNG\r\n\x1a\n" + b"\x01" * 32
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        os.environ["SOPA_BLOB_DIR"] = os.path.join(directorio, "blobs")
+        try:
+            tema = cliente.post("/api/db/temas", json={"nombre": "Frutas"}).json()
+            otro = cliente.post("/api/db/temas", json={"nombre": "Animales"}).json()
+            cliente.put(f"/api/db/temas/{tema['id']}/imagenes/principal", content=png)
+            libro = cliente.post("/api/db/libros", json={"nombre": "Libro"}).json()
+            for tema_id in (tema["id"], otro["id"]):
+                cliente.post(f"/api/db/libros/{libro['id']}/items", json={"tema_id": tema_id})
+
+            assert cliente.delete(f"/api/db/temas/{tema['id']}").status_code == 200
+            assert cliente.delete(f"/api/db/temas/{tema['id']}").status_code == 404
+            items = cliente.get(f"/api/db/libros/{libro['id']}/items").json()
+            assert [i["tema_id"] for i in items] == [otro["id"]]
+            assert cliente.delete(f"/api/db/libros/{libro['id']}").status_code == 200
+            assert cliente.get(f"/api/db/libros/{libro['id']}/completo").status_code == 404
+
+            sync_engine = make_engine(f"sqlite:///{os.path.join(directorio, 'async.db')}")
+            db = sessionmaker(bind=sync_engine)()
+            assert db.scalar(select(func.count()).select_from(Tema).where(Tema.deleted_at.isnot(None))) == 1
+            assert db.scalar(select(Libro.deleted_at)) is not None
+
+            store = BlobStore(os.environ["SOPA_BLOB_DIR"])
+            stats = purgar(db, retencion_dias=30, store=store, ahora=datetime.now(timezone.utc) + timedelta(days=31))
+            assert stats == {"libros": 1, "temas": 1, "blobs": 1}
+            assert [t.nombre for t in db.scalars(select(Tema))] == ["Animales"]
+            db.close()
+            sync_engine.dispose()
+        finally:
+            del os.environ["SOPA_BLOB_DIR"]
+            cerrar_cliente(engine)
+
+
+if __name__ == "__main__":
+    test_purga_por_lotes_con_dependientes_archivo_y_binarios()
+    test_nombre_de_tema_eliminado_se_puede_reutilizar()
+    test_endpoints_borran_logicamente_y_la_purga_recoge_lo_eliminado()
+    print("✅ Purga de eliminados OK")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pruebas del reparto de lecturas a la réplica (services.replica)
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from database import Tema, get_async_db, get_async_replica_db
+from db_de_prueba import sesiones_async
+from main import app
+from services.replica import COOKIE, LeerTusEscrituras, leer_del_primario
+
+
+def test_cookie_de_escritura():
+    assert not leer_del_primario({})
+    assert not leer_del_primario({COOKIE: "basura"})
+    assert not leer_del_primario({COOKIE: str(time.time() - 1)})
+    assert leer_del_primario({COOKIE: str(time.time() + 5)})
+
+
+def test_lecturas_en_replica_salvo_tras_escribir():
+    with tempfile.TemporaryDirectory() as directorio:
+        primario, _, db_primario = sesiones_async(os.path.join(directorio, "primario.db"))
+        replica, sesiones_replica, db_replica = sesiones_async(os.path.join(directorio, "replica.db"))
+
+        async def sembrar_replica():
+            async with sesiones_replica() as db:
+                db.add(Tema(nombre="Replicado", palabras=[]))
+                await db.commit()
+
+        asyncio.run(sembrar_replica())
+        app.dependency_overrides[get_async_db] = db_primario
+        app.dependency_overrides[get_async_replica_db] = db_replica
+        try:
+            cliente = TestClient(LeerTusEscrituras(app, ventana_s=0.5))
+
+            def nombres():
+                return [t["nombre"] for t in cliente.get("/api/db/temas").json()]
+
+            assert nombres() == ["Replicado"]
+
+            # Una escritura fallida no fija el primario
+            assert cliente.post("/api/db/temas", json={}).status_code == 422
+            assert COOKIE not in cliente.cookies
+
+            # Generar una sopa no escribe en la base: tampoco fija el primario
+            generada = cliente.post("/api/diagramacion/generate", json={"palabras": ["SOL", "LUNA"], "seed": 1})
+            assert generada.status_code == 200 and COOKIE not in cliente.cookies
+
+            nuevo = cliente.post("/api/db/temas", json={"nombre": "Recién creado"})
+            assert nuevo.status_code == 200 and COOKIE in cliente.cookies
+            assert nombres() == ["Recién creado"]
+            assert cliente.get(f"/api/db/temas/{nuevo.json()['id']}").status_code == 200
+
+            time.sleep(0.6)
+            assert nombres() == ["Replicado"]
+
+            # Sin réplica configurada todo va al primario
+            del app.dependency_overrides[get_async_replica_db]
+            cliente.cookies.clear()
+            assert nombres() == ["Recién creado"]
+        finally:
+            app.dependency_overrides.clear()
+            asyncio.run(primario.dispose())
+            asyncio.run(replica.dispose())
+
+
+if __name__ == "__main__":
+    test_cookie_de_escritura()
+    test_lecturas_en_replica_salvo_tras_escribir()
+    print("✅ Réplica de lectura OK")
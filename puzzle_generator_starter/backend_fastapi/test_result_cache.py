@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de resultados de generación (sin servidor HTTP)
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from services.result_cache import ResultCache, canonical_key
+
+
+def test_canonical_key_ignora_orden_de_claves():
+    """El hash canónico no depende del orden de las claves"""
+    a = canonical_key({"palabras": ["SOL", "LUNA"], "seed": 1, "grid_size": None})
+    b = canonical_key({"grid_size": None, "seed": 1, "palabras": ["SOL", "LUNA"]})
+    c = canonical_key({"grid_size": None, "seed": 2, "palabras": ["SOL", "LUNA"]})
+    assert a == b
+    assert a != c
+
+
+def test_lru_y_metricas():
+    """Se expulsa la entrada menos usada y se cuentan aciertos/fallos"""
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # "a" pasa a ser la más reciente
+    cache.set("c", {"v": 3})           # expulsa "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"v": 3}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_ttl_y_limite_de_bytes():
+    """Las entradas expiran y el tamaño total respeta max_bytes"""
+    cache = ResultCache(max_entries=100, max_bytes=64, ttl_seconds=0.01)
+    cache.set("x", {"grid": "A" * 20})
+    time.sleep(0.02)
+    assert cache.get("x") is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.ttl_seconds = 60
+    for i in range(10):
+        cache.set(str(i), {"grid": "B" * 20})
+    assert cache.stats()["bytes"] <= 64
+
+
+def test_invalidacion_por_tema_y_nivel_en_disco():
+    """El nivel en disco sobrevive a una nueva instancia y se invalida por etiqueta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        cache = ResultCache(disk_path=path)
+        cache.set("k1", {"v": 1}, tag="tema:1")
+        cache.set("k2", {"v": 2}, tag="tema:2")
+
+        reiniciada = ResultCache(disk_path=path)
+        assert reiniciada.get("k1") == {"v": 1}
+        assert reiniciada.stats()["disk_hits"] == 1
+
+        reiniciada.invalidate_tag("tema:1")
+        assert reiniciada.get("k1") is None
+        assert reiniciada.get("k2") == {"v": 2}
+
+
+def test_disco_recorta_por_lotes_y_fuera_del_bucle():
+    """El recuento del disco es aproximado y se recorta cada pocas escrituras, en un hilo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(max_entries=1, disk_path=os.path.join(tmp, "cache.db"), max_disk_entries=20)
+        sentencias = []
+        cache._disk.set_trace_callback(sentencias.append)  # pylint: disable=protected-access
+        hilos = set()
+        original = cache._disk_set  # pylint: disable=protected-access
+
+        def disk_set(*args):
+            hilos.add(threading.get_ident())
+            original(*args)
+
+        cache._disk_set = disk_set  # pylint: disable=protected-access
+
+        async def escenario():
+            for i in range(50):
+                await cache.aset(f"k{i}", {"v": i}, tag="tema:1")
+            return await cache.aget("k49"), await cache.aget("k40"), await cache.aget("k0")
+
+        assert asyncio.run(escenario()) == ({"v": 49}, {"v": 40}, None)
+        assert threading.get_ident() not in hilos
+        # Lleno, se recorta hasta el 90 %: un recuento cada pocas escrituras, no en cada una
+        recuentos = [s for s in sentencias if "COUNT(*)" in s]
+        assert 0 < len(recuentos) <= 15
+        assert 18 <= cache.stats()["disk_entries"] <= 20
+
+        assert asyncio.run(cache.ainvalidate_tag("tema:1")) >= 18
+        assert cache.get("k24") is None and cache.stats()["disk_entries"] == 0
+
+
+def test_metricas_del_disco_con_el_lock_de_memoria():
+    """Expiraciones y expulsiones del disco se cuentan con el lock de memoria, fuera del del disco"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(max_entries=1, ttl_seconds=0.01, disk_path=os.path.join(tmp, "cache.db"),
+                            max_disk_entries=10)
+        disco = cache._disk_lock  # pylint: disable=protected-access
+        anidados = []
+        dentro = {"expirations": 0, "evictions": 0}
+
+        class LockVigilado:
+            """Anota cuánto cambian los contadores mientras se tiene el lock"""
+
+            def __init__(self, lock):
+                self.lock = lock
+                self.antes = {}
+
+            def __enter__(self):
+                self.lock.acquire()
+                anidados.append(disco.locked())
+                self.antes = {k: getattr(cache, k) for k in dentro}
+
+            def __exit__(self, *exc):
+                for k, v in self.antes.items():
+                    dentro[k] += getattr(cache, k) - v
+                self.lock.release()
+
+        cache._lock = LockVigilado(cache._lock)  # pylint: disable=protected-access
+        cache.set("corta", {"v": 0})
+        cache.set("otra", {"v": 0})  # saca "corta" de memoria: solo queda en disco
+        time.sleep(0.02)
+        assert cache.get("corta") is None
+        assert cache.stats()["expirations"] == 1
+
+        cache.ttl_seconds = 60
+        for i in range(12):
+            cache.set(f"k{i}", {"v": i})
+        # 13 expulsiones de memoria (max_entries=1) y al menos una del recorte del disco
+        stats = cache.stats()
+        assert stats["evictions"] > 13
+        assert dentro == {"expirations": stats["expirations"], "evictions": stats["evictions"]}
+        assert anidados and not any(anidados)
+
+
+if __name__ == "__main__":
+    test_canonical_key_ignora_orden_de_claves()
+    test_lru_y_metricas()
+    test_ttl_y_limite_de_bytes()
+    test_invalidacion_por_tema_y_nivel_en_disco()
+    test_disco_recorta_por_lotes_y_fuera_del_bucle()
+    test_metricas_del_disco_con_el_lock_de_memoria()
+    print("✅ Caché de resultados OK")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Pruebas de coalescencia single-flight (sin servidor HTTP)
+"""
+
+import asyncio
+
+from services.single_flight import SingleFlight
+
+
+def test_peticiones_concurrentes_comparten_ejecucion():
+    """N solicitantes concurrentes con la misma clave ejecutan el trabajo una vez"""
+    async def escenario():
+        sf = SingleFlight()
+        llamadas = []
+
+        async def trabajo():
+            llamadas.append(1)
+            await asyncio.sleep(0.02)
+            return {"grid": [["A"]]}
+
+        resultados = await asyncio.gather(*[sf.do("clave", trabajo) for _ in range(5)])
+        return sf, llamadas, resultados
+
+    sf, llamadas, resultados = asyncio.run(escenario())
+    assert len(llamadas) == 1
+    assert all(r == {"grid": [["A"]]} for r in resultados)
+    assert sf.stats() == {"in_flight": 0, "executions": 1, "coalesced": 4}
+
+
+def test_cancelar_al_primero_no_cancela_a_los_demas():
+    """Cancelar al solicitante que inició el trabajo no afecta al resto"""
+    async def escenario():
+        sf = SingleFlight()
+
+        async def trabajo():
+            await asyncio.sleep(0.05)
+            return 42
+
+        primero = asyncio.ensure_future(sf.do("clave", trabajo))
+        segundo = asyncio.ensure_future(sf.do("clave", trabajo))
+        await asyncio.sleep(0.01)
+        primero.cancel()
+        return await segundo, primero
+
+    valor, primero = asyncio.run(escenario())
+    assert valor == 42
+    assert primero.cancelled()
+
+
+if __name__ == "__main__":
+    test_peticiones_concurrentes_comparten_ejecucion()
+    test_cancelar_al_primero_no_cancela_a_los_demas()
+    print("✅ Single-flight OK")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la deduplicación por contenido de sopas guardadas
+"""
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, SopaGenerada
+from services.sopa_dedup import colapsar_duplicados, guardar_sopa, hash_sopa, insertar_sin_duplicados
+
+POSICIONES = [
+    {"palabra": "SOL", "inicio": [0, 0], "fin": [0, 2], "direccion": "horizontal"},
+    {"palabra": "LUNA", "inicio": [1, 0], "fin": [1, 3], "direccion": "horizontal"},
+]
+
+
+def _sesion():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def _valores(grid_size=4, **extra):
+    return {
+        "palabras": ["SOL", "LUNA"],
+        "grid": [["S", "O", "L", "X"], ["L", "U", "N", "A"], ["X"] * 4, ["X"] * 4],
+        "word_positions": list(POSICIONES),
+        "grid_size": grid_size,
+        **extra,
+    }
+
+
+def test_hash_independiente_del_orden():
+    v = _valores()
+    a = hash_sopa(None, v["palabras"], v["grid"], POSICIONES, 4)
+    b = hash_sopa(None, v["palabras"], v["grid"], list(reversed(POSICIONES)), 4)
+    assert a == b
+    assert a != hash_sopa(None, v["palabras"], v["grid"], POSICIONES, 5)
+
+
+def test_guardar_devuelve_existente_y_promueve_enlace():
+    db = _sesion()
+    calculos = []
+    primera, creada = guardar_sopa(db, _valores(), completar=calculos.append)
+    assert creada and len(calculos) == 1
+    segunda, creada = guardar_sopa(db, _valores(compartible=True, enlace_publico="abc"), completar=calculos.append)
+    assert not creada and segunda.id == primera.id
+    # La dificultad no se recalcula para una sopa ya guardada
+    assert len(calculos) == 1
+    assert segunda.compartible and segunda.enlace_publico == "abc"
+    assert db.query(SopaGenerada).count() == 1
+
+
+def test_insercion_masiva_ignora_duplicados():
+    db = _sesion()
+    guardar_sopa(db, _valores())
+    nuevas = insertar_sin_duplicados(db, [_valores(), _valores(grid_size=5), _valores(grid_size=5)])
+    db.commit()
+    assert nuevas == 1
+    assert db.query(SopaGenerada).count() == 2
+
+
+def test_colapsar_duplicados_historicos():
+    db = _sesion()
+    # Simular una base anterior: sin índice único ni hashes
+    db.execute(text("DROP INDEX ux_sopa_content_hash"))
+    filas = [
+        SopaGenerada(id="1", **_valores()),
+        SopaGenerada(id="2", compartible=True, enlace_publico="a", **_valores()),
+        SopaGenerada(id="3", compartible=True, enlace_publico="b", **_valores()),
+        SopaGenerada(id="4", **_valores(grid_size=5)),
+        SopaGenerada(id="5", **_valores(grid_size=5)),
+    ]
+    db.add_all(filas)
+    db.commit()
+
+    simulacion = colapsar_duplicados(db, batch_size=2, dry_run=True)
+    assert db.query(SopaGenerada).count() == 5
+
+    stats = colapsar_duplicados(db, batch_size=2)
+    assert stats == simulacion
+    assert stats["eliminadas"] == 2 and stats["enlaces_movidos"] == 1 and stats["conservadas_por_enlace"] == 1
+    ids = sorted(i for (i,) in db.query(SopaGenerada.id))
+    assert ids == ["1", "3", "4"]
+    assert db.get(SopaGenerada, "1").enlace_publico == "a"
+    # Ahora existe el índice único: una nueva copia se reutiliza
+    _, creada = guardar_sopa(db, _valores(grid_size=5))
+    assert not creada
+
+
+if __name__ == "__main__":
+    test_hash_independiente_del_orden()
+    test_guardar_devuelve_existente_y_promueve_enlace()
+    test_insercion_masiva_ignora_duplicados()
+    test_colapsar_duplicados_historicos()
+    print("✅ Deduplicación de sopas OK")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los perfiles de conexión SQLite
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import text
+
+from database import make_engine, sqlite_pragmas
+
+
+def _pragma(engine, nombre):
+    with engine.connect() as conexion:
+        return conexion.execute(text(f"PRAGMA {nombre}")).scalar()
+
+
+def test_perfil_rendimiento_en_cada_conexion():
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = make_engine(f"sqlite:///{os.path.join(directorio, 'p.db')}", sqlite_profile="rendimiento")
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1  # NORMAL
+        assert _pragma(engine, "busy_timeout") == 5000
+        assert _pragma(engine, "temp_store") == 2  # MEMORY
+        assert engine.pool.size() == 5
+        engine.dispose()
+
+
+def test_perfil_ninguno_conserva_valores_por_defecto():
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = make_engine(f"sqlite:///{os.path.join(directorio, 'p.db')}", sqlite_profile="ninguno")
+        assert _pragma(engine, "journal_mode") == "delete"
+        engine.dispose()
+
+
+def test_sobrescritura_por_entorno():
+    os.environ["SQLITE_BUSY_TIMEOUT"] = "1234"
+    try:
+        assert sqlite_pragmas("seguro")["busy_timeout"] == "1234"
+    finally:
+        del os.environ["SQLITE_BUSY_TIMEOUT"]
+    try:
+        sqlite_pragmas("turbo")
+        assert False, "un perfil desconocido debe rechazarse"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_perfil_rendimiento_en_cada_conexion()
+    test_perfil_ninguno_conserva_valores_por_defecto()
+    test_sobrescritura_por_entorno()
+    print("✅ Perfiles SQLite OK")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pruebas de filtros y facetas de temas (services.tema_facets)
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from sqlalchemy import event, text
+
+from database import Tema
+from db_de_prueba import cerrar_cliente, cliente_async, sesion_sqlite
+
+
+def _etiquetas(engine):
+    with engine.connect() as conexion:
+        return sorted(conexion.execute(text("SELECT etiqueta, tema_id FROM tema_etiquetas")).all())
+
+
+def test_tabla_de_etiquetas_sincronizada():
+    with tempfile.TemporaryDirectory() as directorio:
+        db, engine = sesion_sqlite(os.path.join(directorio, "facetas.db"))
+        tema = Tema(nombre="Animales", palabras=[], etiquetas=["fauna", "niños", "fauna", ""])
+        db.add(tema)
+        db.commit()
+        assert _etiquetas(engine) == [("fauna", tema.id), ("niños", tema.id)]
+
+        tema.etiquetas = ["selva"]
+        db.commit()
+        assert _etiquetas(engine) == [("selva", tema.id)]
+
+        tema.deleted_at = datetime.now(timezone.utc)
+        db.commit()
+        assert _etiquetas(engine) == []
+        tema.deleted_at = None
+        db.commit()
+        assert _etiquetas(engine) == [("selva", tema.id)]
+
+        db.delete(tema)
+        db.commit()
+        assert _etiquetas(engine) == []
+        db.close()
+        engine.dispose()
+
+
+def test_facetas_y_filtros_en_una_consulta():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        sentencias = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda _c, _cur, sql, *_args: sentencias.append(sql))
+        try:
+            temas = [
+                ("Perros", "animales", "facil", ["mascotas", "niños"]),
+                ("Gatos", "animales", "medio", ["mascotas"]),
+                ("Leones", "animales", "dificil", ["selva"]),
+                ("Rosas", "plantas", "facil", ["jardín", "niños"]),
+            ]
+            ids = {}
+            for nombre, categoria, dificultad, etiquetas in temas:
+                ids[nombre] = cliente.post("/api/db/temas", json={
+                    "nombre": nombre, "categoria": categoria, "dificultad": dificultad, "etiquetas": etiquetas,
+                }).json()["id"]
+            cliente.put(f"/api/db/temas/{ids['Gatos']}", json={
+                "nombre": "Gatos", "categoria": "animales", "dificultad": "medio", "etiquetas": ["mascotas", "niños"],
+            })
+            cliente.delete(f"/api/db/temas/{ids['Leones']}")
+
+            sentencias.clear()
+            facetas = cliente.get("/api/db/temas/facets").json()
+            assert len(sentencias) == 1
+            assert facetas["total"] == 3
+            assert facetas["facetas"]["categoria"] == [
+                {"valor": "animales", "total": 2}, {"valor": "plantas", "total": 1}
+            ]
+            assert facetas["facetas"]["etiquetas"][0] == {"valor": "niños", "total": 3}
+            assert {"valor": "selva", "total": 1} not in facetas["facetas"]["etiquetas"]
+            assert facetas["facetas"]["es_publico"] == [{"valor": False, "total": 3}]
+
+            filtradas = cliente.get("/api/db/temas/facets",
+                                    params={"etiquetas": ["mascotas", "niños"]}).json()
+            assert filtradas["total"] == 2
+            assert filtradas["facetas"]["dificultad"] == [
+                {"valor": "facil", "total": 1}, {"valor": "medio", "total": 1}
+            ]
+
+            nombres = [t["nombre"] for t in cliente.get(
+                "/api/db/temas", params={"etiquetas": ["niños"], "dificultad": "facil"}).json()]
+            assert sorted(nombres) == ["Perros", "Rosas"]
+            assert cliente.get("/api/db/temas", params={"es_publico": True}).json() == []
+
+            async def plan_etiquetas():
+                async with engine.connect() as conexion:
+                    filas = await conexion.exec_driver_sql(
+                        "EXPLAIN QUERY PLAN SELECT tema_id FROM tema_etiquetas WHERE etiqueta IN ('niños')")
+                    return " ".join(str(f[-1]) for f in filas)
+            assert "USING PRIMARY KEY" in asyncio.run(plan_etiquetas())
+        finally:
+            cerrar_cliente(engine)
+
+
+if __name__ == "__main__":
+    test_tabla_de_etiquetas_sincronizada()
+    test_facetas_y_filtros_en_una_consulta()
+    print("✅ Facetas de temas OK")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la importación masiva de temas (services.tema_import)
+"""
+
+import json
+import os
+import tempfile
+
+from sqlalchemy import event, func, select
+
+from database import Tema
+from db_de_prueba import cerrar_cliente, cliente_async, sesion_sqlite
+from services.tema_import import MAX_ERRORES, ImportadorTemas, importar_temas, normalizar_palabras
+
+
+def test_normalizar_palabras():
+    palabras = normalizar_palabras(["  perro ", "Perro", {"texto": "gato  montés"}, "", "ratón"])
+    assert palabras == [{"texto": "perro"}, {"texto": "gato montés"}, {"texto": "ratón"}]
+    assert normalizar_palabras("uno; dos|tres") == [{"texto": "uno"}, {"texto": "dos"}, {"texto": "tres"}]
+    for invalida in (["1234"], [7], "x" * 60):
+        try:
+            normalizar_palabras(invalida)
+            assert False, invalida
+        except ValueError:
+            pass
+
+
+def test_jsonl_por_lotes_con_duplicados_y_errores():
+    with tempfile.TemporaryDirectory() as directorio:
+        db, engine = sesion_sqlite(os.path.join(directorio, "import.db"), autoflush=False)
+        db.add(Tema(nombre="Existente", palabras=[]))
+        db.commit()
+
+        lineas = [json.dumps({"nombre": f"Tema {i}", "palabras": ["a", "b"], "dificultad": "facil"}) for i in range(25)]
+        lineas += [
+            json.dumps({"nombre": "Existente"}),
+            json.dumps({"nombre": "Tema 3"}),
+            "{roto",
+            json.dumps({"nombre": "Mala", "dificultad": "imposible"}),
+            "",
+        ]
+        consultas = []
+        event.listen(engine, "before_cursor_execute", lambda *a: consultas.append(a[2]))
+        lotes = []
+        stats = importar_temas(db, iter(lineas), "jsonl", batch_size=10,
+                               progreso=lambda s: lotes.append(s["importados"]))
+
+        assert stats["importados"] == 25 and stats["duplicados"] == 2 and stats["invalidos"] == 2
+        assert [e["linea"] for e in stats["errores"]] == [28, 29]
+        assert lotes == [10, 20, 25]
+        # una consulta de nombres y un INSERT (executemany) por lote
+        assert sum(c.lstrip().upper().startswith("INSERT") for c in consultas) == 3
+        assert sum(c.lstrip().upper().startswith("SELECT") for c in consultas) == 1
+        tema = db.scalars(select(Tema).where(Tema.nombre == "Tema 0")).one()
+        assert tema.palabras == [{"texto": "a"}, {"texto": "b"}] and tema.dificultad == "facil"
+        assert db.scalar(select(func.count()).select_from(Tema)) == 26
+        db.close()
+        engine.dispose()
+
+
+def test_csv_y_errores_acotados():
+    importador = ImportadorTemas([], "csv", batch_size=100)
+    assert importador.agregar_linea("nombre,palabras,etiquetas,dificultad") is None
+    importador.agregar_linea('Frutas,"pera; manzana",comida|fruta,medio')
+    lote = importador.terminar()
+    assert lote[0]["palabras"] == [{"texto": "pera"}, {"texto": "manzana"}]
+    assert lote[0]["etiquetas"] == ["comida", "fruta"]
+
+    importador = ImportadorTemas([], "jsonl")
+    for _ in range(MAX_ERRORES + 50):
+        importador.agregar_linea("no es json")
+    assert importador.invalidos == MAX_ERRORES + 50 and len(importador.errores) == MAX_ERRORES
+
+
+def test_endpoint_importa_cuerpo_en_streaming():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        try:
+            cliente.post("/api/db/temas", json={"nombre": "Frutas"})
+
+            def cuerpo():
+                yield b'{"nombre": "Frutas"}\n{"nombre": "Anim'
+                yield b'ales", "palabras": ["perro"]}\n{"nombre": ""}'
+
+            stats = cliente.post("/api/db/temas/import?batch_size=1", content=cuerpo()).json()
+            assert stats["importados"] == 1 and stats["duplicados"] == 1
+            assert stats["errores"] == [{"linea": 3, "error": "Falta 'nombre'"}]
+            nombres = {t["nombre"] for t in cliente.get("/api/db/temas").json()}
+            assert nombres == {"Frutas", "Animales"}
+
+            csv = "nombre,palabras\nColores,rojo;azul\n".encode("utf-8")
+            stats = cliente.post("/api/db/temas/import", content=csv, headers={"content-type": "text/csv"}).json()
+            assert stats["importados"] == 1
+            assert cliente.post("/api/db/temas/import?formato=xml", content=b"").status_code == 422
+        finally:
+            cerrar_cliente(engine)
+
+
+if __name__ == "__main__":
+    test_normalizar_palabras()
+    test_jsonl_por_lotes_con_duplicados_y_errores()
+    test_csv_y_errores_acotados()
+    test_endpoint_importa_cuerpo_en_streaming()
+    print("✅ Importación masiva de temas OK")
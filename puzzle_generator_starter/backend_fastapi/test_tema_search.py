@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la búsqueda de texto completo de temas (services.tema_search)
+"""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from database import Tema
+from db_de_prueba import cerrar_cliente, cliente_async, sesion_sqlite
+from services.tema_import import importar_temas
+from services.tema_search import consulta_fts, reconstruir
+
+
+def _indexados(engine, consulta):
+    with engine.connect() as conexion:
+        return sorted(conexion.execute(text(
+            "SELECT m.tema_id FROM temas_fts JOIN temas_fts_ids m ON m.rowid = temas_fts.rowid "
+            "WHERE temas_fts MATCH :q"
+        ), {"q": consulta_fts(consulta, "sqlite")}).scalars())
+
+
+def test_consulta_sin_sintaxis_del_motor():
+    assert consulta_fts('árbol "OR" gat*', "sqlite") == '"árbol"* "OR"* "gat"*'
+    assert consulta_fts("perro gato", "postgresql") == "perro:* & gato:*"
+    assert consulta_fts(" -*()", "sqlite") is None
+
+
+def test_triggers_mantienen_el_indice():
+    with tempfile.TemporaryDirectory() as directorio:
+        db, engine = sesion_sqlite(os.path.join(directorio, "fts.db"))
+        tema = Tema(nombre="Animales del bosque", palabras=[{"texto": "Ñandú"}, {"texto": "Ciervo"}])
+        db.add(tema)
+        db.commit()
+        assert _indexados(engine, "nandu") == [tema.id]
+        assert _indexados(engine, "BOSQ anim") == [tema.id]
+
+        tema.palabras = [{"texto": "Zorro"}]
+        db.commit()
+        assert _indexados(engine, "nandu") == [] and _indexados(engine, "zorr") == [tema.id]
+
+        tema.deleted_at = datetime.now(timezone.utc)
+        db.commit()
+        assert _indexados(engine, "zorro") == []
+        tema.deleted_at = None
+        db.commit()
+        assert _indexados(engine, "zorro") == [tema.id]
+
+        # la importación masiva (executemany) también pasa por los triggers
+        importar_temas(db, ['{"nombre": "Árboles", "palabras": ["roble", "pino"]}'])
+        assert len(_indexados(engine, "arbol")) == 1
+
+        # VACUUM renumera los rowid de temas pero no los del índice
+        with engine.connect() as conexion:
+            conexion.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        db.delete(tema)
+        db.commit()
+        assert _indexados(engine, "zorro") == [] and len(_indexados(engine, "roble")) == 1
+
+        with engine.begin() as conexion:
+            reconstruir(conexion)
+        assert len(_indexados(engine, "pino")) == 1
+        db.close()
+        engine.dispose()
+
+
+def test_endpoint_busqueda_por_relevancia_y_cursor():
+    with tempfile.TemporaryDirectory() as directorio:
+        cliente, engine = cliente_async(directorio)
+        try:
+            cliente.post("/api/db/temas", json={"nombre": "Frutas", "palabras": [{"texto": "Plátano"}]})
+            cliente.post("/api/db/temas", json={"nombre": "Plátanos del mundo", "descripcion": "Variedades"})
+            for i in range(5):
+                cliente.post("/api/db/temas", json={"nombre": f"Postres {i}", "descripcion": "con platano"})
+
+            primera = cliente.get("/api/db/temas/search", params={"q": "platan", "limit": 3})
+            nombres = [t["nombre"] for t in primera.json()]
+            assert nombres[:2] == ["Plátanos del mundo", "Frutas"]  # nombre > palabras > descripción
+            vistos = list(nombres)
+            cursor = primera.headers["X-Next-Cursor"]
+            while cursor:
+                pagina = cliente.get("/api/db/temas/search", params={"q": "platan", "limit": 3, "cursor": cursor})
+                vistos += [t["nombre"] for t in pagina.json()]
+                cursor = pagina.headers.get("X-Next-Cursor")
+            assert len(vistos) == len(set(vistos)) == 7
+
+            assert cliente.get("/api/db/temas/search", params={"q": "???"}).json() == []
+            assert cliente.get("/api/db/temas/search", params={"q": "x", "cursor": "basura"}).status_code == 422
+        finally:
+            cerrar_cliente(engine)
+
+
+if __name__ == "__main__":
+    test_consulta_sin_sintaxis_del_motor()
+    test_triggers_mantienen_el_indice()
+    test_endpoint_busqueda_por_relevancia_y_cursor()
+    print("✅ Búsqueda de temas OK")
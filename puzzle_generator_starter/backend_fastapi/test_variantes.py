@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Pruebas de variantes y tablas de posiciones del generador
+"""
+
+from services.sopa_generator import (
+    ALL_DIRECTIONS,
+    PalabrasPreparadas,
+    _tabla_slots,
+    firma_disposicion,
+    generar_variantes,
+    semillas_de_variantes,
+)
+
+PALABRAS = ["sol", "luna", "estrella", "cometa", "planeta", "galaxia", "nebulosa", "asteroide"]
+
+
+def test_tabla_slots_solo_posiciones_validas():
+    """Cada posición de la tabla mantiene la palabra dentro de la grilla, y no falta ninguna"""
+    tamano, largo = 10, 4
+    slots = _tabla_slots(tamano, largo, tuple(ALL_DIRECTIONS))
+    esperadas = {
+        (r, c, d)
+        for d in ALL_DIRECTIONS
+        for r in range(tamano)
+        for c in range(tamano)
+        if 0 <= r + (largo - 1) * d.value[0] < tamano and 0 <= c + (largo - 1) * d.value[1] < tamano
+    }
+    assert set(slots) == esperadas
+    assert _tabla_slots(3, 4, tuple(ALL_DIRECTIONS)) == ()
+
+
+def test_variantes_deterministas_y_distintas():
+    preparadas = PalabrasPreparadas(PALABRAS)
+    semillas = semillas_de_variantes(2024, 0, 20)
+    primera = generar_variantes(preparadas, semillas)
+    segunda = generar_variantes(PALABRAS, semillas)
+    assert [v["grid"] for v in primera] == [v["grid"] for v in segunda]
+    assert all(v["success"] for v in primera)
+    assert len({firma_disposicion(v) for v in primera}) == 20
+
+
+def test_firma_ignora_el_relleno():
+    """Dos sopas con las mismas palabras en el mismo sitio son la misma disposición"""
+    a = {"soluciones": [{"palabra": "SOL", "inicio": (0, 0), "fin": (0, 2), "direccion": "HORIZONTAL"}]}
+    b = {"soluciones": [{"palabra": "SOL", "inicio": [0, 0], "fin": [0, 2], "direccion": "HORIZONTAL"}]}
+    assert firma_disposicion(a) == firma_disposicion(b)
+
+
+if __name__ == "__main__":
+    test_tabla_slots_solo_posiciones_validas()
+    test_variantes_deterministas_y_distintas()
+    test_firma_ignora_el_relleno()
+    print("✅ Variantes OK")